@@ -1,8 +1,19 @@
-GHDL          := $(STAGING)/bin/ghdl
+# Each backend is installed under its own prefix and analyzes libraries into
+# its own work directory, mcode being kept at historical locations.
+ghdl-aot      := $(filter llvm gcc,$(GHDL_BACKEND))
+ghdl-prefix   := $(STAGING)$(if $(ghdl-aot),/ghdl-$(GHDL_BACKEND))
+ghdl-work     := $(BUILD)$(if $(ghdl-aot),/ghdl-$(GHDL_BACKEND))
+GHDL          := $(ghdl-prefix)/bin/ghdl
 
-cocotb_libs   := $(BUILD)/cocotb_libs
-cocotb_libdir := $(cocotb_libs)/build/libs/$(shell uname -m)
-libvpi        := $(cocotb_libdir)/libvpi.so
+# co-simulation results location and waveform format
+cosim-dir     := $(ghdl-work)
+wave-ext      := ghw
+
+# cocotb VPI library and Python runtime, looked up at co-simulation time so
+# that cocotb may be installed by the build itself.
+libvpi         = $(shell $(COCOTB_CONFIG) --lib-name-path vpi ghdl)
+libpython      = $(shell $(COCOTB_CONFIG) --libpython)
+pygpi-python   = $(shell $(COCOTB_CONFIG) --python-bin)
 
 ghdl-flags    := --vital-checks \
                  -Wbinding \
@@ -13,68 +24,131 @@ ghdl-flags    := --vital-checks \
                  -Wunused \
                  -Werror
 
+define _ghdlopts
+--ieee=standard --syn-binding --work=$(1) --workdir=$(ghdl-work) \
+$(ghdl-flags) -P$(ghdl-work)
+endef
+
+# mcode backend elaborates designs in memory at each run whereas llvm and gcc
+# backends elaborate them into executables, cached per source content (see
+# test/elab.py).
 define _runcosim
-	env PYTHONPATH="$(TEST):$(cocotb_libdir):$(COCOTB)" \
-	    LD_LIBRARY_PATH="$(cocotb_libdir)" \
-	    MODULE=$(subst .ghw,,$(subst $(BUILD)/,,$(1))) \
+	$(if $(ghdl-aot),$(PYTHON) $(TEST)/elab.py -c $(ghdl-work)/elab \
+	     -o $(ghdl-work)/$(3) $(filter %.vhd,$(5)) -- \
+	     $(GHDL) -e $(call _ghdlopts,$(2)) $(3))
+	env PYTHONPATH="$(TEST)" \
+	    LIBPYTHON_LOC=$$(libpython) \
+	    PYGPI_PYTHON_BIN=$$(pygpi-python) \
+	    MODULE=$(4) \
 	    COCOTB_REDUCED_LOG_FMT=0 \
 	    COCOTB_LOG_LEVEL=$(COCOTB_LOG) \
+	    TRACE_DIR=$(TRACE_DIR) \
+	    OFFLINE_CHECK=$(OFFLINE_CHECK) \
+	    HDL_CLOCK=$(HDL_CLOCK) \
+	    STIM_PLAY=$(STIM_PLAY) \
+	    PACKED_DRIVE=$(PACKED_DRIVE) \
+	    SIM_BUDGET=$(SIM_BUDGET) \
+	    WALL_BUDGET=$(WALL_BUDGET) \
+	    WATCHDOG_TICK=$(WATCHDOG_TICK) \
+	    MIRROR_CHECK=$(MIRROR_CHECK) \
+	    SOAK_CYCLES=$(SOAK_CYCLES) \
+	    SOAK_CHECKPOINT=$(SOAK_CHECKPOINT) \
+	    SOAK_DIR=$(SOAK_DIR) \
+	    COVER_DIR=$(COVER_DIR) \
+	    COVER_STOP=$(COVER_STOP) \
+	    XACT_DIR=$(XACT_DIR) \
+	    XACT_REPLAY=$(XACT_REPLAY) \
+	    PERF_DIR=$(PERF_DIR) \
+	    HISTORY_DEPTH=$(HISTORY_DEPTH) \
+	    HISTORY_DIR=$(HISTORY_DIR) \
+	    MISMATCH_LOG=$(MISMATCH_LOG) \
+	    RANDOM_SEED=$(RANDOM_SEED) \
+	    SIM_BACKEND=ghdl-$(GHDL_BACKEND) \
 	    TESTCASE= \
-	    TOPLEVEL=$(subst _cosim.ghw,,$(subst $(BUILD)/,,$(1))) \
+	    TESTPATTERN=$(TESTPATTERN) \
+	    TOPLEVEL=$(3) \
 	    TOPLEVEL_LANG=vhdl \
-	    $(GHDL) -r --ieee=standard --syn-binding --work=$(2) \
-	        --workdir=$(BUILD) $(ghdl-flags) -P$(BUILD) \
-	        $(subst _cosim.ghw,,$(subst $(BUILD)/,,$(1))) \
-	        --vpi=$(libvpi) --wave=$(1)
+	    $(PYTHON) $(TEST)/runner.py $(if $(COSIM_FORCE),-f) \
+	        -c $(basename $(1)).cache $(5) -- \
+	    $(if $(ghdl-aot),$(ghdl-work)/$(3),\
+	         $(GHDL) -r $(call _ghdlopts,$(2)) $(3)) \
+	        --vpi=$$(libvpi) --wave=$(1) \
+	        $(if $(OFFLINE_CHECK),--vcd=$(subst .ghw,.vcd,$(1)))
 	mv results.xml $(BUILD)
+	$(if $(OFFLINE_CHECK),env PYTHONPATH="$(TEST)" $(PYTHON) \
+	     $(TEST)/checker.py $(subst .ghw,.vcd,$(1)))
 endef
 
 define libobj
-$(BUILD)/$(1)-obj93.cf
+$(ghdl-work)/$(1)-obj93.cf
 endef
 
 define _libdep
-$(patsubst $(BUILD)/%-obj93.cf,%,$(filter %-obj93.cf,$(1)))
+$(patsubst $(ghdl-work)/%-obj93.cf,%,$(filter %-obj93.cf,$(1)))
 endef
 
 define _mklibdeps
-$(BUILD)/$(1)-obj93.cf: $($(1)-lib)
+$(ghdl-work)/$(1)-obj93.cf: $($(1)-lib)
 endef
 
 define _mkcosim
-$(BUILD)/$(1)_cosim.ghw: $($(1)-cosim) $(libvpi)
-	$(call _runcosim,$(BUILD)/$(1)_cosim.ghw,$(call _libdep,$($(1)-cosim)))
+$(cosim-dir)/$(1)_cosim.ghw: $($(1)-cosim) $(STAMPS)/cocotb.installed \
+                             $(TEST)/runner.py $(TEST)/elab.py
+	$(call _runcosim,$(cosim-dir)/$(1)_cosim.ghw,$(call _libdep,$($(1)-cosim)),$(or $($(1)-top),$(1)),$(or $($(1)-module),$(1)_cosim),$(call _cosimsrcs,$(1)))
 endef
 
-# co-simulation target dependencies and default rules
-$(libvpi): | $(BUILD)/cocotb
-	+$(MAKE) -j1 -f cocotb_libs.mk $@ \
-		SIM=ghdl SIM_ROOT=$(COCOTB) USER_DIR=$(cocotb_libs)
-
 # libraries analysis default rule
-$(BUILD)/%-obj93.cf: $(STAMPS)/ghdl.installed Makefile ghdl.mk
-	$(GHDL) -a --ieee=standard \
-	        --work=$(patsubst $(BUILD)/%-obj93.cf,%,$@) \
-	        --workdir=$(BUILD) \
-	        $(ghdl-flags) \
-	        -P$(BUILD) \
+$(ghdl-work)/%-obj93.cf: $(STAMPS)/ghdl-$(GHDL_BACKEND).installed \
+                         Makefile ghdl.mk
+	@mkdir -p $(ghdl-work)
+	$(GHDL) -a $(call _ghdlopts,$(patsubst $(ghdl-work)/%-obj93.cf,%,$@)) \
 	        $(filter %.vhd,$^)
 
 ################################################################################
-# ghdl VHDL simulator build and install with default mcode backend
+# ghdl VHDL simulator build and install, one out of tree build per backend
 ################################################################################
 ghdl-url := git@github.com:tgingold/ghdl.git
 
+# gcc backend requires GCC sources, GHDL being built as a GCC front-end
+GHDL_GCC_SRC :=
+
+ghdl-build            := $(BUILD)/ghdl-build-$(GHDL_BACKEND)
+ghdl-configure-mcode  :=
+ghdl-configure-llvm   := --with-llvm-config
+ghdl-configure-gcc    := --with-gcc=$(GHDL_GCC_SRC)
+
 .PHONY: install-ghdl
-install-ghdl: $(STAMPS)/ghdl.installed
+install-ghdl: $(STAMPS)/ghdl-$(GHDL_BACKEND).installed
 
-$(STAMPS)/ghdl.installed: $(STAMPS)/ghdl.configured
-	cd $(BUILD)/ghdl && $(MAKE)
-	cd $(BUILD)/ghdl && $(MAKE) install
+ifneq ($(GHDL_BACKEND),gcc)
+
+$(STAMPS)/ghdl-$(GHDL_BACKEND).installed: \
+	$(STAMPS)/ghdl-$(GHDL_BACKEND).configured
+	cd $(ghdl-build) && $(MAKE)
+	cd $(ghdl-build) && $(MAKE) install
 	touch $@
 
-$(STAMPS)/ghdl.configured: | $(BUILD)/ghdl $(STAMPS)
-	cd $(BUILD)/ghdl && ./configure --prefix=$(STAGING)
+else
+
+$(STAMPS)/ghdl-gcc.installed: $(STAMPS)/ghdl-gcc.configured
+	cd $(ghdl-build) && $(MAKE) copy-sources
+	mkdir -p $(ghdl-build)/gcc-objs
+	cd $(ghdl-build)/gcc-objs && \
+		$(GHDL_GCC_SRC)/configure --prefix=$(ghdl-prefix) \
+		                          --enable-languages=c,vhdl \
+		                          --disable-bootstrap --disable-lto \
+		                          --disable-multilib --disable-libssp \
+		                          --disable-libgomp --disable-libquadmath
+	cd $(ghdl-build)/gcc-objs && $(MAKE) && $(MAKE) install
+	cd $(ghdl-build) && $(MAKE) ghdllib && $(MAKE) install
+	touch $@
+
+endif
+
+$(STAMPS)/ghdl-$(GHDL_BACKEND).configured: | $(BUILD)/ghdl $(STAMPS)
+	mkdir -p $(ghdl-build)
+	cd $(ghdl-build) && $(BUILD)/ghdl/configure \
+		--prefix=$(ghdl-prefix) $(ghdl-configure-$(GHDL_BACKEND))
 	touch $@
 
 $(BUILD)/ghdl: | $(BUILD)
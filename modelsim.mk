@@ -27,11 +27,18 @@ VCOM          := $(MODELSIM)/bin/vcom
 VFLAGS        := -nologo -fsmverbose w -stats=-cmd,-time -source \
                  -check_synthesis -lint
 
+# Modelsim flow still relies upon a 32 bits cocotb build from sources.
+COCOTB        := $(BUILD)/cocotb
+cocotb-url    := git@github.com:potentialventures/cocotb.git
 cocotb_libs   := $(BUILD)/cocotb_libs
 cocotb_libdir := $(cocotb_libs)/build/libs/i686
 libvpi        := $(cocotb_libdir)/libvpi.so
 libfli        := $(cocotb_libdir)/libfli.so
 
+# co-simulation results location and waveform format
+cosim-dir     := $(BUILD)
+wave-ext      := ghw
+
 modelsim-env  := ARCH="i686" \
 	         PATH="$(STAGING)/bin:$(PATH)" \
 	         SIM_ROOT="$(COCOTB)" \
@@ -47,13 +54,37 @@ define _runcosim
 	cd $(BUILD) && \
 	env $(modelsim-env) \
 	    GPI_EXTRA="vpi" \
-	    TOPLEVEL="$(subst _cosim.ghw,,$(subst $(BUILD)/,,$(1)))" \
-	    MODULE="$(subst .ghw,,$(subst $(BUILD)/,,$(1)))" \
+	    TOPLEVEL="$(3)" \
+	    MODULE="$(4)" \
 	    TESTCASE= \
+	    TESTPATTERN="$(TESTPATTERN)" \
 	    COCOTB_REDUCED_LOG_FMT=1 \
 	    COCOTB_LOG_LEVEL=$(COCOTB_LOG) \
+	    TRACE_DIR="$(TRACE_DIR)" \
+	    HDL_CLOCK="$(HDL_CLOCK)" \
+	    STIM_PLAY="$(STIM_PLAY)" \
+	    PACKED_DRIVE="$(PACKED_DRIVE)" \
+	    SIM_BUDGET="$(SIM_BUDGET)" \
+	    WALL_BUDGET="$(WALL_BUDGET)" \
+	    WATCHDOG_TICK="$(WATCHDOG_TICK)" \
+	    MIRROR_CHECK="$(MIRROR_CHECK)" \
+	    SOAK_CYCLES="$(SOAK_CYCLES)" \
+	    SOAK_CHECKPOINT="$(SOAK_CHECKPOINT)" \
+	    SOAK_DIR="$(SOAK_DIR)" \
+	    COVER_DIR="$(COVER_DIR)" \
+	    COVER_STOP="$(COVER_STOP)" \
+	    XACT_DIR="$(XACT_DIR)" \
+	    XACT_REPLAY="$(XACT_REPLAY)" \
+	    PERF_DIR="$(PERF_DIR)" \
+	    RANDOM_SEED="$(RANDOM_SEED)" \
+	    SIM_BACKEND="modelsim" \
+	    HISTORY_DEPTH="$(HISTORY_DEPTH)" \
+	    HISTORY_DIR="$(HISTORY_DIR)" \
+	    MISMATCH_LOG="$(MISMATCH_LOG)" \
+	    $(PYTHON) $(TEST)/runner.py $(if $(COSIM_FORCE),-f) \
+	        -c $(basename $(1)).cache $(5) -- \
 	    $(VSIM) -c +nowarn3116 -onfinish exit -foreign "cocotb_init libfli.so" \
-	    $(2).$(subst _cosim.ghw,,$(subst $(BUILD)/,,$(1))) -do ../modelsim.do
+	    $(2).$(3) -do ../modelsim.do
 endef
 
 define libobj
@@ -69,8 +100,8 @@ $(STAMPS)/$(1)-lib.built: $($(1)-lib)
 endef
 
 define _mkcosim
-$(BUILD)/$(1)_cosim.ghw: $($(1)-cosim) $(libvpi) $(libfli)
-	$(call _runcosim,$(BUILD)/$(1)_cosim.ghw,$(call _libdep,$($(1)-cosim)))
+$(cosim-dir)/$(1)_cosim.$(wave-ext): $($(1)-cosim) $(libvpi) $(libfli)
+	$(call _runcosim,$(cosim-dir)/$(1)_cosim.$(wave-ext),$(call _libdep,$($(1)-cosim)),$(or $($(1)-top),$(1)),$(or $($(1)-module),$(1)_cosim),$(call _cosimsrcs,$(1)))
 endef
 
 # build library
@@ -154,3 +185,6 @@ $(BUILD)/openssl-$(openssl-vers): | $(BUILD)
 	cd $(dir $@) && wget -O - $(openssl-url) | tar xzf -
 
 endif
+
+$(BUILD)/cocotb: | $(BUILD)
+	cd $(dir $@) && git clone $(cocotb-url)
@@ -0,0 +1,110 @@
+# nvc VHDL simulator co-simulation rules (cocotb >= 1.8 required).
+# Libraries are analyzed into their own work directory, elaborated designs
+# being saved into work libraries as well.
+NVC           := $(STAGING)/bin/nvc
+nvc-work      := $(BUILD)/nvc
+
+# co-simulation results location and waveform format
+cosim-dir     := $(nvc-work)
+wave-ext      := fst
+
+# cocotb VHPI library and Python runtime, looked up at co-simulation time so
+# that cocotb may be installed by the build itself.
+libvhpi        = $(shell $(COCOTB_CONFIG) --lib-name-path vhpi nvc)
+libpython      = $(shell $(COCOTB_CONFIG) --libpython)
+pygpi-python   = $(shell $(COCOTB_CONFIG) --python-bin)
+
+define _nvcopts
+--std=1993 --work=$(1):$(nvc-work)/$(1) -L $(nvc-work)
+endef
+
+# Elaboration is skipped unless sources changed since the last one (see
+# test/elab.py).
+define _runcosim
+	$(PYTHON) $(TEST)/elab.py -c $(nvc-work)/elab \
+	    -s $(nvc-work)/elab/$(3).stamp $(filter %.vhd,$(5)) -- \
+	    $(NVC) $(call _nvcopts,$(2)) -e $(3)
+	env PYTHONPATH="$(TEST)" \
+	    LIBPYTHON_LOC=$$(libpython) \
+	    PYGPI_PYTHON_BIN=$$(pygpi-python) \
+	    MODULE=$(4) \
+	    COCOTB_REDUCED_LOG_FMT=0 \
+	    COCOTB_LOG_LEVEL=$(COCOTB_LOG) \
+	    TRACE_DIR=$(TRACE_DIR) \
+	    OFFLINE_CHECK=$(OFFLINE_CHECK) \
+	    HDL_CLOCK=$(HDL_CLOCK) \
+	    STIM_PLAY=$(STIM_PLAY) \
+	    PACKED_DRIVE=$(PACKED_DRIVE) \
+	    SIM_BUDGET=$(SIM_BUDGET) \
+	    WALL_BUDGET=$(WALL_BUDGET) \
+	    WATCHDOG_TICK=$(WATCHDOG_TICK) \
+	    MIRROR_CHECK=$(MIRROR_CHECK) \
+	    SOAK_CYCLES=$(SOAK_CYCLES) \
+	    SOAK_CHECKPOINT=$(SOAK_CHECKPOINT) \
+	    SOAK_DIR=$(SOAK_DIR) \
+	    COVER_DIR=$(COVER_DIR) \
+	    COVER_STOP=$(COVER_STOP) \
+	    XACT_DIR=$(XACT_DIR) \
+	    XACT_REPLAY=$(XACT_REPLAY) \
+	    PERF_DIR=$(PERF_DIR) \
+	    HISTORY_DEPTH=$(HISTORY_DEPTH) \
+	    HISTORY_DIR=$(HISTORY_DIR) \
+	    MISMATCH_LOG=$(MISMATCH_LOG) \
+	    RANDOM_SEED=$(RANDOM_SEED) \
+	    SIM_BACKEND=nvc \
+	    TESTCASE= \
+	    TESTPATTERN=$(TESTPATTERN) \
+	    TOPLEVEL=$(3) \
+	    TOPLEVEL_LANG=vhdl \
+	    $(PYTHON) $(TEST)/runner.py $(if $(COSIM_FORCE),-f) \
+	        -c $(basename $(1)).cache $(5) -- \
+	    $(NVC) $(call _nvcopts,$(2)) -r --load=$$(libvhpi) \
+	        --wave=$(1) --format=fst $(3)
+	mv results.xml $(BUILD)
+endef
+
+define libobj
+$(STAMPS)/nvc-$(1)-lib.built
+endef
+
+define _libdep
+$(patsubst $(STAMPS)/nvc-%-lib.built,%,$(filter %-lib.built,$(1)))
+endef
+
+define _mklibdeps
+$(STAMPS)/nvc-$(1)-lib.built: $($(1)-lib)
+endef
+
+define _mkcosim
+$(cosim-dir)/$(1)_cosim.fst: $($(1)-cosim) $(STAMPS)/cocotb.installed \
+                             $(TEST)/runner.py $(TEST)/elab.py
+	$(call _runcosim,$(cosim-dir)/$(1)_cosim.fst,$(call _libdep,$($(1)-cosim)),$(or $($(1)-top),$(1)),$(or $($(1)-module),$(1)_cosim),$(call _cosimsrcs,$(1)))
+endef
+
+# libraries analysis default rule
+$(STAMPS)/nvc-%-lib.built: $(STAMPS)/nvc.installed Makefile nvc.mk
+	@mkdir -p $(nvc-work)
+	$(NVC) $(call _nvcopts,$*) -a $(filter %.vhd,$^)
+	touch $@
+
+################################################################################
+# nvc VHDL simulator build and install
+################################################################################
+nvc-url := https://github.com/nickg/nvc.git
+
+.PHONY: install-nvc
+install-nvc: $(STAMPS)/nvc.installed
+
+$(STAMPS)/nvc.installed: $(STAMPS)/nvc.configured
+	cd $(BUILD)/nvc-build && $(MAKE)
+	cd $(BUILD)/nvc-build && $(MAKE) install
+	touch $@
+
+$(STAMPS)/nvc.configured: | $(BUILD)/nvc-src $(STAMPS)
+	cd $(BUILD)/nvc-src && ./autogen.sh
+	mkdir -p $(BUILD)/nvc-build
+	cd $(BUILD)/nvc-build && $(BUILD)/nvc-src/configure --prefix=$(STAGING)
+	touch $@
+
+$(BUILD)/nvc-src: | $(BUILD)
+	git clone $(nvc-url) $@
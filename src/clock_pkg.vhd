@@ -1,5 +1,6 @@
 library ieee;
 use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
 
 package clock is
 
@@ -15,4 +16,18 @@ component clk_gate_impl is
 	);
 end component clk_gate_impl;
 
+--------------------------------------------------------------------------------
+-- Clock divider: output toggles every cnt + 1 input clock edges, rising and
+-- falling ones, while enabled, i.e. divides input clock frequency by cnt + 1.
+--------------------------------------------------------------------------------
+
+component clk_div is
+	port(
+		en     : in  std_logic;
+		cnt    : in  unsigned(31 downto 0);
+		clk_in : in  std_logic;
+		clk_out: out std_logic
+	);
+end component clk_div;
+
 end package clock;
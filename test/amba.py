@@ -1,177 +1,386 @@
 import cocotb
 from cocotb.triggers import RisingEdge, Timer, ReadOnly
-from cocotb.bus import Bus
-from cocotb.result import ReturnValue
 from cocotb.binary import BinaryValue
+from cocotb.utils import get_sim_time
+from cocotb_bus.monitors import BusMonitor
+from funcov import CoverPoint
+from xactfile import Xact, XactWriter, AxiError
 
-class AxiError(Exception):
-	_errstr = [ "okay", "exclusive access okay", "slave error",
-	            "decode error" ]
-	_dir    = [ "write to", "read from" ]
-        
-	def __init__(self, msg, read, addr, resp):
-		self._msg  = msg + ": " + self._dir[int(read)]
-		self._addr = addr
-		self._resp = resp
+class AxiTimeout(AxiError):
+	def __init__(self, msg, read, addr, cycles):
+		AxiError.__init__(self, msg, read, addr, 0)
+		self._cycles = cycles
 
-        def __str__(self): return "%s @0x%x failed with code %x (%s)".\
-			format(self._msg, self._addr, self._resp,
-			       self._errstr[self._resp])
+	def __str__(self):
+		return "%s @0x%x timed out after %d cycles" % \
+			(self._msg, self._addr, self._cycles)
 
 
 class Axi4lMaster():
 	"""
 	AXI4-Lite Master
+
+	Handshakes wait for at most timeout clock cycles when given, a
+	transaction with any phase timing out raising AxiTimeout.
 	"""
-        
-	def __init__(self, entity, clock, bits):
+
+	# Slave inputs driven by master, in packed stimulus vector order (see
+	# drive.py).
+	inputs = ["areset_n", "awvalid", "awaddr", "awprot", "wvalid", "wdata",
+	          "wstrb", "bready", "arvalid", "araddr", "arprot", "rready"]
+
+	def __init__(self, entity, clock, bits, timeout=None):
 		self._entity = entity
 		self._clk = clock
 		self._bits = bits
+		self.timeout = timeout
 
 
-	@cocotb.coroutine
-	def reset(self, hold_delay=0):
+	async def reset(self, hold_delay=0):
 		# At reset assertion time, master MUST drive arvalid, awvalid
 		# and awvalid to low level in addition to areset_n.
-		self._entity.areset_n <= 0
-		self._entity.arvalid  <= 0
-		self._entity.awvalid  <= 0
-		self._entity.wvalid   <= 0
+		self._entity.areset_n.value = 0
+		self._entity.arvalid.value  = 0
+		self._entity.awvalid.value  = 0
+		self._entity.wvalid.value   = 0
+
+		if hold_delay:
+			await Timer(hold_delay, "step")
+
 
-		yield Timer(hold_delay)
+	async def dereset(self):
+		self._entity.areset_n.value = 1
 
+		await RisingEdge(self._clk)
 
-	@cocotb.coroutine
-        def dereset(self):
-		self._entity.areset_n = 1
 
-		yield RisingEdge(self._clk)
+	async def _handshake(self, signal):
+		# wait for the clock rising edge registering signal assertion ;
+		# return False upon timeout
+		cycles = 0
+		while True:
+			await ReadOnly()
+			if int(signal.value) == 1:
+				break
+			if self.timeout is not None and cycles >= self.timeout:
+				await RisingEdge(self._clk)
+				return False
+			await RisingEdge(self._clk)
+			cycles += 1
+		await RisingEdge(self._clk)
+		return True
 
 
-	@cocotb.coroutine
-	def _wrxact_addr_phase(self, addr, delay):
+	async def _wrxact_addr_phase(self, addr, delay):
 		if (delay):
-			yield Timer(delay)
+			await Timer(delay, "step")
 
 		# address phase
-		self._entity.awvalid = 1
-		self._entity.awaddr  = addr
+		self._entity.awvalid.value = 1
+		self._entity.awaddr.value  = addr
 
-		while True:
-			if int(self._entity.awready) == 1:
-				break
-			yield ReadOnly()
-		yield RisingEdge(self._clk)
+		ok = await self._handshake(self._entity.awready)
 
-		self._entity.awvalid = 0
+		self._entity.awvalid.value = 0
+		return ok
 
 
-	@cocotb.coroutine
-	def _wrxact_data_phase(self, data, delay):
+	async def _wrxact_data_phase(self, data, delay):
 		if (delay):
-			yield Timer(delay)
+			await Timer(delay, "step")
 
 		# data phase
-		self._entity.wvalid = 1
-		self._entity.wdata  = data
+		self._entity.wvalid.value = 1
+		self._entity.wdata.value  = data
 
-		while True:
-			yield ReadOnly()
-			if int(self._entity.wready) == 1:
-				break
-		yield RisingEdge(self._clk)
+		ok = await self._handshake(self._entity.wready)
 
-		self._entity.wvalid = 0
+		self._entity.wvalid.value = 0
+		return ok
 
 
-	@cocotb.coroutine
-	def _wrxact_resp_phase(self, addr, delay):
+	async def _wrxact_resp_phase(self, delay):
 		if (delay):
-			yield Timer(delay)
+			await Timer(delay, "step")
 
-		self._entity.bready = 1
+		self._entity.bready.value = 1
 
-		while True:
-			yield ReadOnly()
-			if int(self._entity.bvalid) == 1:
-				break
-		yield RisingEdge(self._clk)
+		resp = None
+		if await self._handshake(self._entity.bvalid):
+			resp = int(self._entity.bresp.value)
 
-		self._entity.bready = 0
+		self._entity.bready.value = 0
+		return resp
 
 
-	@cocotb.coroutine
-	def wrxact(self, addr, data, addr_delay=0, data_delay=0, resp_delay=0):
+	async def wrxact(self, addr, data, addr_delay=0, data_delay=0,
+	                 resp_delay=0):
 		addr = BinaryValue(addr, bits=self._bits, bigEndian=False)
 		data = BinaryValue(data, bits=self._bits, bigEndian=False)
 
-		addr_phase = cocotb.fork(self._wrxact_addr_phase(addr,
-		                                                 addr_delay))
-		data_phase = cocotb.fork(self._wrxact_data_phase(data,
-		                                                 data_delay))
-		resp_phase = cocotb.fork(self._wrxact_resp_phase(addr,
-		                                                 resp_delay))
+		addr_phase = cocotb.start_soon(self._wrxact_addr_phase(addr,
+		                                                       addr_delay))
+		data_phase = cocotb.start_soon(self._wrxact_data_phase(data,
+		                                                       data_delay))
+		resp = await self._wrxact_resp_phase(resp_delay)
+		ok = await addr_phase
+		ok = await data_phase and ok
 
-		yield addr_phase.join()
-		yield data_phase.join()
-		yield resp_phase.join()
+		if not ok or resp is None:
+			raise AxiTimeout("axi4 lite master", False, int(addr),
+			                 self.timeout)
+		if resp:
+			raise AxiError("axi4 lite master", False, int(addr), resp)
 
-		resp = self._entity.bresp
-		if int(resp):
-			raise AxiError("axi4 lite master", false, int(addr),
-			               resp)
 
-
-	@cocotb.coroutine
-	def _rdxact_addr_phase(self, addr, delay):
+	async def _rdxact_addr_phase(self, addr, delay):
 		if (delay):
-			yield Timer(delay)
+			await Timer(delay, "step")
 
 		# address phase
-		self._entity.arvalid = 1
-		self._entity.araddr  = addr
+		self._entity.arvalid.value = 1
+		self._entity.araddr.value  = addr
 
-		while True:
-			yield ReadOnly()
-			if int(self._entity.arready) == 1:
-				break
-		yield RisingEdge(self._clk)
+		ok = await self._handshake(self._entity.arready)
 
-		self._entity.arvalid = 0
+		self._entity.arvalid.value = 0
+		return ok
 
 
-	@cocotb.coroutine
-	def _rdxact_data_phase(self, delay):
+	async def _rdxact_data_phase(self, delay):
 		if (delay):
-			yield Timer(delay)
+			await Timer(delay, "step")
 
 		# data phase
-		self._entity.rready = 1
+		self._entity.rready.value = 1
 
-		while True:
-			yield ReadOnly()
-			if int(self._entity.rvalid) == 1:
-				break
-		yield RisingEdge(self._clk)
+		res = (None, None)
+		if await self._handshake(self._entity.rvalid):
+			res = (self._entity.rdata.value,
+			       int(self._entity.rresp.value))
 
-		self._entity.rready = 0
+		self._entity.rready.value = 0
+		return res
 
 
-	@cocotb.coroutine
-	def rdxact(self, addr, addr_delay=0, data_delay=0, resp_delay=0):
+	async def rdxact(self, addr, addr_delay=0, data_delay=0, resp_delay=0):
 		addr = BinaryValue(addr, bits=self._bits, bigEndian=False)
 
-		addr_phase = cocotb.fork(self._rdxact_addr_phase(addr,
-		                                                 addr_delay))
-		data_phase = cocotb.fork(self._rdxact_data_phase(data_delay))
+		addr_phase = cocotb.start_soon(self._rdxact_addr_phase(addr,
+		                                                       addr_delay))
+		(data, resp) = await self._rdxact_data_phase(data_delay)
+		ok = await addr_phase
+
+		if not ok or resp is None:
+			raise AxiTimeout("axi4 lite master", True, int(addr),
+			                 self.timeout)
+		if resp:
+			raise AxiError("axi4 lite master", True, int(addr), resp)
 
-		yield addr_phase.join()
-		yield data_phase.join()
+		return data
 
-		resp = self._entity.rresp
-		if int(resp):
-			raise AxiError("axi4 lite master", True, int(addr),
-			               resp)
 
-		raise ReturnValue(self._entity.rdata)
+def addr_kind(addr, size):
+	"""
+	Classify addr against a slave address space of size bytes.
+	"""
+	if addr >= size:
+		return "illegal"
+	return addr & 0x3 and "unaligned" or "aligned"
+
+
+class Axi4lCoverage(object):
+	"""
+	AXI4-Lite functional coverage collector, to be registered as a callback
+	of a monitor sampling the bus several times per clock cycle.
+
+	Covers ordering of write address and data valid assertions relative to
+	clock cycles crossed with write responses, and read responses. When
+	the size of slave address space is given, kinds of accessed addresses
+	are covered as well (see addr_kind()).
+	"""
+
+	# EXOKAY and SLVERR are never returned by slaves under test.
+	_resp = [ ("okay", 0), ("decerr", 3) ]
+
+	def __init__(self, db, clock, size=None):
+		self.wr = db.group("axi4l.wr",
+		                   CoverPoint("order",
+		                              ["aw_first", "same", "w_first"]),
+		                   CoverPoint("bresp", self._resp))
+		self.rd = db.group("axi4l.rd", CoverPoint("rresp", self._resp))
+		self.addr = None
+		if size is not None:
+			self.addr = db.group("axi4l.addr",
+			                     CoverPoint("dir", ["rd", "wr"]),
+			                     CoverPoint("kind",
+			                                ["aligned", "unaligned",
+			                                 "illegal"]))
+		self._size = size
+		self._clk = clock
+		self._prev = 0
+		self._cycle = 0
+		self._aw = None
+		self._w = None
+
+
+	def __call__(self, xact):
+		try:
+			clk = int(xact["aclk"] if "aclk" in xact
+			          else self._clk.value)
+			if clk and not self._prev:
+				self._cycle += 1
+			self._prev = clk
+
+			# record clock cycle of first valid assertion of write
+			# address and data channels till write response.
+			if self._aw is None and int(xact["awvalid"]):
+				self._aw = self._cycle
+			if self._w is None and int(xact["wvalid"]):
+				self._w = self._cycle
+
+			if (int(xact["bvalid"]) and int(xact["bready"]) and
+			    self._aw is not None and self._w is not None):
+				order = (self._aw < self._w and "aw_first" or
+				         self._aw > self._w and "w_first" or
+				         "same")
+				self.wr.sample(order, int(xact["bresp"]))
+				self._aw = self._w = None
+
+			if self.addr is not None:
+				if int(xact["awvalid"]):
+					self.addr.sample("wr",
+					                 addr_kind(int(xact["awaddr"]),
+					                           self._size))
+				if int(xact["arvalid"]):
+					self.addr.sample("rd",
+					                 addr_kind(int(xact["araddr"]),
+					                           self._size))
+
+			if int(xact["rvalid"]) and int(xact["rready"]):
+				self.rd.sample(int(xact["rresp"]))
+		except ValueError:
+			# unresolved values, i.e. bus not reset yet
+			pass
+
+
+def _handshake(valid, ready):
+	return int(valid.value) and int(ready.value)
+
+
+class Axi4lRecorder(BusMonitor):
+	"""
+	AXI4-Lite transaction recorder.
+
+	Rebuild complete transactions from channel handshakes sampled at clock
+	rising edges, i.e. from values registered by slave, and record them into
+	the transaction file located at path (see xactfile.py) if given.
+	Transactions are also passed to registered callbacks.
+	"""
+
+	_signals = ["awvalid", "awready", "awaddr",
+	            "wvalid",  "wready",  "wdata",
+	            "bvalid",  "bready",  "bresp",
+	            "arvalid", "arready", "araddr",
+	            "rvalid",  "rready",  "rdata", "rresp"]
+
+	def __init__(self, entity, clock, path=None):
+		self._writer = path is not None and XactWriter(path) or None
+		BusMonitor.__init__(self, entity, "", clock)
+
+
+	async def _monitor_recv(self):
+		bus = self.bus
+		(awaddr, wdata, araddr) = (None, None, None)
+		try:
+			while True:
+				await RisingEdge(self.clock)
+
+				try:
+					if _handshake(bus.awvalid, bus.awready):
+						awaddr = int(bus.awaddr.value)
+					if _handshake(bus.wvalid, bus.wready):
+						wdata = int(bus.wdata.value)
+					if _handshake(bus.arvalid, bus.arready):
+						araddr = int(bus.araddr.value)
+
+					if (_handshake(bus.bvalid, bus.bready) and
+					    awaddr is not None and
+					    wdata is not None):
+						self._record(Xact(False, awaddr, wdata,
+						                  int(bus.bresp.value),
+						                  get_sim_time()))
+						(awaddr, wdata) = (None, None)
+
+					if (_handshake(bus.rvalid, bus.rready) and
+					    araddr is not None):
+						self._record(Xact(True, araddr,
+						                  int(bus.rdata.value),
+						                  int(bus.rresp.value),
+						                  get_sim_time()))
+						araddr = None
+				except ValueError:
+					# unresolved values, i.e. bus not
+					# reset yet
+					pass
+		finally:
+			# monitor coroutine is killed at end of test
+			if self._writer is not None:
+				self._writer.close()
+
+
+	def _record(self, xact):
+		if self._writer is not None:
+			self._writer.write(xact)
+		self._recv(xact)
+
+
+class Axi4lReplayer(object):
+	"""
+	Replay transactions read from a transaction file through an AXI4-Lite
+	master, back to back, i.e. at maximum bus rate.
+
+	Transaction files are consumed lazily so that replayed sequences may be
+	of any length.
+	"""
+
+	def __init__(self, master, xacts, log):
+		self._mst = master
+		self._xacts = xacts
+		self._log = log
+		self.count = 0
+		self.errors = 0
+		self.mismatches = 0
+
+
+	async def run(self, limit=None):
+		"""
+		Replay at most limit transactions if given. Transactions
+		completing with a response different from the recorded one are
+		counted as errors. Read data differing from recorded ones are
+		counted as mismatches only since timer state depends on timing.
+		"""
+		for x in self._xacts:
+			if limit is not None and self.count >= limit:
+				break
+			self.count += 1
+
+			(data, resp) = (None, 0)
+			try:
+				if x.read:
+					data = await self._mst.rdxact(x.addr)
+				else:
+					await self._mst.wrxact(x.addr, x.data)
+			except AxiError as e:
+				resp = e._resp
+
+			if resp != x.resp:
+				self.errors += 1
+				self._log.error("%s @0x%x: unexpected response "
+				                "(received != expected): %d != %d",
+				                x.read and "read" or "write",
+				                x.addr, resp, x.resp)
+			elif (x.read and data is not None and
+			      int(data) != x.data):
+				self.mismatches += 1
+
@@ -26,7 +26,18 @@ entity axi4ls_regs is
 	     rvalid  : out std_logic;
 	     rready  : in  std_logic;
 	     rdata   : out std_logic_vector(31 downto 0);
-	     rresp   : out std_logic_vector(1 downto 0));
+	     rresp   : out std_logic_vector(1 downto 0);
+	     -- all monitored signals packed into a single vector so that
+	     -- monitors may sample them at once (see test/probe.py)
+	     probe   : out std_logic_vector(243 downto 0);
+	     -- clock generated internally instead of aclk when hclk_en is
+	     -- high (see test/clk_gen.vhd)
+	     hclk_en  : in  std_logic;
+	     hclk_half: in  unsigned(31 downto 0);
+	     -- all slave inputs packed into a single vector, used instead of
+	     -- input ports when stim_en is high (see test/drive.py)
+	     stim_en  : in  std_logic;
+	     stim     : in  std_logic_vector(112 downto 0));
 end entity axi4ls_regs;
 
 architecture behaviour of axi4ls_regs is
@@ -62,6 +73,15 @@ architecture behaviour of axi4ls_regs is
 		     rval    : in  std_logic_vector(31 downto 0));
 	end component axi4l_slave;
 
+	component clk_gen is
+		port(en  : in  std_logic;
+		     half: in  unsigned(31 downto 0);
+		     clk : out std_logic);
+	end component clk_gen;
+
+	signal hclk_a : std_logic;
+	signal aclk_a : std_logic;
+
 	signal we_a   : std_logic;
 	signal wreg_a : natural range 0 to 2;
 	signal wval_a : std_logic_vector(31 downto 0);
@@ -72,22 +92,83 @@ architecture behaviour of axi4ls_regs is
 	signal stor0_a: std_logic_vector(31 downto 0);
 	signal stor1_a: std_logic_vector(31 downto 0);
 	signal stor2_a: std_logic_vector(31 downto 0);
+
+	-- slave inputs, decoded from either input ports or stim vector
+	signal areset_n_a: std_logic;
+	signal awvalid_a : std_logic;
+	signal awaddr_a  : std_logic_vector(31 downto 0);
+	signal awprot_a  : std_logic_vector(2 downto 0);
+	signal wvalid_a  : std_logic;
+	signal wdata_a   : std_logic_vector(31 downto 0);
+	signal wstrb_a   : std_logic_vector(3 downto 0);
+	signal bready_a  : std_logic;
+	signal arvalid_a : std_logic;
+	signal araddr_a  : std_logic_vector(31 downto 0);
+	signal arprot_a  : std_logic_vector(3 downto 0);
+	signal rready_a  : std_logic;
+
+	-- slave outputs, read back to feed probe vector
+	signal awready_a: std_logic;
+	signal wready_a : std_logic;
+	signal bvalid_a : std_logic;
+	signal bresp_a  : std_logic_vector(1 downto 0);
+	signal arready_a: std_logic;
+	signal rvalid_a : std_logic;
+	signal rdata_a  : std_logic_vector(31 downto 0);
+	signal rresp_a  : std_logic_vector(1 downto 0);
 begin
+	hclk: clk_gen port map (hclk_en, hclk_half, hclk_a);
+
+	aclk_a <= hclk_a when hclk_en = '1' else aclk;
+
+	-- Keep in sync with amba.Axi4lMaster.inputs.
+	areset_n_a <= stim(112) when stim_en = '1' else areset_n;
+	awvalid_a  <= stim(111) when stim_en = '1' else awvalid;
+	awaddr_a   <= stim(110 downto 79) when stim_en = '1' else awaddr;
+	awprot_a   <= stim(78 downto 76) when stim_en = '1' else awprot;
+	wvalid_a   <= stim(75) when stim_en = '1' else wvalid;
+	wdata_a    <= stim(74 downto 43) when stim_en = '1' else wdata;
+	wstrb_a    <= stim(42 downto 39) when stim_en = '1' else wstrb;
+	bready_a   <= stim(38) when stim_en = '1' else bready;
+	arvalid_a  <= stim(37) when stim_en = '1' else arvalid;
+	araddr_a   <= stim(36 downto 5) when stim_en = '1' else araddr;
+	arprot_a   <= stim(4 downto 1) when stim_en = '1' else arprot;
+	rready_a   <= stim(0) when stim_en = '1' else rready;
+
 	bus_a: axi4l_slave generic map (REG_NR => 3)
-	                   port map (aclk, areset_n, awvalid, awready,
-	                             awaddr, awprot, wvalid, wready, wdata,
-	                             wstrb, bvalid, bready, bresp, arvalid,
-	                             arready, araddr, arprot, rvalid,
-	                             rready, rdata, rresp, we_a, wreg_a,
-	                             wval_a, re_a, rreg_a, rval_a);
-
-	comb: process (areset_n, we_a, wreg_a, wval_a, re_a, rreg_a) is
+	                   port map (aclk_a, areset_n_a, awvalid_a, awready_a,
+	                             awaddr_a, awprot_a, wvalid_a, wready_a,
+	                             wdata_a, wstrb_a, bvalid_a, bready_a,
+	                             bresp_a, arvalid_a, arready_a, araddr_a,
+	                             arprot_a, rvalid_a, rready_a, rdata_a,
+	                             rresp_a, we_a, wreg_a, wval_a, re_a,
+	                             rreg_a, rval_a);
+
+	awready <= awready_a;
+	wready  <= wready_a;
+	bvalid  <= bvalid_a;
+	bresp   <= bresp_a;
+	arready <= arready_a;
+	rvalid  <= rvalid_a;
+	rdata   <= rdata_a;
+	rresp   <= rresp_a;
+
+	-- Keep in sync with Axi4lSlaveBusMonitor._probe_fields.
+	probe   <= aclk_a & areset_n_a &
+	           awvalid_a & awaddr_a & awready_a &
+	           wvalid_a & wready_a & wdata_a & wstrb_a &
+	           bvalid_a & bready_a & bresp_a &
+	           arvalid_a & araddr_a & arready_a &
+	           rvalid_a & rready_a & rresp_a & rdata_a &
+	           stor0_a & stor1_a & stor2_a;
+
+	comb: process (areset_n_a, we_a, wreg_a, wval_a, re_a, rreg_a) is
 	variable val_p : std_logic_vector(31 downto 0) := (others => '0');
 	variable reg0_p: std_logic_vector(31 downto 0) := (others => '0');
 	variable reg1_p: std_logic_vector(31 downto 0) := (others => '0');
 	variable reg2_p: std_logic_vector(31 downto 0) := (others => '0');
 	begin
-		if (areset_n = '0') then
+		if (areset_n_a = '0') then
 			val_p  := (others => '0');
 			reg0_p := (others => '0');
 			reg1_p := (others => '0');
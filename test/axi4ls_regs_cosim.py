@@ -1,136 +1,42 @@
+import os
 import random
-import time
 import cocotb
-import logging
 
 from cocotb.utils import get_sim_time
 from cocotb.binary import BinaryValue
-from cocotb.clock import Clock
-from cocotb.monitors import BusMonitor
-from cocotb.scoreboard import Scoreboard
+from cocotb_bus.scoreboard import Scoreboard
 from cocotb.triggers import Timer
 from cocotb.triggers import RisingEdge
-from cocotb.result import TestFailure
-from cocotb.regression import TestFactory
-
-class Axi4lSlaveBusMonitor(BusMonitor):
+from watchdog import TestFactory
+from monitor import BaseMonitor
+from amba import Axi4lMaster, Axi4lCoverage
+from funcov import database, cover_stop
+from stimulus import Axi4lRandom
+from clocking import TbClock
+from sigtrace import trace_path
+from drive import drive_view, packed_drive
+
+class Axi4lSlaveBusMonitor(BaseMonitor):
 	"""
 	AXI lite slave bus monitor
 	"""
-	
-	def __init__(self, entity, scoreboard):
-		# declare signals to be monitored
-		self._signals = ["awvalid", "awaddr", "awready",
-		                 "wvalid" , "wready", "wdata",   "wstrb",
-		                 "bvalid",  "bready", "bresp",
-		                 "arvalid", "araddr", "arready",
-		                 "rvalid",  "rready", "rresp",   "rdata",
-		                 "stor0_a", "stor1_a", "stor2_a" ]
-		BusMonitor.__init__(self, entity, "",
-		                    entity.aclk, reset_n=entity.areset_n)
-
-		self._expected = None
-		self._log = logging.getLogger(scoreboard.log.name +
-		                              '.' +
-		                              self.name)
-		self._scoreboard = scoreboard
-		scoreboard.add_interface(self, [], compare_fn=self.compare)
-
-
-	def _print_expected(self, key, value):
-		try:
-			self._log.info("    %s: %s (0x%x)",
-			               key, str(value), int(value))
-		except :
-			self._log.info("    %s: %s", key, str(value))
-
-
-	def _print_diff(self, key, value, expect):
-		try:
-			self._log.info("    %s: %s != %s (0x%x != 0x%x)",
-			               key, str(expect), str(value),
-			               int(expect), int(value))
-		except :
-			self._log.info("    %s: %s != %s",
-			               key, str(expect), str(value))
-
-
-	def failure(self, message):
-		self._scoreboard.errors += 1
-		if self._scoreboard._imm:
-			raise TestFailure(message)
-		else:
-			self._log.error(message)
-
-
-	def compare(self, transaction):
-		if self._expected == None:
-			return
-
-		self._log.debug("Checking " + self._expected["name"] + "...")
-
-		wrong = False
-		# validate transaction against signals present into expected
-		# output
-		for k,v in transaction.items():
-			if (self._expected.has_key(k) and
-			    (k != "name") and
-			    (not str(v) == str(self._expected[k]))):
-				wrong = True
-				break
-
-		if wrong:
-			self._log.error("Received unexpected %s" %
-			                (self._expected.has_key("name") == True
-			                 and self._expected["name"] or
-			                 "anonymous transaction"))
-
-			self._log.info("Expected:")
-			for k, v in sorted(self._expected.items()):
-				if k != "name":
-					self._print_expected(k, v)
-
-			self._log.info("Received:")
-			for k, v in sorted(transaction.items()):
-				if k != "name":
-					self._print_expected(k, v)
 
-			self._log.info("Diff:")
-			for k, v in sorted(transaction.items()):
-				if ((k == "name") or
-				    (not self._expected.has_key(k))):
-					continue
-				if not str(v) == str(self._expected[k]):
-					self._print_diff(k, v,
-					                 self._expected[k])
+	# declare signals to be monitored
+	_signals = ["awvalid", "awaddr", "awready",
+	            "wvalid" , "wready", "wdata",   "wstrb",
+	            "bvalid",  "bready", "bresp",
+	            "arvalid", "araddr", "arready",
+	            "rvalid",  "rready", "rresp",   "rdata",
+	            "stor0_a", "stor1_a", "stor2_a" ]
+	_probe_fields = ["aclk", "areset_n"] + _signals
 
-			self._scoreboard.errors += 1
-			if self._scoreboard._imm:
-				raise TestFailure("Received unexpected transaction")
+	def __init__(self, entity, clock, scoreboard, probe=False):
+		BaseMonitor.__init__(self, entity, clock, scoreboard,
+		                     reset_n=entity.areset_n, probe=probe)
 
-		self._expected = None
 
-
-	@cocotb.coroutine
-	def expect(self, expected):
-		assert(self._expected == None)
-		self._expected = expected
-
-		yield self.wait_for_recv()
-
-
-	@cocotb.coroutine
-	def _monitor_recv(self):
-		while True:
-			yield Timer(clk_t / 16)
-
-			# build transaction from the entire list of declared
-			# signals
-			transaction = {}
-			for sig in self._signals:
-				transaction[sig] = getattr(self.bus, sig)
-
-			self._recv(transaction)
+	async def _sample(self):
+		await Timer(clk_t // 16, "step")
 
 
 class Axi4lSlaveTB:
@@ -138,43 +44,76 @@ class Axi4lSlaveTB:
 	AXI lite slave test bench
 	"""
 	
-	def __init__(self, entity, fail_immediately):
+	def __init__(self, entity, fail_immediately, trace=None, live=True,
+	             probe=True):
 		self._entity = entity
+		self._io = drive_view(entity, Axi4lMaster.inputs)
+		self._live = live
+		# monitor MUST observe inputs decoded from stimulus vector
+		probe = probe or packed_drive
+		self._clk = TbClock(entity, "aclk")
 		self._sbrd = Scoreboard(entity,
 		                        fail_immediately=fail_immediately)
-		self._omon = Axi4lSlaveBusMonitor(entity, self._sbrd)
+		self._omon = Axi4lSlaveBusMonitor(entity, self.clock, self._sbrd,
+		                                  probe)
+		self.coverage = None
+		if not live:
+			# Protocol invariants are checked offline from a dump of
+			# the whole run (see checker.py): sample signals on
+			# demand only instead of continuously.
+			self._omon.kill()
+		else:
+			self.coverage = Axi4lCoverage(database(), self.clock,
+			                              4 * regs_nr)
+			self._omon.add_callback(self.coverage)
+			if trace is not None:
+				self._omon.trace(trace)
+
+
+	@property
+	def clock(self):
+		return self._clk.signal
 
 
-	@cocotb.coroutine
-	def _toggle_clock(self, period, start_delay):
-		self._entity.aclk = 0
-		yield Timer(start_delay)
-		yield Clock(self._entity.aclk, period).start()
+	async def _toggle_clock(self, period, start_delay):
+		self._entity.aclk.value = 0
+		await Timer(start_delay, "step")
+		self._clk.start(period)
 
 
-	@cocotb.coroutine
-	def expect(self, expected):
-		yield self._omon.expect(expected)
+	async def expect(self, expected, invariant=False):
+		if self._live:
+			await self._omon.expect(expected)
+		elif not invariant:
+			await Timer(clk_t // 16, "step")
+			self._omon.check(expected)
+
+
+	def cover_closed(self, group, **where):
+		"""
+		Return True when running in coverage driven mode and target bins
+		of group are all hit, i.e. stimulus generation may stop.
+		"""
+		return cover_stop and database().closed(group, **where)
 
 
 	def start_clock(self, period, start_delay):
-		return cocotb.fork(self._toggle_clock(clk_t, start_delay))
+		return cocotb.start_soon(self._toggle_clock(period, start_delay))
 
 
-	@cocotb.coroutine
-	def assert_reset(self, hold_delay):
+	async def assert_reset(self, hold_delay):
 		# At reset assertion time, master MUST drive arvalid, awvalid
 		# and awvalid to low level in addition to areset_n.
-		self._entity.arvalid  = 0
-		self._entity.awvalid  = 0
-		self._entity.wvalid   = 0
-		self._entity.areset_n = 0
+		self._io.arvalid.value = 0
+		self._io.awvalid.value = 0
+		self._io.wvalid.value = 0
+		self._io.areset_n.value = 0
                 
                 # This is optional: just to ease waveform analysis.
-		self._entity.rready   = 0
-		self._entity.bready   = 0
+		self._io.rready.value = 0
+		self._io.bready.value = 0
 
-		yield Timer(hold_delay)
+		await Timer(hold_delay, "step")
 
 		# While reset asserted, slave MUST drive rvalid and bvalid LOW.
 		# All other signals can be driven to any value.
@@ -189,14 +128,13 @@ class Axi4lSlaveTB:
 		        "bvalid"  : BinaryValue(0),
 		        "rvalid"  : BinaryValue(0)
 		}
-		yield self.expect(exp)
+		await self.expect(exp, invariant=True)
 
 
-	@cocotb.coroutine
-	def deassert_reset(self, post_delay):
-		self._entity.areset_n = 1
+	async def deassert_reset(self, post_delay):
+		self._io.areset_n.value = 1
 
-		yield Timer(post_delay)
+		await Timer(post_delay, "step")
 
 		# While reset asserted, slave MUST drive rvalid and bvalid LOW.
 		# All other signals can be driven to any value.
@@ -211,9 +149,9 @@ class Axi4lSlaveTB:
 		        "bvalid"  : BinaryValue(0),
 		        "rvalid"  : BinaryValue(0)
 		}
-		yield self.expect(exp)
+		await self.expect(exp, invariant=True)
 
-		yield RisingEdge(self._entity.aclk)
+		await RisingEdge(self.clock)
 
 		# At clock rising edge following reset deassertion, slave SHOULD
                 # drive awready and wready high. bvalid and rvalid MUST stay
@@ -228,89 +166,84 @@ class Axi4lSlaveTB:
 		        "bvalid"  : BinaryValue(0),
 		        "rvalid"  : BinaryValue(0)
 		}
-		yield self.expect(exp)
+		await self.expect(exp, invariant=True)
 
 
-	@cocotb.coroutine
-	def start(self, period):
+	async def start(self, period):
 		self.start_clock(period, period)
-		yield Timer(period / 2)
-		yield self.assert_reset(3 * period / 4)
-		yield self.deassert_reset(period / 4)
+		await Timer(period // 2, "step")
+		await self.assert_reset(3 * period // 4)
+		await self.deassert_reset(period // 4)
 
 
-	@cocotb.coroutine
-	def _wrxact_addr_phase(self, addr, delay):
+	async def _wrxact_addr_phase(self, addr, delay):
 		if (delay):
-		    yield Timer(delay)
+		    await Timer(delay, "step")
 
 		# address phase
-		self._entity.awvalid = 1
-		self._entity.awaddr  = addr
+		self._io.awvalid.value = 1
+		self._io.awaddr.value = addr
 
 		tmout = get_sim_time() + (100 * clk_t)
 		while True:
-			if int(self._entity.awready) == 1:
+			if int(self._entity.awready.value) == 1:
 				break
 			if get_sim_time() >= tmout:
 				self._omon.failure("Timeout while waiting for" \
 				                   " awready assertion")
 				return
-			yield Timer(clk_t / 16)
+			await Timer(clk_t // 16, "step")
 
-		yield RisingEdge(self._entity.aclk)
+		await RisingEdge(self.clock)
 
-		self._entity.awvalid = 0
+		self._io.awvalid.value = 0
 
 
-	@cocotb.coroutine
-	def _wrxact_data_phase(self, data, delay):
+	async def _wrxact_data_phase(self, data, delay):
 		if (delay):
-		    yield Timer(delay)
+		    await Timer(delay, "step")
 
 		# data phase
-		self._entity.wvalid = 1
-		self._entity.wdata  = data
+		self._io.wvalid.value = 1
+		self._io.wdata.value = data
 
 		tmout = get_sim_time() + (100 * clk_t)
 		while True:
-			if int(self._entity.wready) == 1:
+			if int(self._entity.wready.value) == 1:
 				break
 			if get_sim_time() >= tmout:
 				self._omon.failure("Timeout while waiting for" \
 				                   " wready assertion")
 				return
-			yield Timer(clk_t / 16)
+			await Timer(clk_t // 16, "step")
 
-		yield RisingEdge(self._entity.aclk)
+		await RisingEdge(self.clock)
 
-		self._entity.wvalid = 0
+		self._io.wvalid.value = 0
 
 
-	@cocotb.coroutine
-	def _wrxact_resp_phase(self, delay):
+	async def _wrxact_resp_phase(self, delay):
 		if (delay):
-		    yield Timer(delay)
+		    await Timer(delay, "step")
 
-		self._entity.bready = 1
+		self._io.bready.value = 1
 
 		tmout = get_sim_time() + (100 * clk_t)
 		while True:
-			if int(self._entity.bvalid) == 1:
+			if int(self._entity.bvalid.value) == 1:
 				break
 			if get_sim_time() >= tmout:
 				self._omon.failure("Timeout while waiting for" \
 				                   " bvalid assertion")
 				return
-			yield Timer(clk_t / 16)
+			await Timer(clk_t // 16, "step")
 
-		yield RisingEdge(self._entity.aclk)
+		await RisingEdge(self.clock)
 
-		self._entity.bready = 0
+		self._io.bready.value = 0
 
 
-	@cocotb.coroutine
-	def wrxact(self, addr, addr_delay, data, data_delay, resp, resp_delay):
+	async def wrxact(self, addr, addr_delay, data, data_delay, resp, resp_delay):
 		# validate preconditions
 		exp = { "name"    : "write transaction preconditions",
 		        "areset_n": BinaryValue(1),
@@ -321,18 +254,18 @@ class Axi4lSlaveTB:
 		        "bvalid"  : BinaryValue(0),
 		        "bready"  : BinaryValue(0)
 		}
-		yield self.expect(exp)
+		await self.expect(exp)
 
 		addr = BinaryValue(addr, bits=32, bigEndian=False)
 		data = BinaryValue(data, bits=32)
 
-		addr_phase = cocotb.fork(self._wrxact_addr_phase(addr,
-		                                                 addr_delay))
-		data_phase = cocotb.fork(self._wrxact_data_phase(data,
-		                                                 data_delay))
-		yield self._wrxact_resp_phase(resp_delay)
-		yield addr_phase.join()
-		yield data_phase.join()
+		addr_phase = cocotb.start_soon(self._wrxact_addr_phase(addr,
+		                                                       addr_delay))
+		data_phase = cocotb.start_soon(self._wrxact_data_phase(data,
+		                                                       data_delay))
+		await self._wrxact_resp_phase(resp_delay)
+		await addr_phase
+		await data_phase
                 
 		# validate phases postconditions
 		exp = { "areset_n": BinaryValue(1),
@@ -345,72 +278,69 @@ class Axi4lSlaveTB:
 		        "bvalid"  : BinaryValue(0),
 		        "bready"  : BinaryValue(0),
                         "bresp"   : BinaryValue(resp, bits=2),
-                        "stor0_a" : self._entity.stor0_a,
-		        "stor1_a" : self._entity.stor1_a,
-		        "stor2_a" : self._entity.stor2_a
+                        "stor0_a" : self._entity.stor0_a.value,
+		        "stor1_a" : self._entity.stor1_a.value,
+		        "stor2_a" : self._entity.stor2_a.value
 		}
 		if resp == 0:
 			exp["name"]  = "valid write transaction postconditions"
-			stor         = "stor" + str(int(addr) / 4) + "_a"
+			stor         = "stor" + str(int(addr) // 4) + "_a"
 			exp[stor]    = data
 		else:
 			exp["name"]  = "invalid write transaction " \
 			               "postconditions"
-		yield self.expect(exp)
+		await self.expect(exp)
 
 
-	@cocotb.coroutine
-	def _rdxact_addr_phase(self, addr, delay):
+	async def _rdxact_addr_phase(self, addr, delay):
 		if (delay):
-		    yield Timer(delay)
+		    await Timer(delay, "step")
 
 		# address phase
-		self._entity.arvalid = 1
-		self._entity.araddr  = addr
+		self._io.arvalid.value = 1
+		self._io.araddr.value = addr
 
 		tmout = get_sim_time() + (100 * clk_t)
 		while True:
-			if int(self._entity.arready) == 1:
+			if int(self._entity.arready.value) == 1:
 				break
 			if get_sim_time() >= tmout:
 				self._omon.failure("Timeout while waiting for" \
 				                   " arready assertion")
 				return
-			yield Timer(clk_t / 16)
+			await Timer(clk_t // 16, "step")
 
-		yield RisingEdge(self._entity.aclk)
+		await RisingEdge(self.clock)
 
-		self._entity.arvalid = 0
+		self._io.arvalid.value = 0
 
 
-	@cocotb.coroutine
-	def _rdxact_data_phase(self, output, delay):
+	async def _rdxact_data_phase(self, output, delay):
 		if (delay):
-		    yield Timer(delay)
+		    await Timer(delay, "step")
 
 		# data phase
-		self._entity.rready = 1
+		self._io.rready.value = 1
 
 		tmout = get_sim_time() + (100 * clk_t)
 		while True:
-			if int(self._entity.rvalid) == 1:
+			if int(self._entity.rvalid.value) == 1:
 				break
 			if get_sim_time() >= tmout:
 				self._omon.failure("Timeout while waiting for" \
 				                   " rvalid assertion")
 				return
-			yield Timer(clk_t / 16)
+			await Timer(clk_t // 16, "step")
 
-		output["data"] = self._entity.rdata
-		output["resp"] = self._entity.rresp
+		output["data"] = self._entity.rdata.value
+		output["resp"] = self._entity.rresp.value
                 
-		yield RisingEdge(self._entity.aclk)
+		await RisingEdge(self.clock)
 
-		self._entity.rready = 0
+		self._io.rready.value = 0
 
 
-	@cocotb.coroutine
-	def rdxact(self, addr, addr_delay, data, resp, data_delay):
+	async def rdxact(self, addr, addr_delay, data, resp, data_delay):
 		# validate preconditions
 		exp = { "name"    : "read transaction preconditions",
 		        "areset_n": BinaryValue(1),
@@ -419,15 +349,15 @@ class Axi4lSlaveTB:
 		        "rvalid"  : BinaryValue(0),
 		        "rready"  : BinaryValue(0)
 		}
-		yield self.expect(exp)
+		await self.expect(exp)
 
 		addr = BinaryValue(addr, bits=32, bigEndian=False)
 		res = { }
 
-		addr_phase = cocotb.fork(self._rdxact_addr_phase(addr,
-		                                                 addr_delay))
-		yield self._rdxact_data_phase(res, data_delay)
-		yield addr_phase.join()
+		addr_phase = cocotb.start_soon(self._rdxact_addr_phase(addr,
+		                                                       addr_delay))
+		await self._rdxact_data_phase(res, data_delay)
+		await addr_phase
                 
 		# validate phases postconditions
 		exp = { "areset_n": BinaryValue(1),
@@ -443,116 +373,171 @@ class Axi4lSlaveTB:
 			exp["rdata"] = BinaryValue(data, bits=32)
 		else:
 			exp["name"]  = "invalid read transaction postconditions"
-		yield self.expect(exp)
+		await self.expect(exp)
 
 
-@cocotb.coroutine
-def axi4ls_test_reset(dut, clk_delay, reset_hold, post_delay):
+async def axi4ls_test_reset(dut, clk_delay, reset_hold, post_delay):
 	""" AXI lite slave asynchronous reset / synchronous de-reset"""
-	tb = Axi4lSlaveTB(dut, exit_on_fail)
-	tb = Axi4lSlaveTB(dut, exit_on_fail)
+	tb = Axi4lSlaveTB(dut, exit_on_fail, trace_path(dut._name), live_check)
 
 	tb.start_clock(clk_t, clk_delay)
-	yield Timer(clk_t)
-	yield tb.assert_reset(reset_hold)
-	yield tb.deassert_reset(post_delay)
+	await Timer(clk_t, "step")
+	await tb.assert_reset(reset_hold)
+	await tb.deassert_reset(post_delay)
 
 
-@cocotb.coroutine
-def axi4ls_test_wrxact(dut, addr, resp, addr_delay, data_delay, resp_delay,
+async def axi4ls_test_wrxact(dut, addr, resp, addr_delay, data_delay, resp_delay,
                       post_cycles):
 	""" AXI lite slave write transaction"""
-	tb = Axi4lSlaveTB(dut, exit_on_fail)
-	tb = Axi4lSlaveTB(dut, exit_on_fail)
+	tb = Axi4lSlaveTB(dut, exit_on_fail, trace_path(dut._name), live_check)
+	if tb.cover_closed("axi4l.wr", bresp=resp):
+		dut._log.info("write coverage closed: skipped")
+		return
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
 
 	data = random.getrandbits(32)
 
 	for t in range(0, xact_nr):
-		yield tb.wrxact(addr, addr_delay, data, data_delay, resp,
+		if tb.cover_closed("axi4l.wr", bresp=resp):
+			break
+		await tb.wrxact(addr, addr_delay, data, data_delay, resp,
 		                resp_delay)
 		data = data + 1
 		for e in range(0, post_cycles):
-			yield RisingEdge(dut.aclk)
+			await RisingEdge(tb.clock)
 
 
-@cocotb.coroutine
-def axi4ls_test_valid_rdxact(dut, addr_delay, data_delay, post_cycles):
+async def axi4ls_test_valid_rdxact(dut, addr_delay, data_delay, post_cycles):
 	""" AXI lite slave valid read transaction"""
-	tb = Axi4lSlaveTB(dut, exit_on_fail)
-	tb = Axi4lSlaveTB(dut, exit_on_fail)
+	tb = Axi4lSlaveTB(dut, exit_on_fail, trace_path(dut._name), live_check)
+	if tb.cover_closed("axi4l.rd", rresp=0):
+		dut._log.info("read coverage closed: skipped")
+		return
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
 
 	for t in range(0, xact_nr - 1):
+		if tb.cover_closed("axi4l.rd", rresp=0):
+			break
 		data = (random.getrandbits(32),
 		        random.getrandbits(32),
 		        random.getrandbits(32))
 
-		yield tb.wrxact(0, 0, data[0], 0, 0, 0);
-		yield tb.wrxact(4, 0, data[1], 0, 0, 0);
-		yield tb.wrxact(8, 0, data[2], 0, 0, 0);
+		await tb.wrxact(0, 0, data[0], 0, 0, 0);
+		await tb.wrxact(4, 0, data[1], 0, 0, 0);
+		await tb.wrxact(8, 0, data[2], 0, 0, 0);
 		for e in range(0, post_cycles):
-			yield RisingEdge(dut.aclk)
+			await RisingEdge(tb.clock)
 
-		yield tb.rdxact(0, 0, data[0], 0, 0)
-		yield tb.rdxact(4, 0, data[1], 0, 0)
-		yield tb.rdxact(8, 0, data[2], 0, 0)
+		await tb.rdxact(0, 0, data[0], 0, 0)
+		await tb.rdxact(4, 0, data[1], 0, 0)
+		await tb.rdxact(8, 0, data[2], 0, 0)
 		for e in range(0, post_cycles):
-			yield RisingEdge(dut.aclk)
+			await RisingEdge(tb.clock)
 
 
-@cocotb.coroutine
-def axi4ls_test_invalid_rdxact(dut, addr_delay, data_delay, post_cycles):
+async def axi4ls_test_invalid_rdxact(dut, addr_delay, data_delay, post_cycles):
 	""" AXI lite slave invalid read transaction"""
-	tb = Axi4lSlaveTB(dut, exit_on_fail)
-	tb = Axi4lSlaveTB(dut, exit_on_fail)
+	tb = Axi4lSlaveTB(dut, exit_on_fail, trace_path(dut._name), live_check)
+	if tb.cover_closed("axi4l.rd", rresp=3):
+		dut._log.info("read coverage closed: skipped")
+		return
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
 
 	for t in range(0, xact_nr - 1):
-		yield tb.rdxact(14, 0, random.getrandbits(32), 3, 0)
+		if tb.cover_closed("axi4l.rd", rresp=3):
+			break
+		await tb.rdxact(14, 0, random.getrandbits(32), 3, 0)
 		for e in range(0, post_cycles):
-			yield RisingEdge(dut.aclk)
+			await RisingEdge(tb.clock)
+
+async def axi4ls_test_random(dut, xacts, bias):
+	""" AXI lite slave constrained random transactions"""
+	tb = Axi4lSlaveTB(dut, exit_on_fail, trace_path(dut._name), live_check)
+
+	seed = random.getrandbits(32)
+	dut._log.info("random seed: %d", seed)
+	gen = Axi4lRandom(clk_t, 4 * regs_nr, tb.coverage, bias,
+	                  random.Random(seed))
+
+	await tb.start(clk_t)
+
+	# initialize registers so that read data are known
+	stor = []
+	for r in range(regs_nr):
+		stor.append(random.getrandbits(32))
+		await tb.wrxact(4 * r, 0, stor[r], 0, 0, 0)
+
+	count = 0
+	while count < xacts:
+		if (cover_stop and tb.coverage is not None and
+		    tb.coverage.wr.closed() and tb.coverage.rd.closed() and
+		    tb.coverage.addr.closed()):
+			break
+		count += 1
+
+		x = gen.next()
+		if x.read:
+			await tb.rdxact(x.addr, x.addr_delay,
+			                not x.resp and stor[x.addr >> 2] or 0,
+			                x.resp, x.data_delay)
+		else:
+			await tb.wrxact(x.addr, x.addr_delay, x.data,
+			                x.data_delay, x.resp, x.resp_delay)
+			if not x.resp:
+				stor[x.addr >> 2] = x.data
+		for e in range(0, x.post_cycles):
+			await RisingEdge(tb.clock)
+
+	if tb.coverage is not None:
+		dut._log.info("%d random transactions", count)
+		database().report(dut._log)
 
-random.seed(time.time())
 clk_t = 2000
+regs_nr = 3
 xact_nr = 3
 exit_on_fail=True
+live_check = not os.getenv("OFFLINE_CHECK")
 
 fact = TestFactory(axi4ls_test_reset)
-fact.add_option("clk_delay",  [clk_t / 2, clk_t, 3 * clk_t / 2])
-fact.add_option("reset_hold", [clk_t / 4, clk_t / 2, clk_t / 3, clk_t])
-fact.add_option("post_delay", [clk_t / 4, clk_t / 2, clk_t / 3, clk_t])
+fact.add_option("clk_delay",  [clk_t // 2, clk_t, 3 * clk_t // 2])
+fact.add_option("reset_hold", [clk_t // 4, clk_t // 2, clk_t // 3, clk_t])
+fact.add_option("post_delay", [clk_t // 4, clk_t // 2, clk_t // 3, clk_t])
 fact.generate_tests()
 
 fact = TestFactory(axi4ls_test_wrxact)
 fact.add_option("addr",        [0, 1, 4, 6, 8, 11])
-fact.add_option("addr_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
-fact.add_option("data_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
-fact.add_option("resp_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
+fact.add_option("addr_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
+fact.add_option("data_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
+fact.add_option("resp_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
 fact.add_option("resp",        [0])
 fact.add_option("post_cycles", [0, 1, 4])
 fact.generate_tests("valid_")
 
 fact = TestFactory(axi4ls_test_wrxact)
 fact.add_option("addr",        [12])
-fact.add_option("addr_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
-fact.add_option("data_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
-fact.add_option("resp_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
+fact.add_option("addr_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
+fact.add_option("data_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
+fact.add_option("resp_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
 fact.add_option("resp",        [3])
 fact.add_option("post_cycles", [0, 1, 4])
 fact.generate_tests("invalid_")
 
 fact = TestFactory(axi4ls_test_valid_rdxact)
-fact.add_option("addr_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
-fact.add_option("data_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
+fact.add_option("addr_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
+fact.add_option("data_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
 fact.add_option("post_cycles", [0, 1, 4])
 fact.generate_tests()
 
 fact = TestFactory(axi4ls_test_invalid_rdxact)
-fact.add_option("addr_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
-fact.add_option("data_delay",  [0, clk_t / 2, 3 * clk_t / 4, 5 * clk_t / 4])
+fact.add_option("addr_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
+fact.add_option("data_delay",  [0, clk_t // 2, 3 * clk_t // 4, 5 * clk_t // 4])
 fact.add_option("post_cycles", [0, 1, 4])
 fact.generate_tests()
+
+fact = TestFactory(axi4ls_test_random)
+fact.add_option("xacts", [256])
+fact.add_option("bias",  [0, 0.75])
+fact.generate_tests()
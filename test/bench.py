@@ -0,0 +1,103 @@
+"""
+Simulation performance measurement helpers.
+
+Run as a script to compare simulator backends throughput from reports saved
+by simrate_cosim.py:
+
+    python bench.py <PERF_DIR>/simrate_*.json
+"""
+
+import json
+import os
+import sys
+import time
+
+def save_report(name, rep):
+	"""
+	Save rep as the JSON report name under PERF_DIR if not empty.
+	"""
+	directory = os.getenv("PERF_DIR")
+	if not directory:
+		return
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	with open(os.path.join(directory, name + ".json"), "w") as f:
+		json.dump(rep, f, indent=1, sort_keys=True)
+
+
+class SimRate(object):
+	"""
+	Measure simulation throughput in clock cycles of given period per wall
+	clock second, starting from instantiation time.
+	"""
+
+	def __init__(self, period):
+		# keep comparison usable outside of the simulator
+		from cocotb.utils import get_sim_time
+
+		self._now = get_sim_time
+		self._period = period
+		self.restart()
+
+
+	def restart(self):
+		self._sim = self._now()
+		self._wall = time.time()
+
+
+	def cycles(self):
+		return (self._now() - self._sim) // self._period
+
+
+	def report(self, log, what="simulation"):
+		"""
+		Log and return throughput measured since instantiation or last
+		restart.
+		"""
+		wall = time.time() - self._wall
+		cyc = self.cycles()
+		rate = wall and (cyc / wall) or 0.0
+		log.info("%s: %d cycles in %.3f s (%.1f cycles/s)",
+		         what, cyc, wall, rate)
+		return rate
+
+
+def compare(reports):
+	"""
+	Return lines of a table of simulated cycles per second of each toplevel
+	(rows) for each backend (columns), the fastest backend of each toplevel
+	being marked with a star.
+	"""
+	rates = {}
+	for r in reports:
+		rates.setdefault(r["toplevel"], {})[r["backend"]] = r["rate"]
+	backends = sorted(set(b for t in rates.values() for b in t))
+
+	width = max([len(t) for t in rates] + [8])
+	lines = ["%-*s %s" % (width, "toplevel",
+	                      " ".join("%14s" % b for b in backends))]
+	for (top, t) in sorted(rates.items()):
+		best = max(t, key=t.get)
+		cells = []
+		for b in backends:
+			if b not in t:
+				cells.append("%14s" % "-")
+			else:
+				cells.append("%13.1f%s" % (t[b], b == best and "*"
+				                                 or " "))
+		lines.append("%-*s %s" % (width, top, " ".join(cells)))
+	return lines
+
+
+def main(argv):
+	reports = []
+	for p in argv:
+		with open(p) as f:
+			reports.append(json.load(f))
+	for l in compare(reports):
+		print(l)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
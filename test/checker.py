@@ -0,0 +1,338 @@
+"""
+Offline protocol checker.
+
+Evaluate a library of AXI4-lite and timer invariants over a whole simulation
+run at once. Signals are loaded as NumPy arrays from either a VCD dump or a
+columnar trace file recorded by monitors (see sigtrace.py), so that the live
+simulation may be left with stimulus generation only.
+
+Only rule evaluation runs at array speed. Columnar traces are loaded straight
+into arrays and are the fast path, whereas VCD dumps are text parsed one value
+change at a time by the interpreter, at a cost proportional to dump size:
+prefer traces for long runs.
+
+Samples are assumed to hold settled signal values, i.e. one sample per
+simulation time step as given by a VCD dump or a ReadOnly sampled trace.
+Clock edge based rules are evaluated upon the last sample preceding a clock
+rising edge so that timer sampled traces may be checked as well. Clocks are
+looked up as test wrapper internal signals <name>_a first, i.e. as the clocks
+actually feeding designs whatever the clocking mode (see clocking.py).
+"""
+
+import sys
+import numpy as np
+from sigtrace import TraceReader
+
+class Trace(object):
+	"""
+	Set of sampled signals sharing a common time base.
+	"""
+
+	def __init__(self, time, signals):
+		self.time = time
+		self._signals = signals
+		self._edges = {}
+
+
+	def __contains__(self, name):
+		return name in self._signals
+
+
+	def __getitem__(self, name):
+		return self._signals[name]
+
+
+	def find(self, *names):
+		"""
+		Return name of first signal among names present into trace.
+		"""
+		for n in names:
+			if n in self._signals:
+				return n
+		return None
+
+
+	def edges(self, clock):
+		"""
+		Return indices of samples immediately preceding a rising edge of
+		clock, i.e. values registered by logic at clock edges.
+		"""
+		if clock not in self._edges:
+			clk = self._signals[clock]
+			self._edges[clock] = np.nonzero((clk[:-1] == 0) &
+			                                (clk[1:] == 1))[0]
+		return self._edges[clock]
+
+
+def load_trace(path):
+	"""
+	Load a columnar trace file recorded by sigtrace.TraceWriter.
+	"""
+	trc = TraceReader(path)
+	return Trace(trc.time, dict((n, trc[n]) for n in trc.columns
+	                            if n != "time"))
+
+
+def _vcd_value(val):
+	try:
+		return int(val, 2)
+	except ValueError:
+		# unresolved value containing X, Z, U, ...
+		return 0
+
+
+def load_vcd(path, names=None):
+	"""
+	Load a VCD dump restricting to the given signal names if any. Signals
+	are identified by their leaf name ; when multiple scopes hold a signal
+	of the same name, the shallowest one is retained.
+
+	Value changes are parsed line by line in Python, taking time
+	proportional to dump size: load_trace() is the fast path.
+	"""
+	ids = {}
+	depth = 0
+	with open(path) as f:
+		# parse declarations
+		for line in f:
+			tok = line.split()
+			if not tok:
+				continue
+			if tok[0] == "$scope":
+				depth += 1
+			elif tok[0] == "$upscope":
+				depth -= 1
+			elif tok[0] == "$var":
+				# strip vector range suffix if any
+				(code, name) = (tok[3], tok[4].split("[")[0])
+				if names is not None and name not in names:
+					continue
+				if name not in ids or ids[name][1] > depth:
+					ids[name] = (code, depth)
+			elif tok[0] == "$enddefinitions":
+				break
+
+		codes = dict((c, n) for (n, (c, d)) in ids.items())
+		changes = dict((n, ([], [])) for n in ids)
+		times = []
+
+		# parse value changes
+		for line in f:
+			line = line.strip()
+			if not line or line[0] == "$":
+				continue
+			if line[0] == "#":
+				times.append(int(line[1:]))
+				continue
+			if line[0] in "bBrR":
+				(val, code) = line[1:].split()
+			else:
+				(val, code) = (line[0], line[1:])
+			if code not in codes or not times:
+				continue
+			(idx, vals) = changes[codes[code]]
+			if idx and idx[-1] == len(times) - 1:
+				vals[-1] = _vcd_value(val)
+			else:
+				idx.append(len(times) - 1)
+				vals.append(_vcd_value(val))
+
+	# forward fill value changes over the whole time base
+	steps = np.arange(len(times))
+	signals = {}
+	for (n, (idx, vals)) in changes.items():
+		if not idx:
+			continue
+		idx = np.array(idx)
+		vals = np.array(vals, dtype=np.uint64)
+		pos = np.searchsorted(idx, steps, side="right") - 1
+		signals[n] = np.where(pos >= 0, vals[np.maximum(pos, 0)], 0)
+
+	return Trace(np.array(times, dtype=np.uint64), signals)
+
+
+def load(path, names=None):
+	if path.endswith(".vcd"):
+		return load_vcd(path, names)
+	return load_trace(path)
+
+
+################################################################################
+# Rules library
+################################################################################
+
+_rules = []
+
+def rule(group, *signals):
+	"""
+	Register an invariant checking function belonging to group and
+	requiring the given signals. Alternative signal names may be given as
+	a tuple, the first one found into the trace being retained.
+
+	Checking function is given the trace and the retained signal names and
+	returns indices of violating samples.
+	"""
+	def register(func):
+		_rules.append((group, func.__name__, signals, func))
+		return func
+	return register
+
+
+def _held(rst):
+	# reset asserted for at least one full sample: skip the asynchronous
+	# assertion sample itself.
+	held = np.zeros(len(rst), dtype=bool)
+	held[1:] = (rst[1:] == 0) & (rst[:-1] == 0)
+	return held
+
+
+@rule("axi4l", ("areset_n",), ("bvalid",), ("rvalid",))
+def axi4l_reset_slave_outputs(trc, rst, bvalid, rvalid):
+	"""slave drives bvalid and rvalid low while reset is asserted"""
+	return np.nonzero(_held(trc[rst]) &
+	                  ((trc[bvalid] != 0) | (trc[rvalid] != 0)))[0]
+
+
+@rule("axi4l", ("areset_n",), ("arvalid",), ("awvalid",), ("wvalid",))
+def axi4l_reset_master_outputs(trc, rst, arvalid, awvalid, wvalid):
+	"""master drives arvalid, awvalid and wvalid low while reset is
+	asserted"""
+	return np.nonzero(_held(trc[rst]) &
+	                  ((trc[arvalid] != 0) |
+	                   (trc[awvalid] != 0) |
+	                   (trc[wvalid] != 0)))[0]
+
+
+@rule("axi4l", ("aclk_a", "aclk"), ("areset_n",), ("awready",), ("wready",))
+def axi4l_reset_ready(trc, clk, rst, awready, wready):
+	"""slave raises awready and wready upon first clock rising edge
+	following reset deassertion"""
+	edges = trc.edges(clk)
+	rst = trc[rst]
+	# edges with reset deasserted whereas it was still asserted at
+	# previous edge
+	act = rst[edges] != 0
+	first = edges[1:][act[1:] & ~act[:-1]] + 2
+	first = first[first < len(rst)]
+	return first[(trc[awready][first] == 0) | (trc[wready][first] == 0)]
+
+
+def _stable(trc, clk, rst, valid, ready, payload):
+	# once asserted, a valid signal must remain asserted along with its
+	# payload until a handshake occurs, i.e. until ready is asserted at a
+	# clock rising edge.
+	edges = trc.edges(clk)
+	act = trc[rst][edges] != 0
+	pend = ((trc[valid][edges] != 0) & (trc[ready][edges] == 0))[:-1]
+	bad = trc[valid][edges][1:] == 0
+	for p in payload:
+		val = trc[p][edges]
+		bad |= val[1:] != val[:-1]
+	return edges[1:][pend & bad & act[:-1] & act[1:]] + 1
+
+
+@rule("axi4l", ("aclk_a", "aclk"), ("areset_n",), ("awvalid",), ("awready",),
+      ("awaddr",))
+def axi4l_aw_stable(trc, clk, rst, valid, ready, addr):
+	"""awvalid and awaddr remain stable until handshake"""
+	return _stable(trc, clk, rst, valid, ready, (addr,))
+
+
+@rule("axi4l", ("aclk_a", "aclk"), ("areset_n",), ("wvalid",), ("wready",),
+      ("wdata",))
+def axi4l_w_stable(trc, clk, rst, valid, ready, data):
+	"""wvalid and wdata remain stable until handshake"""
+	return _stable(trc, clk, rst, valid, ready, (data,))
+
+
+@rule("axi4l", ("aclk_a", "aclk"), ("areset_n",), ("arvalid",), ("arready",),
+      ("araddr",))
+def axi4l_ar_stable(trc, clk, rst, valid, ready, addr):
+	"""arvalid and araddr remain stable until handshake"""
+	return _stable(trc, clk, rst, valid, ready, (addr,))
+
+
+@rule("axi4l", ("aclk_a", "aclk"), ("areset_n",), ("bvalid",), ("bready",),
+      ("bresp",))
+def axi4l_b_stable(trc, clk, rst, valid, ready, resp):
+	"""bvalid and bresp remain stable until handshake"""
+	return _stable(trc, clk, rst, valid, ready, (resp,))
+
+
+@rule("axi4l", ("aclk_a", "aclk"), ("areset_n",), ("rvalid",), ("rready",),
+      ("rresp",), ("rdata",))
+def axi4l_r_stable(trc, clk, rst, valid, ready, resp, data):
+	"""rvalid, rresp and rdata remain stable until handshake"""
+	return _stable(trc, clk, rst, valid, ready, (resp, data))
+
+
+@rule("axi4l", ("bvalid",), ("bresp",), ("rvalid",), ("rresp",))
+def axi4l_no_exokay(trc, bvalid, bresp, rvalid, rresp):
+	"""slave never responds with EXOKAY since exclusive accesses are not
+	supported"""
+	return np.nonzero(((trc[bvalid] != 0) & (trc[bresp] == 1)) |
+	                  ((trc[rvalid] != 0) & (trc[rresp] == 1)))[0]
+
+
+@rule("timer", ("rst_n", "areset_n"), ("int",))
+def tmr_reset_int(trc, rst, irq):
+	"""interrupt request is deasserted while reset is asserted"""
+	return np.nonzero(_held(trc[rst]) & (trc[irq] != 0))[0]
+
+
+@rule("timer", ("aclk_a", "clk_a", "aclk", "clk"), ("rst_n", "areset_n"),
+      ("int",))
+def tmr_sync_int(trc, clk, rst, irq):
+	"""interrupt request only changes upon clock rising edges or reset"""
+	(clk, rst, irq) = (trc[clk], trc[rst], trc[irq])
+	chg = np.nonzero(irq[1:] != irq[:-1])[0] + 1
+	ok = (((clk[chg] != 0) & (clk[chg - 1] == 0)) |
+	      (rst[chg] != rst[chg - 1]) | (rst[chg] == 0))
+	return chg[~ok]
+
+
+def check(trc, groups=None):
+	"""
+	Evaluate all registered rules applicable to trc and return a list of
+	(rule name, description, violating sample indices) tuples. Rules
+	requiring signals missing from trc are skipped.
+	"""
+	res = []
+	for (grp, name, sigs, func) in _rules:
+		if groups is not None and grp not in groups:
+			continue
+		names = [trc.find(*alt) for alt in sigs]
+		if None in names:
+			continue
+		res.append((name, func.__doc__, func(trc, *names)))
+	return res
+
+
+def main(argv):
+	import argparse
+
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+	parser.add_argument("-g", "--group", action="append",
+	                    help="only evaluate rules of this group")
+	parser.add_argument("-n", "--max", type=int, default=8,
+	                    help="maximum number of violations shown per rule")
+	parser.add_argument("path", nargs="+",
+	                    help="VCD dump or trace file to check")
+	args = parser.parse_args(argv)
+
+	err = 0
+	for p in args.path:
+		trc = load(p)
+		for (name, desc, bad) in check(trc, args.group):
+			status = len(bad) and "FAIL" or "PASS"
+			print("%s: %s: %s (%s)" % (p, status, name,
+			                           " ".join(desc.split())))
+			for i in bad[:args.max]:
+				print("    violated @%d" % trc.time[i])
+			err += len(bad)
+
+	return err and 1 or 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,222 @@
+"""
+Clock divider test bench.
+
+clk_div output edges are checked against an analytic model instead of
+sampling the output every input cycle: input clock is generated from within
+the simulator (see clocking.py) and only output edge timestamps are recorded,
+using edge triggers. Python work is hence proportional to the number of output
+edges whatever the divide ratio, so that ratios up to millions may be
+verified.
+
+Input clock edges, rising and falling ones, are numbered from the clock start
+time onwards, edge n occurring at start + n * half period. While enabled, the
+output toggles at the first input edge following enable, then every cnt + 1
+input edges, cnt being sampled at each toggle. Disabling drives the output
+low right away.
+
+Inputs are only changed a quarter period away from input clock edges so that
+no update races with clock toggling.
+"""
+
+from collections import deque
+from random import choice, randint, random
+import cocotb
+from cocotb.triggers import Edge, Timer
+from cocotb.utils import get_sim_time
+from clocking import TbClock
+from bench import SimRate
+from watchdog import TestFactory
+
+class ClkDivModel(object):
+	"""
+	Analytic model of clk_div output edges for an input clock started at
+	time start and toggling every half steps.
+	"""
+
+	def __init__(self, start, half):
+		self._start = start
+		self._half = half
+		self._en = 0
+		self._cnt = 0
+		self._level = 0
+		# index of input edge of next output toggle while enabled
+		self._next = None
+		# expected (time, level) output edges
+		self.edges = deque()
+
+
+	def _edge(self, n):
+		return self._start + n * self._half
+
+
+	def advance(self, now):
+		"""
+		Compute output edges occurring up to time now.
+		"""
+		while self._en and self._edge(self._next) <= now:
+			self._level ^= 1
+			self.edges.append((self._edge(self._next), self._level))
+			self._next += self._cnt + 1
+
+
+	def set(self, now, en=None, cnt=None):
+		"""
+		Apply en and / or cnt input changes occurring at time now.
+		"""
+		self.advance(now)
+		if cnt is not None:
+			self._cnt = cnt
+		if en is None or en == self._en:
+			return
+
+		self._en = en
+		if en:
+			# first input edge strictly after now
+			self._next = (now - self._start) // self._half + 1
+		else:
+			if self._level:
+				self._level = 0
+				self.edges.append((now, 0))
+			self._next = None
+
+
+class ClkDivTB(object):
+
+	def __init__(self, entity):
+		self._entity = entity
+		# input clock MUST be generated by wrapper so that Python is not
+		# called back upon each input edge
+		self._clk = TbClock(entity, "clk_in", hdl=True)
+		self._out = entity.clk_out
+		self._model = None
+		self._edges = deque()
+		self._mon = None
+		self.checked = 0
+		self.errors = 0
+
+
+	async def _record(self):
+		while True:
+			await Edge(self._out)
+			self._edges.append((get_sim_time(),
+			                    self._out.value.binstr))
+
+
+	async def start(self, period):
+		self._entity.en.value = 0
+		self._entity.cnt.value = 0
+		await Timer(period, "step")
+		self._clk.start(period)
+		self._model = ClkDivModel(get_sim_time(), period // 2)
+		# move onto quarter period phase, away from input edges
+		await Timer(period // 4, "step")
+		self._mon = cocotb.start_soon(self._record())
+
+
+	def apply(self, en=None, cnt=None):
+		"""
+		Change inputs right away.
+		"""
+		if cnt is not None:
+			self._entity.cnt.value = cnt
+		if en is not None:
+			self._entity.en.value = en
+		self._model.set(get_sim_time(), en, cnt)
+
+
+	async def wait(self, halves):
+		"""
+		Let halves input half periods elapse using a single timer.
+		"""
+		await Timer(halves * (self._clk.period // 2), "step")
+
+
+	def check(self):
+		"""
+		Compare output edges recorded so far against model ones.
+		"""
+		self._model.advance(get_sim_time())
+		exp = self._model.edges
+		log = self._entity._log
+		while self._edges or exp:
+			act = self._edges.popleft() if self._edges else None
+			ref = exp.popleft() if exp else None
+			if act is not None and ref is not None and \
+			   act == (ref[0], str(ref[1])):
+				self.checked += 1
+				continue
+
+			self.errors += 1
+			if self.errors <= 16:
+				log.error("clk_out edge mismatch (received != "
+				          "expected): %s != %s", act, ref)
+
+
+	def result(self):
+		self.check()
+		self._entity._log.info("%d clk_out edges checked, %d errors",
+		                       self.checked, self.errors)
+		if self.errors:
+			raise AssertionError("%d clk_out edge mismatches" %
+			                     self.errors)
+
+
+async def clk_div_test_ratio(dut, cnt, periods):
+	"""
+	Run periods output clock periods at divide ratio cnt + 1.
+	"""
+	tb = ClkDivTB(dut)
+	await tb.start(clk_t)
+	rate = SimRate(clk_t)
+
+	tb.apply(cnt=cnt, en=1)
+	for p in range(periods):
+		await tb.wait(2 * (cnt + 1))
+		tb.check()
+	tb.apply(en=0)
+	await tb.wait(4)
+
+	rate.report(dut._log, "ratio %d" % (cnt + 1))
+	tb.result()
+
+
+async def clk_div_test_pattern(dut, segments, max_cnt):
+	"""
+	Toggle enable and change ratio at random, including while counting
+	down.
+	"""
+	tb = ClkDivTB(dut)
+	await tb.start(clk_t)
+
+	en = 0
+	for s in range(segments):
+		cnt = choice([None, 0, 1, 2, randint(0, max_cnt)])
+		if random() < 0.3:
+			en ^= 1
+			tb.apply(en=en, cnt=cnt)
+		else:
+			tb.apply(cnt=cnt)
+		await tb.wait(randint(1, 4 * (max_cnt + 1)))
+		tb.check()
+	tb.apply(en=0)
+	await tb.wait(4)
+
+	tb.result()
+
+
+clk_t = 2000
+
+fact = TestFactory(clk_div_test_ratio)
+fact.add_option("cnt",     [0, 1, 2, 7])
+fact.add_option("periods", [64])
+fact.generate_tests()
+
+fact = TestFactory(clk_div_test_ratio)
+fact.add_option("cnt",     [999, 999999])
+fact.add_option("periods", [4])
+fact.generate_tests(prefix="large_")
+
+fact = TestFactory(clk_div_test_pattern)
+fact.add_option("segments", [256])
+fact.add_option("max_cnt",  [16])
+fact.generate_tests()
@@ -0,0 +1,53 @@
+--------------------------------------------------------------------------------
+-- Just a wrapper around clk_div allowing to generate input clock from within
+-- the simulator instead of the python test bench.
+-- Not meant to be synthesizable.
+--------------------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library time;
+use time.clock.all;
+
+entity clk_div_tb is
+	port(
+		clk_in   : in  std_logic;
+		en       : in  std_logic;
+		cnt      : in  unsigned(31 downto 0);
+		clk_out  : out std_logic;
+
+		-- clock generated internally instead of clk_in when hclk_en is
+		-- high (see test/clk_gen.vhd)
+		hclk_en  : in  std_logic;
+		hclk_half: in  unsigned(31 downto 0)
+	);
+end entity clk_div_tb;
+
+architecture behaviour of clk_div_tb is
+	component clk_gen is
+		port(
+			en  : in  std_logic;
+			half: in  unsigned(31 downto 0);
+			clk : out std_logic
+		);
+	end component clk_gen;
+
+	signal hclk_a  : std_logic;
+	signal clk_in_a: std_logic;
+begin
+	hclk: clk_gen port map (
+		en   => hclk_en,
+		half => hclk_half,
+		clk  => hclk_a
+	);
+
+	clk_in_a <= hclk_a when hclk_en = '1' else clk_in;
+
+	div: clk_div port map (
+		en      => en,
+		cnt     => cnt,
+		clk_in  => clk_in_a,
+		clk_out => clk_out
+	);
+end architecture behaviour;
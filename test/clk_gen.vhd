@@ -0,0 +1,41 @@
+--------------------------------------------------------------------------------
+-- Test bench clock generator.
+--
+-- Generates a clock in place of the co-simulation Python Clock coroutine so
+-- that simulator does not need to call back into Python twice per cycle.
+-- Mimics cocotb's Clock behaviour: clock is driven high as soon as enabled and
+-- is toggled every half period afterwards.
+-- Not meant to be synthesizable.
+--------------------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+entity clk_gen is
+	port(
+		-- active high clock enable
+		en  : in  std_logic;
+		-- half period expressed in femtoseconds, i.e. in GHDL simulation
+		-- time steps
+		half: in  unsigned(31 downto 0);
+		clk : out std_logic
+	);
+end entity clk_gen;
+
+architecture behaviour of clk_gen is
+begin
+	process is
+	begin
+		clk <= '0';
+		if (en /= '1') then
+			wait until en = '1';
+		end if;
+
+		while (en = '1') loop
+			clk <= '1';
+			wait for to_integer(half) * 1 fs;
+			clk <= '0';
+			wait for to_integer(half) * 1 fs;
+		end loop;
+	end process;
+end architecture behaviour;
@@ -0,0 +1,84 @@
+"""
+Test bench clocking.
+
+Test wrappers embed a clock generator (see clk_gen.vhd) whose output replaces
+the clock port when their hclk_en input is high. Generating the clock from
+within the simulator saves the two Python callbacks per cycle required by the
+Clock coroutine, which dominate simulation time of idle-heavy tests.
+"""
+
+import os
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, Timer
+
+# Default clocking mode, as requested by the HDL_CLOCK environment variable.
+hdl_clock = bool(os.getenv("HDL_CLOCK"))
+
+class TbClock(object):
+	"""
+	Clock of entity either driven from Python onto port named name or
+	generated by entity test wrapper.
+
+	Clock feeding the design is wrapper internal signal <name>_a, selecting
+	either port or generated clock: signal refers to it whatever the mode
+	so that test benches synchronize on the very edges the design samples,
+	not on port edges preceding them by a delta cycle. When generated by
+	the wrapper, port is left unused.
+	"""
+
+	def __init__(self, entity, name, hdl=None):
+		if hdl is None:
+			hdl = hdl_clock
+
+		self._entity = entity
+		self._port = getattr(entity, name)
+		self._hdl = hdl
+		self._thread = None
+		self.period = None
+		self.signal = getattr(entity, name + "_a")
+
+		# select clock source right away
+		self._entity.hclk_en.value = 0
+
+
+	def start(self, period):
+		"""
+		Start clock toggling with a high phase first.
+		"""
+		self.stop()
+		self.period = period
+		if self._hdl:
+			self._entity.hclk_half.value = period // 2
+			self._entity.hclk_en.value = 1
+		else:
+			clk = Clock(self._port, period, "step")
+			self._thread = cocotb.start_soon(clk.start())
+
+
+	def stop(self):
+		if self._hdl:
+			self._entity.hclk_en.value = 0
+		elif self._thread is not None:
+			self._thread.kill()
+			self._thread = None
+
+
+	async def cycles(self, count):
+		"""
+		Wait for count rising edges of clock.
+
+		Long idle stretches are skipped using a single timer so that
+		Python work remains constant whatever count. Clock MUST have
+		been started and keep running at constant period meanwhile.
+		"""
+		if count <= 3:
+			for c in range(count):
+				await RisingEdge(self.signal)
+			return
+
+		# Land half a period before last edge to prevent from racing
+		# with clock toggling.
+		await RisingEdge(self.signal)
+		await Timer((count - 1) * self.period - self.period // 2, "step")
+		await RisingEdge(self.signal)
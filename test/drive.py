@@ -0,0 +1,95 @@
+"""
+Packed stimulus vector support.
+
+Counterpart of probe vectors (see probe.py) for inputs: test wrappers may
+expose a single `stim' std_logic_vector input made of the concatenation of
+the design inputs, decoded back to design ports while their `stim_en' input
+is high. Wrappers MUST concatenate inputs in the very same order as the list
+of names given to PackedDrive, first input holding the most significant bits.
+
+PackedDrive stands for the wrapper entity in drivers: assignments to packed
+inputs update a shadow integer which is then assigned to the stim handle as a
+whole. Since cocotb keeps a single pending write per handle, applied at the
+next ReadWrite phase, all assignments made within one timestep are flushed as
+a single GPI write instead of one per input.
+
+Wrapper input ports are left untouched while packed: monitors MUST observe
+inputs through wrapper internal signals, e.g. a probe vector fed by decoded
+inputs, rather than through input port handles.
+
+Packed drive is requested by setting the PACKED_DRIVE environment variable.
+"""
+
+import os
+from probe import FieldMap
+
+# Default drive mode, as requested by the PACKED_DRIVE environment variable.
+packed_drive = bool(os.getenv("PACKED_DRIVE"))
+
+class _Field(object):
+	"""
+	Packed input handle, supporting value assignment only.
+	"""
+
+	def __init__(self, drive, name):
+		self._drive = drive
+		self._name = name
+
+
+	@property
+	def value(self):
+		return self._drive._values[self._name]
+
+
+	@value.setter
+	def value(self, value):
+		self._drive._assign(self._name, int(value))
+
+
+class PackedDrive(object):
+	"""
+	View of entity where inputs listed into names are driven through the
+	packed stimulus vector named port. Other attributes are accessed from
+	entity.
+	"""
+
+	def __init__(self, entity, names, port="stim", enable="stim_en"):
+		object.__setattr__(self, "_entity", entity)
+		object.__setattr__(self, "_log", entity._log)
+		object.__setattr__(self, "_name", entity._name)
+		object.__setattr__(self, "_port", getattr(entity, port))
+		object.__setattr__(self, "_map",
+		                   FieldMap.from_handles(entity, names))
+		object.__setattr__(self, "_fields",
+		                   dict((n, _Field(self, n)) for n in names))
+		object.__setattr__(self, "_values", dict((n, 0) for n in names))
+
+		self._port.value = 0
+		getattr(entity, enable).value = 1
+
+
+	def _assign(self, name, value):
+		self._values[name] = value
+		self._port.value = self._map.pack(self._values)
+
+
+	def __getattr__(self, name):
+		if name in self._fields:
+			return self._fields[name]
+		return getattr(self._entity, name)
+
+
+	def __setattr__(self, name, value):
+		setattr(self._entity, name, value)
+
+
+def drive_view(entity, names):
+	"""
+	Return a PackedDrive view of entity inputs listed into names when
+	packed drive is requested, entity itself otherwise. Stimulus vector is
+	disabled in the latter case.
+	"""
+	if packed_drive:
+		return PackedDrive(entity, names)
+	entity.stim_en.value = 0
+	return entity
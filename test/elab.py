@@ -0,0 +1,140 @@
+"""
+Elaborated simulation cache.
+
+Wrap a simulator elaboration command so that it runs only when the sources a
+design is elaborated from changed. Elaborations are keyed by a hash of the
+content of these sources along with the elaboration command line, e.g.
+simulator path, toplevel and options:
+
+  * executable mode (-o) suits simulators elaborating designs into
+    standalone executables, such as GHDL llvm and gcc backends: executables
+    are kept under the cache directory, one per key, so that switching back
+    and forth between source revisions does not elaborate again. The "-o
+    <executable>" option is inserted after the first command argument, i.e.
+    the elaboration subcommand, and link is pointed to the executable of
+    current key. Only the most recent ones are kept ;
+  * stamp mode (-s) suits simulators saving elaborations into their work
+    library, such as nvc: command runs when the key differs from the one
+    recorded into stamp file.
+
+Usage:
+
+    python elab.py -c <cache> (-o <link> | -s <stamp>) <source>... -- <command>...
+"""
+
+import glob
+import hashlib
+import os
+import subprocess
+import sys
+
+def elab_hash(paths, command):
+	"""
+	Return hex digest of the content of files located at paths and command
+	arguments.
+	"""
+	h = hashlib.sha256()
+	for p in sorted(set(paths)):
+		h.update(p.encode("utf-8") + b"\0")
+		with open(p, "rb") as f:
+			for blk in iter(lambda: f.read(1 << 16), b""):
+				h.update(blk)
+	for a in command:
+		h.update(a.encode("utf-8") + b"\0")
+	return h.hexdigest()
+
+
+def _link(target, link):
+	tmp = link + ".tmp"
+	if os.path.lexists(tmp):
+		os.remove(tmp)
+	os.symlink(target, tmp)
+	os.rename(tmp, link)
+
+
+def _prune(pattern, keep):
+	exes = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+	for e in exes[keep:]:
+		os.remove(e)
+
+
+def executable(cache, link, sources, command, keep=4, log=sys.stderr):
+	"""
+	Point link to an executable elaborated by command from sources,
+	elaborating it only if not cached yet. Return command exit status.
+	"""
+	name = os.path.basename(link)
+	cache = os.path.abspath(cache)
+	exe = os.path.join(cache, "%s-%s" % (name,
+	                                     elab_hash(sources, command)[:16]))
+	if os.path.exists(exe):
+		log.write("%s: reusing %s\n" % (name, exe))
+		# refresh so that pruning keeps most recently used ones
+		os.utime(exe, None)
+	else:
+		# elaboration intermediate files are created into current
+		# directory
+		cmd = command[:2] + ["-o", exe] + command[2:]
+		if os.sep in cmd[0]:
+			cmd[0] = os.path.abspath(cmd[0])
+		ret = subprocess.call(cmd, cwd=cache)
+		if ret:
+			return ret
+		_prune(os.path.join(cache, name + "-*"), keep)
+
+	_link(exe, link)
+	return 0
+
+
+def stamp(path, sources, command, log=sys.stderr):
+	"""
+	Run elaboration command unless stamp located at path records the key of
+	sources and command. Return command exit status.
+	"""
+	key = elab_hash(sources, command)
+	if os.path.exists(path):
+		with open(path) as f:
+			if f.read().strip() == key:
+				log.write("%s: elaboration up to date\n" % path)
+				return 0
+
+	ret = subprocess.call(command)
+	if not ret:
+		with open(path, "w") as f:
+			f.write(key + "\n")
+	return ret
+
+
+def main(argv):
+	import argparse
+
+	if "--" not in argv:
+		sys.stderr.write(__doc__)
+		return 2
+	sep = argv.index("--")
+
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+	parser.add_argument("-c", "--cache", required=True,
+	                    help="cache directory")
+	mode = parser.add_mutually_exclusive_group(required=True)
+	mode.add_argument("-o", "--output",
+	                  help="link to elaborated executable")
+	mode.add_argument("-s", "--stamp",
+	                  help="elaboration stamp file")
+	parser.add_argument("-k", "--keep", type=int, default=4,
+	                    help="number of executables kept per design")
+	parser.add_argument("source", nargs="*",
+	                    help="source file design is elaborated from")
+	args = parser.parse_args(argv[:sep])
+	command = argv[sep + 1:]
+
+	if not os.path.isdir(args.cache):
+		os.makedirs(args.cache)
+	if args.output:
+		return executable(args.cache, os.path.abspath(args.output),
+		                  args.source, command, args.keep)
+	return stamp(args.stamp, args.source, command)
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,348 @@
+"""
+Functional coverage collector.
+
+A covergroup crosses a set of coverpoints, each made of a fixed list of bins,
+and records which combinations of bins have been hit by monitor observed
+transactions. Hits are stored as a bitmap, i.e. a single integer holding one
+bit per cross bin, so that databases recorded by parallel simulation shards
+may be merged by OR'ing bitmaps together (see main()).
+
+Databases are saved as JSON files under the directory given by the COVER_DIR
+environment variable, one per simulation process, each time a new bin is hit.
+When COVER_STOP is not empty, tests stop generating stimulus once their target
+bins are closed, taking into account databases previously saved into
+COVER_DIR by other shards.
+"""
+
+import json
+import os
+import sys
+from glob import glob
+
+# Coverage driven mode, as requested by the COVER_STOP environment variable.
+cover_stop = bool(os.getenv("COVER_STOP"))
+
+class CoverPoint(object):
+	"""
+	Coverpoint made of a list of bins, each given either as a plain value
+	or as a (label, value) tuple.
+	"""
+
+	def __init__(self, name, bins):
+		self.name = name
+		self.labels = []
+		self.values = []
+		self._index = {}
+		for b in bins:
+			(label, value) = isinstance(b, tuple) and b or (str(b), b)
+			self._index[value] = len(self.values)
+			self.labels.append(label)
+			self.values.append(value)
+
+
+	def __len__(self):
+		return len(self.values)
+
+
+	def index(self, value):
+		return self._index.get(value)
+
+
+	def check(self, value):
+		"""
+		Return index of bin matching value, raising a ValueError when
+		none does.
+		"""
+		i = self.index(value)
+		if i is None:
+			raise ValueError("%s: %r matches no bin" % (self.name, value))
+		return i
+
+
+class CoverGroup(object):
+	"""
+	Cross of coverpoints. Cross bins are numbered in row major order, last
+	coverpoint varying fastest.
+	"""
+
+	def __init__(self, name, *points):
+		self.name = name
+		self.points = points
+		self.size = 1
+		for p in points:
+			self.size *= len(p)
+		self.bitmap = 0
+		self._full = (1 << self.size) - 1
+		self._db = None
+
+
+	def _bit(self, values):
+		bit = 0
+		for (p, v) in zip(self.points, values):
+			i = p.index(v)
+			if i is None:
+				return None
+			bit = bit * len(p) + i
+		return bit
+
+
+	def _bins(self, bit):
+		idx = []
+		for p in reversed(self.points):
+			idx.insert(0, bit % len(p))
+			bit //= len(p)
+		return idx
+
+
+	def sample(self, *values):
+		"""
+		Record hit of cross bin matching values, given in coverpoint
+		order. Values matching no bin are ignored. Return True when a
+		new bin has been hit.
+		"""
+		bit = self._bit(values)
+		if bit is None or (self.bitmap >> bit) & 1:
+			return False
+
+		self.bitmap |= 1 << bit
+		if self._db is not None:
+			self._db.changed()
+		return True
+
+
+	def hit(self, *values):
+		bit = self._bit(values)
+		return bit is not None and bool((self.bitmap >> bit) & 1)
+
+
+	def holes(self, **where):
+		"""
+		Yield value tuples of cross bins not hit yet, optionally
+		restricted to bins matching the given coverpoint values. Unknown
+		coverpoints and values matching no bin raise a ValueError.
+		"""
+		names = [p.name for p in self.points]
+		for n in where:
+			if n not in names:
+				raise ValueError("%s: no %s coverpoint" %
+				                 (self.name, n))
+		fixed = [(n, p.check(where[p.name]))
+		         for (n, p) in enumerate(self.points) if p.name in where]
+		for bit in range(self.size):
+			if (self.bitmap >> bit) & 1:
+				continue
+			idx = self._bins(bit)
+			if all(idx[n] == i for (n, i) in fixed):
+				yield tuple(p.values[i]
+				            for (p, i) in zip(self.points, idx))
+
+
+	def closed(self, **where):
+		"""
+		Return True when all cross bins (optionally restricted to the
+		ones matching the given coverpoint values) have been hit.
+		"""
+		if not where:
+			return self.bitmap == self._full
+		for h in self.holes(**where):
+			return False
+		return True
+
+
+	@property
+	def covered(self):
+		return bin(self.bitmap).count("1")
+
+
+	def layout(self):
+		return [[p.name, p.labels] for p in self.points]
+
+
+	def merge(self, layout, bitmap):
+		if layout != self.layout():
+			raise ValueError("%s: mismatching covergroup layout" %
+			                 self.name)
+		self.bitmap |= bitmap & self._full
+
+
+	def report(self, holes=8):
+		"""
+		Return a list of text lines summarizing coverage and showing at
+		most the given number of holes.
+		"""
+		lines = ["%s: %d/%d bins (%.1f%%)" %
+		         (self.name, self.covered, self.size,
+		          100.0 * self.covered / self.size)]
+		for bit in range(self.size):
+			if len(lines) > holes:
+				lines.append("    ...")
+				break
+			if not (self.bitmap >> bit) & 1:
+				lines.append("    hole: " + ", ".join(
+					"%s=%s" % (p.name, p.labels[i])
+					for (p, i) in zip(self.points,
+					                  self._bins(bit))))
+		return lines
+
+
+class Coverage(object):
+	"""
+	Database of covergroups, saved to path if given each time a new bin is
+	hit.
+	"""
+
+	def __init__(self, path=None):
+		self.path = path
+		self._groups = {}
+		# bitmaps loaded for groups not declared yet
+		self._loaded = {}
+
+
+	def __contains__(self, name):
+		return name in self._groups
+
+
+	def __getitem__(self, name):
+		return self._groups[name]
+
+
+	def __iter__(self):
+		return iter(sorted(self._groups.values(), key=lambda g: g.name))
+
+
+	def group(self, name, *points):
+		"""
+		Declare a covergroup crossing the given coverpoints or return
+		the already declared one.
+		"""
+		if name in self._groups:
+			return self._groups[name]
+
+		grp = CoverGroup(name, *points)
+		if name in self._loaded:
+			grp.merge(*self._loaded.pop(name))
+		grp._db = self
+		self._groups[name] = grp
+		return grp
+
+
+	def closed(self, name, **where):
+		return name in self._groups and self._groups[name].closed(**where)
+
+
+	def changed(self):
+		if self.path is not None:
+			self.save(self.path)
+
+
+	def save(self, path):
+		groups = dict((g.name, { "points": g.layout(),
+		                         "bitmap": "%x" % g.bitmap })
+		              for g in self)
+		for (name, (layout, bitmap)) in self._loaded.items():
+			groups[name] = { "points": layout,
+			                 "bitmap": "%x" % bitmap }
+
+		# write then rename so that concurrent shards never load a
+		# partially written database
+		tmp = path + ".tmp"
+		with open(tmp, "w") as f:
+			json.dump({ "groups": groups }, f, indent=1,
+			          sort_keys=True)
+		os.rename(tmp, path)
+
+
+	def load(self, path):
+		"""
+		Merge database saved into path.
+		"""
+		with open(path) as f:
+			groups = json.load(f)["groups"]
+
+		for (name, grp) in groups.items():
+			layout = grp["points"]
+			bitmap = int(grp["bitmap"], 16)
+			if name in self._groups:
+				self._groups[name].merge(layout, bitmap)
+			elif name in self._loaded:
+				if self._loaded[name][0] != layout:
+					raise ValueError("%s: mismatching "
+					                 "covergroup layout" % name)
+				self._loaded[name][1] |= bitmap
+			else:
+				self._loaded[name] = [layout, bitmap]
+
+
+	def declare_loaded(self):
+		"""
+		Declare all groups loaded but not declared yet, using bin labels
+		as values.
+		"""
+		for (name, (layout, bitmap)) in list(self._loaded.items()):
+			self.group(name, *[CoverPoint(p, bins)
+			                   for (p, bins) in layout])
+
+
+	def report(self, log, holes=8):
+		for g in self:
+			for l in g.report(holes):
+				log.info(l)
+
+
+_database = None
+
+def database():
+	"""
+	Return the coverage database of current simulation process, saved
+	under the COVER_DIR directory if not empty. In coverage driven mode,
+	databases saved by other shards are merged at creation time.
+	"""
+	global _database
+
+	if _database is None:
+		directory = os.getenv("COVER_DIR")
+		if not directory:
+			_database = Coverage()
+			return _database
+
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		_database = Coverage(os.path.join(directory, "%s_%d.cov" %
+		                                  (os.getenv("MODULE", "cover"),
+		                                   os.getpid())))
+		if cover_stop:
+			for p in glob(os.path.join(directory, "*.cov")):
+				_database.load(p)
+
+	return _database
+
+
+def main(argv):
+	import argparse
+	import logging
+
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+	parser.add_argument("-o", "--output",
+	                    help="save merged database to this file")
+	parser.add_argument("-n", "--holes", type=int, default=8,
+	                    help="maximum number of holes shown per group")
+	parser.add_argument("path", nargs="+",
+	                    help="coverage database to merge")
+	args = parser.parse_args(argv)
+
+	db = Coverage()
+	for p in args.path:
+		db.load(p)
+	db.declare_loaded()
+
+	logging.basicConfig(format="%(message)s", level=logging.INFO)
+	db.report(logging.getLogger("funcov"), args.holes)
+
+	if args.output:
+		db.save(args.output)
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,166 @@
+"""
+Bounded signal history.
+
+Monitors keep the last `depth' samples of all monitored signals into a fixed
+capacity ring buffer, preallocated as a single integer array, so that memory
+use remains constant whatever the run length. Upon failure, history is dumped
+as a table into the log and, when the HISTORY_DIR environment variable is not
+empty, as a VCD fragment viewable with any waveform viewer.
+
+Values are held as signed 64 bits integers, unresolved ones (containing X, Z,
+...) being recorded as -1: signals wider than 63 bits cannot be held.
+"""
+
+import os
+from array import array
+from sigtrace import artifact_path
+
+_UNRESOLVED = -1
+
+
+def _vcd_id(index):
+	# shortest printable VCD identifier code
+	code = ""
+	while True:
+		code += chr(33 + index % 94)
+		index //= 94
+		if not index:
+			return code
+
+
+class History(object):
+	"""
+	Ring buffer of the last depth samples of signals.
+
+	`signals' is a list of (name, handle) tuples.
+	"""
+
+	def __init__(self, signals, depth=64):
+		# keep dumps usable outside of the simulator
+		from cocotb.utils import get_sim_time
+
+		self._now = get_sim_time
+		self.names = [n for (n, h) in signals]
+		self.widths = [len(h) for (n, h) in signals]
+		self._handles = [h for (n, h) in signals]
+		self.depth = depth
+		self._stride = len(signals) + 1
+		self._buf = array("q", [0]) * (depth * self._stride)
+		self._next = 0
+		self.count = 0
+
+
+	def sample(self, values=None):
+		"""
+		Record current value of all signals at current simulation time,
+		overwriting the oldest sample when full. Values already sampled
+		may be given as a dictionary indexed by signal names.
+		"""
+		buf = self._buf
+		off = self._next * self._stride
+		buf[off] = int(self._now("ps"))
+		if values is None:
+			values = {}
+		for (i, n, h) in zip(range(off + 1, off + self._stride),
+		                     self.names, self._handles):
+			try:
+				buf[i] = int(values[n] if n in values
+				             else h.value)
+			except (ValueError, OverflowError):
+				buf[i] = _UNRESOLVED
+
+		self._next = (self._next + 1) % self.depth
+		if self.count < self.depth:
+			self.count += 1
+
+
+	def rows(self):
+		"""
+		Iterate over (time, values) samples, oldest first. Time is given
+		in picoseconds.
+		"""
+		first = (self._next - self.count) % self.depth
+		for r in range(self.count):
+			off = ((first + r) % self.depth) * self._stride
+			yield (self._buf[off],
+			       self._buf[off + 1:off + self._stride].tolist())
+
+
+	def table(self):
+		"""
+		Return history as a list of text lines, one per sample. Values
+		are shown as hexadecimal, unresolved ones as x.
+		"""
+		digits = [(w + 3) // 4 for w in self.widths]
+		cols = [max(len(n), d) for (n, d) in zip(self.names, digits)]
+		lines = ["%14s  %s" % ("time (ps)",
+		                       " ".join("%*s" % (c, n) for (c, n) in
+		                                zip(cols, self.names)))]
+		for (t, vals) in self.rows():
+			cells = []
+			for (c, d, v) in zip(cols, digits, vals):
+				cells.append("%*s" % (c, v == _UNRESOLVED and "x" or
+				                         "%0*x" % (d, v)))
+			lines.append("%14d  %s" % (t, " ".join(cells)))
+		return lines
+
+
+	def vcd(self, f, scope="history"):
+		"""
+		Write history as a VCD fragment to file object f.
+		"""
+		ids = [_vcd_id(i) for i in range(len(self.names))]
+		f.write("$timescale 1ps $end\n")
+		f.write("$scope module %s $end\n" % scope)
+		for (i, n, w) in zip(ids, self.names, self.widths):
+			f.write("$var wire %d %s %s $end\n" % (w, i, n))
+		f.write("$upscope $end\n$enddefinitions $end\n")
+
+		prev = [None] * len(ids)
+		for (t, vals) in self.rows():
+			f.write("#%d\n" % t)
+			for (k, (i, w, v)) in enumerate(zip(ids, self.widths,
+			                                    vals)):
+				if v == prev[k]:
+					continue
+				prev[k] = v
+				if w == 1:
+					f.write("%s%s\n" %
+					        (v == _UNRESOLVED and "x" or v, i))
+				else:
+					f.write("b%s %s\n" %
+					        (v == _UNRESOLVED and "x" or
+					         format(v, "b"), i))
+
+
+	def dump(self, log, name):
+		"""
+		Log history as a table and save it as VCD fragment when
+		HISTORY_DIR is not empty.
+		"""
+		log.info("Last %d samples:", self.count)
+		for l in self.table():
+			log.info("    %s", l)
+
+		path = history_path(name)
+		if path is not None:
+			with open(path, "w") as f:
+				self.vcd(f, name)
+			log.info("History saved to %s", path)
+
+
+def history_depth(default=64):
+	"""
+	Return history depth given by the HISTORY_DEPTH environment variable,
+	defaulting to default if empty or unset.
+	"""
+	return int(os.getenv("HISTORY_DEPTH") or default)
+
+
+def history_path(name):
+	"""
+	Build a unique VCD fragment path for the given monitor name, located
+	into directory given by the HISTORY_DIR environment variable. Return
+	None when VCD dumps are disabled, i.e. HISTORY_DIR is empty or unset.
+	"""
+	return artifact_path("HISTORY_DIR", "vcd", name)
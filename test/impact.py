@@ -0,0 +1,212 @@
+"""
+Change impact co-simulation selection.
+
+Map files changed since a git revision, or modified after a reference file,
+onto the co-simulation targets they may affect. Targets are described by the
+build as their name, toplevel entity and list of source files, i.e. Python
+test modules and VHDL sources of the libraries they depend upon.
+
+By default, selection is refined down to design units: VHDL sources are
+parsed for the entities, architectures and packages they define and the ones
+they reference through use clauses and instantiations, so that a target is
+selected only when its toplevel transitively depends upon a changed unit, or
+when one of its Python sources changed. Library granularity, i.e. selecting
+targets holding any changed file among their sources, is available as a
+fallback.
+
+Changes to global build files (Makefile, ...) select all targets.
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+_COMMENT = re.compile(r"--[^\n]*")
+_DEFINE  = re.compile(r"\b(entity|package)\s+(body\s+)?(\w+)\s+is\b",
+                      re.IGNORECASE)
+_ARCH    = re.compile(r"\barchitecture\s+\w+\s+of\s+(\w+)\s+is\b",
+                      re.IGNORECASE)
+_USE     = re.compile(r"\buse\s+\w+\s*\.\s*(\w+)", re.IGNORECASE)
+_INST    = re.compile(r"\b\w+\s*:\s*(?:entity\s+(?:\w+\s*\.\s*)?)?(\w+)"
+                      r"\s*(?:\(\s*\w+\s*\))?\s+(?:generic|port)\s+map\b",
+                      re.IGNORECASE)
+
+
+def parse_vhdl(path):
+	"""
+	Return (defined, referenced) sets of lower case design unit names of
+	VHDL source located at path. Architectures are accounted as defining
+	the entity they implement.
+	"""
+	with open(path) as f:
+		src = _COMMENT.sub("", f.read())
+
+	defined = set(m.group(3).lower() for m in _DEFINE.finditer(src))
+	defined.update(m.group(1).lower() for m in _ARCH.finditer(src))
+	refs = set(m.group(1).lower() for m in _USE.finditer(src))
+	refs.update(m.group(1).lower() for m in _INST.finditer(src))
+
+	return (defined, refs - defined)
+
+
+class UnitGraph(object):
+	"""
+	Design unit dependency graph of a set of VHDL sources.
+	"""
+
+	def __init__(self, paths):
+		self._defs = {}
+		self._users = {}
+		self.units = set()
+		for p in paths:
+			(defined, refs) = parse_vhdl(p)
+			self._defs[p] = defined
+			self.units.update(defined)
+			for r in refs:
+				self._users.setdefault(r, set()).update(defined)
+
+
+	def affected(self, changed):
+		"""
+		Return the set of units depending upon units defined into the
+		changed files, including these.
+		"""
+		todo = set()
+		for p in changed:
+			todo.update(self._defs.get(p, ()))
+
+		done = set()
+		while todo:
+			u = todo.pop()
+			done.add(u)
+			todo.update(self._users.get(u, set()) - done)
+		return done
+
+
+class Target(object):
+	"""
+	Co-simulation target, described as "<name>:<toplevel>:<source>,...".
+	"""
+
+	def __init__(self, desc):
+		(self.name, top, srcs) = desc.split(":", 2)
+		self.top = top.lower()
+		self.sources = set(os.path.abspath(s) for s in srcs.split(",")
+		                   if s)
+
+
+	def vhdl(self):
+		return [s for s in self.sources if s.endswith(".vhd")]
+
+
+def select(targets, changed, globs=(), library=False):
+	"""
+	Return names of targets affected by changed files.
+	"""
+	changed = set(os.path.abspath(c) for c in changed)
+	if changed & set(os.path.abspath(g) for g in globs):
+		return [t.name for t in targets]
+
+	if library:
+		return [t.name for t in targets if t.sources & changed]
+
+	vhdl = set()
+	for t in targets:
+		vhdl.update(s for s in t.vhdl() if os.path.exists(s))
+	graph = UnitGraph(sorted(vhdl))
+	units = graph.affected(changed & vhdl)
+
+	res = []
+	for t in targets:
+		if t.top not in graph.units:
+			# toplevel source not generated yet
+			if t.sources & changed:
+				res.append(t.name)
+		elif (t.top in units or
+		      any(s in changed for s in t.sources
+		          if not s.endswith(".vhd"))):
+			res.append(t.name)
+	return res
+
+
+def git_changed(base=None, cached=False):
+	"""
+	Return absolute paths of files changed since revision base (HEAD by
+	default), staged changes only if cached.
+	"""
+	top = subprocess.check_output(["git", "rev-parse", "--show-toplevel"])
+	top = top.decode().strip()
+	cmd = ["git", "diff", "--name-only"]
+	if cached:
+		cmd.append("--cached")
+	cmd.append(base or "HEAD")
+	out = subprocess.check_output(cmd).decode()
+	res = [os.path.join(top, l) for l in out.splitlines() if l]
+	if not cached:
+		# untracked files
+		out = subprocess.check_output(["git", "ls-files", "--others",
+		                               "--exclude-standard",
+		                               "--full-name", top]).decode()
+		res.extend(os.path.join(top, l) for l in out.splitlines()
+		           if l)
+	return res
+
+
+def newer_than(ref, targets, globs=()):
+	"""
+	Return files among targets sources and globs modified after ref.
+	"""
+	stamp = os.path.getmtime(ref)
+	files = set(globs)
+	for t in targets:
+		files.update(t.sources)
+	return [f for f in files
+	        if os.path.exists(f) and os.path.getmtime(f) > stamp]
+
+
+def main(argv):
+	import argparse
+
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+	parser.add_argument("-t", "--target", action="append", default=[],
+	                    help="co-simulation target description "
+	                         "<name>:<toplevel>:<source>,...")
+	parser.add_argument("-g", "--global", dest="globs",
+	                    action="append", default=[],
+	                    help="file which change affects all targets")
+	parser.add_argument("-b", "--base",
+	                    help="git revision changes are computed from "
+	                         "(HEAD by default)")
+	parser.add_argument("-c", "--cached", action="store_true",
+	                    help="consider staged changes only")
+	parser.add_argument("-n", "--newer",
+	                    help="consider files modified after this file "
+	                         "instead of git changes")
+	parser.add_argument("-l", "--library", action="store_true",
+	                    help="select at library granularity")
+	parser.add_argument("-p", "--prefix", default="",
+	                    help="prefix printed target names with this")
+	parser.add_argument("file", nargs="*",
+	                    help="changed file, overriding change detection")
+	args = parser.parse_args(argv)
+
+	targets = [Target(t) for t in args.target]
+	if args.file:
+		changed = args.file
+	elif args.newer:
+		if not os.path.exists(args.newer):
+			changed = list(args.globs)
+		else:
+			changed = newer_than(args.newer, targets, args.globs)
+	else:
+		changed = git_changed(args.base, args.cached)
+
+	for n in select(targets, changed, args.globs, args.library):
+		print(args.prefix + n)
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,128 @@
+"""
+Lazy test factory.
+
+cocotb's TestFactory builds every test of the option cross product at module
+import time, thousands of them for some test modules, even when a single test
+is selected. Tests generated by LazyTestFactory are only named at import time
+and materialized, i.e. built and registered into their module, on demand:
+
+  * when the cocotb TESTCASE environment variable selects tests by name,
+    cocotb looks them up as module attributes: selected tests are built by
+    the module __getattr__() hook upon lookup ;
+  * otherwise, when the TESTPATTERN environment variable holds a comma
+    separated list of shell-style patterns, only tests whose name matches
+    one of them are built ;
+  * otherwise, all tests are built.
+
+Generated test names, and thus result caches (see runner.py), are the same as
+cocotb's ones.
+
+Time to first test, i.e. process CPU time spent before the first test starts
+(simulator startup, elaboration and test module import), is logged along with
+the number of tests materialized so that startup cost can be tracked.
+"""
+
+import fnmatch
+import functools
+import os
+import sys
+import time
+from itertools import product
+import cocotb
+from cocotb.regression import TestFactory as _TestFactory
+
+# tests selected by name or pattern
+testcase = [n for n in os.getenv("TESTCASE", "").split(",") if n]
+testpattern = [p for p in os.getenv("TESTPATTERN", "").split(",") if p]
+
+# number of tests named and built so far
+named = 0
+built = 0
+_started = False
+
+def _getattr(mod):
+	lazy = mod.__dict__["_lazy_tests"]
+
+	def __getattr__(name):
+		try:
+			make = lazy.pop(name)
+		except KeyError:
+			raise AttributeError("module %r has no attribute %r" %
+			                     (mod.__name__, name))
+		return make()
+
+	return __getattr__
+
+
+def started(log):
+	"""
+	Log time to first test when called for the first time.
+	"""
+	global _started
+
+	if _started:
+		return
+	_started = True
+	log.info("first test started after %.3f s of CPU time, %d out of %d "
+	         "generated tests built", time.process_time(), built, named)
+
+
+class LazyTestFactory(_TestFactory):
+	"""
+	cocotb TestFactory materializing generated tests on demand only.
+	"""
+
+	def _build(self, mod, name, options):
+		global built
+
+		test = self.test_function
+		args = self.args
+		kwargs = dict(getattr(self, "kwargs_constant", {}), **options)
+
+		@functools.wraps(test)
+		async def _test(dut):
+			await test(dut, *args, **kwargs)
+
+		_test.__name__ = name
+		_test.__qualname__ = name
+		_test.__module__ = mod.__name__
+		_test.__doc__ = ("Automatically generated test\n\n" +
+		                 "".join("%s: %r\n" % o
+		                         for o in sorted(options.items())))
+		obj = cocotb.test()(_test)
+		setattr(mod, name, obj)
+		built += 1
+		return obj
+
+
+	def generate_tests(self, prefix="", postfix=""):
+		"""
+		Name tests generated from the cross product of options, building
+		them as selected by TESTCASE or TESTPATTERN.
+		"""
+		global named
+
+		mod = sys.modules[sys._getframe(1).f_globals["__name__"]]
+		lazy = mod.__dict__.setdefault("_lazy_tests", {})
+		if "__getattr__" not in mod.__dict__:
+			mod.__getattr__ = _getattr(mod)
+
+		base = getattr(self, "name", self.test_function.__qualname__)
+		opts = self.kwargs
+		for (index, values) in enumerate(product(*opts.values())):
+			name = "%s%s%s_%03d" % (prefix, base, postfix, index + 1)
+			options = {}
+			for (opt, val) in zip(opts, values):
+				if isinstance(opt, tuple):
+					# option group, see TestFactory.add_option()
+					options.update(zip(opt, val))
+				else:
+					options[opt] = val
+			named += 1
+
+			if testcase:
+				lazy[name] = functools.partial(self._build, mod, name,
+				                               options)
+			elif not testpattern or \
+			     any(fnmatch.fnmatchcase(name, p) for p in testpattern):
+				self._build(mod, name, options)
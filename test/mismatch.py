@@ -0,0 +1,119 @@
+"""
+Aggregated mismatch reporting.
+
+Monitors running without failing immediately may see a mismatch every sample
+when a design is systematically wrong: logging each one in full floods logs
+and slows simulation down. Mismatches are aggregated instead: per signal
+counters, along with first and last simulation times, are always updated
+whereas only the first `first' mismatches are logged in full by monitors and
+the last `last' ones are kept as compact records. At end of test, a summary
+table of per signal counters is logged, followed by the last mismatches not
+logged already, so that logging cost remains bounded whatever the number of
+mismatches.
+
+Both `first' and `last' are given by the MISMATCH_LOG environment variable,
+defaulting to 8.
+"""
+
+import os
+from collections import deque, OrderedDict
+
+def mismatch_log(default=8):
+	"""
+	Return number of first and last mismatches logged, given by the
+	MISMATCH_LOG environment variable, defaulting to default if empty or
+	unset.
+	"""
+	return int(os.getenv("MISMATCH_LOG") or default)
+
+
+class _Signal(object):
+
+	def __init__(self, time):
+		self.count = 0
+		self.first = time
+		self.last = time
+
+
+class MismatchLog(object):
+	"""
+	Mismatch counters and last mismatch records of a monitor.
+	"""
+
+	def __init__(self, first=None, last=None, now=None):
+		if now is None:
+			from cocotb.utils import get_sim_time
+			now = get_sim_time
+		if first is None:
+			first = mismatch_log()
+		if last is None:
+			last = mismatch_log()
+
+		self._now = now
+		self._first = first
+		self.count = 0
+		self.signals = OrderedDict()
+		# (sequence, time, what, diffs) of last mismatches
+		self._last = deque(maxlen=last)
+
+
+	def record(self, what, diffs):
+		"""
+		Account a mismatch of transaction what, diffs being a list of
+		(signal, received, expected) tuples. Return True when mismatch
+		is to be logged in full.
+		"""
+		now = self._now()
+		self.count += 1
+		for (name, value, expect) in diffs:
+			sig = self.signals.get(name)
+			if sig is None:
+				sig = self.signals[name] = _Signal(now)
+			sig.count += 1
+			sig.last = now
+
+		full = self.count <= self._first
+		if self._last.maxlen:
+			self._last.append((self.count, now, what,
+			                   [(n, str(v), str(e))
+			                    for (n, v, e) in diffs]))
+		return full
+
+
+	def summary(self):
+		"""
+		Return summary lines: per signal table followed by the last
+		mismatches not logged in full.
+		"""
+		if not self.count:
+			return []
+
+		width = max([len(n) for n in self.signals] + [6])
+		lines = ["%d mismatches, %d logged in full" %
+		         (self.count, min(self.count, self._first)),
+		         "    %-*s %10s %14s %14s" % (width, "signal", "count",
+		                                      "first", "last")]
+		for (n, s) in self.signals.items():
+			lines.append("    %-*s %10d %14d %14d" %
+			             (width, n, s.count, s.first, s.last))
+
+		rest = [r for r in self._last if r[0] > self._first]
+		if rest:
+			lines.append("last %d mismatches:" % len(rest))
+		for (seq, t, what, diffs) in rest:
+			lines.append("    #%d @%d %s" % (seq, t, what) +
+			             "".join(", %s %s != %s" % (n, e, v)
+			                     for (n, v, e) in diffs))
+		return lines
+
+
+	def report(self, log):
+		"""
+		Log summary if any mismatch was recorded.
+		"""
+		lines = self.summary()
+		if not lines:
+			return
+		log.error(lines[0])
+		for l in lines[1:]:
+			log.info(l)
@@ -1,19 +1,58 @@
-import cocotb
+from collections import deque
 from logging import getLogger
-from cocotb.monitors import BusMonitor
-from cocotb.triggers import ReadOnly
-from cocotb.result import TestFailure
+from cocotb_bus.monitors import BusMonitor
+from cocotb.triggers import NextTimeStep, ReadOnly
+from sigtrace import TraceWriter
+from probe import FieldMap
+from history import History, history_depth
+from mismatch import MismatchLog
+import watchdog
+
+def _equal(value, expect):
+	# Values may either be handles, BinaryValue or plain integers unpacked
+	# from probe vector: compare them as integers unless unresolved.
+	try:
+		return int(value) == int(expect)
+	except ValueError:
+		return str(value) == str(expect)
+
 
 class BaseMonitor(BusMonitor):
 
-	def __init__(self, entity, clock, scoreboard):
-		BusMonitor.__init__(self, entity, "", clock)
+	# Signals packed into entity probe vector, most significant first ;
+	# defaults to monitored signals.
+	_probe_fields = None
+
+	def __init__(self, entity, clock, scoreboard, reset_n=None,
+	             probe=False):
+		BusMonitor.__init__(self, entity, "", clock, reset_n=reset_n)
 
 		self._expected = None
+		self._trace = None
+		self._probe = None
+		if probe:
+			# sample all signals at once thanks to the packed probe
+			# vector exposed by entity.
+			self._probe = entity.probe
+			self._fields = FieldMap.from_handles(entity,
+			                                     self._probe_fields or
+			                                     self._signals)
+			assert(self._fields.width == len(self._probe))
 		self._log = getLogger(scoreboard.log.name + '.' + self.name)
 		self._scoreboard = scoreboard
 		scoreboard.add_interface(self, [], compare_fn=self.compare)
 
+		# keep the last samples only, giving context to failures at
+		# constant memory cost whatever the run length.
+		depth = history_depth()
+		self.history = History(self._handles(), depth)
+		self._recvQ = deque(self._recvQ, maxlen=depth)
+		watchdog.register(self.dump_history)
+
+		# only the first mismatches are logged in full, others are
+		# aggregated and summarized at end of test.
+		self.mismatches = MismatchLog()
+
 
 	def _print_expected(self, key, value):
 		try:
@@ -33,12 +72,54 @@ class BaseMonitor(BusMonitor):
 			               key, str(expect), str(value))
 
 
+	def _handles(self):
+		# (name, handle) tuples of monitored signals along with clock and
+		# reset
+		names = (self._probe is not None and self._fields.names or
+		         self._signals)
+		sigs = [(n, getattr(self._entity, n)) for n in names]
+		for h in (self.clock, self._reset_n):
+			if h is not None and h._name not in names:
+				sigs.insert(0, (h._name, h))
+		return sigs
+
+
+	def dump_history(self):
+		"""
+		Dump the last samples of monitored signals.
+		"""
+		self.history.dump(self._log, self.name)
+
+
+	def _log_mismatch(self, what, transaction, diffs):
+		self._log.error("Received unexpected %s" % what)
+
+		self._log.info("Expected:")
+		for k, v in sorted(self._expected.items()):
+			if k != "name":
+				self._print_expected(k, v)
+
+		self._log.info("Received:")
+		for k, v in sorted(transaction.items()):
+			if k != "name":
+				self._print_expected(k, v)
+
+		self._log.info("Diff:")
+		for k, v, e in diffs:
+			self._print_diff(k, v, e)
+
+		self.dump_history()
+
+
 	def failure(self, message):
 		self._scoreboard.errors += 1
+		full = self.mismatches.record(message, [])
 		if self._scoreboard._imm:
-			raise TestFailure(message)
-		else:
+			self.dump_history()
+			raise AssertionError(message)
+		if full:
 			self._log.error(message)
+			self.dump_history()
 
 
 	def compare(self, transaction):
@@ -47,66 +128,85 @@ class BaseMonitor(BusMonitor):
 
 		self._log.debug("Checking " + self._expected["name"] + "...")
 
-		wrong = False
 		# validate transaction against signals present into expected
 		# output
-		for k,v in transaction.items():
-			if (self._expected.has_key(k) and
-			    (k != "name") and
-			    (not str(v) == str(self._expected[k]))):
-				wrong = True
-				break
-
-		if wrong:
-			self._log.error("Received unexpected %s" %
-			                (self._expected.has_key("name") == True
-			                 and self._expected["name"] or
-			                 "anonymous transaction"))
-
-			self._log.info("Expected:")
-			for k, v in sorted(self._expected.items()):
-				if k != "name":
-					self._print_expected(k, v)
-
-			self._log.info("Received:")
-			for k, v in sorted(transaction.items()):
-				if k != "name":
-					self._print_expected(k, v)
-
-			self._log.info("Diff:")
-			for k, v in sorted(transaction.items()):
-				if ((k == "name") or
-				    (not self._expected.has_key(k))):
-					continue
-				if not str(v) == str(self._expected[k]):
-					self._print_diff(k, v,
-					                 self._expected[k])
+		diffs = [(k, v, self._expected[k])
+		         for k, v in sorted(transaction.items())
+		         if (k in self._expected and
+		             (k != "name") and
+		             (not _equal(v, self._expected[k])))]
 
+		if diffs:
 			self._scoreboard.errors += 1
+			what = self._expected.get("name", "anonymous transaction")
+			if (self.mismatches.record(what, diffs) or
+			    self._scoreboard._imm):
+				self._log_mismatch(what, transaction, diffs)
 			if self._scoreboard._imm:
-				raise TestFailure(("Received unexpected ",
-				                   "transaction"))
+				raise AssertionError("Received unexpected "
+				                     "transaction")
 
 		self._expected = None
 
 
-	@cocotb.coroutine
-	def expect(self, expected):
+	def trace(self, path, chunk=65536):
+		"""
+		Record all monitored signals along with clock and reset into the
+		columnar trace file located at path.
+		"""
+		self._trace = TraceWriter(path, self._handles(), chunk)
+
+
+	async def _sample(self):
+		# wait for settled signal values of next simulation time step
+		await NextTimeStep()
+		await ReadOnly()
+
+
+	def check(self, expected):
+		"""
+		Compare current value of monitored signals against expected ones
+		at once, i.e. without waiting for next sample.
+		"""
 		assert(self._expected == None)
 		self._expected = expected
+		transaction = self._transaction()
+		self.history.sample(transaction)
+		self.compare(transaction)
+
 
-		yield self.wait_for_recv()
+	def _transaction(self):
+		if self._probe is not None:
+			return self._fields.decode(self._probe)
 
+		# build transaction from the entire list of declared signals
+		transaction = {}
+		for sig in self._signals:
+			transaction[sig] = getattr(self.bus, sig).value
 
-	@cocotb.coroutine
-	def _monitor_recv(self):
-		while True:
-			yield ReadOnly()
+		return transaction
 
-			# build transaction from the entire list of declared
-			# signals
-			transaction = {}
-			for sig in self._signals:
-				transaction[sig] = getattr(self.bus, sig)
 
-			self._recv(transaction)
+	async def expect(self, expected):
+		assert(self._expected == None)
+		self._expected = expected
+
+		await self.wait_for_recv()
+
+
+	async def _monitor_recv(self):
+		try:
+			while True:
+				await self._sample()
+
+				transaction = self._transaction()
+				self.history.sample(transaction)
+				if self._trace is not None:
+					self._trace.sample(transaction)
+
+				self._recv(transaction)
+		finally:
+			# monitor coroutine is killed at end of test
+			if self._trace is not None:
+				self._trace.close()
+			self.mismatches.report(self._log)
@@ -0,0 +1,143 @@
+"""
+Multi-instance test wrapper support.
+
+tmr_multi<N>_tb wrappers instantiate N tmr_axi4ls timers sharing clock and
+reset, each with its own AXI4-lite slave port and interrupt request exposed as
+<port>_<index> toplevel ports. VHDL cannot name ports after a generic count,
+hence wrappers are generated by running this module:
+
+    python multi.py <N> > tmr_multi<N>_tb.vhd
+
+InstancePorts gives drivers and monitors written for a single instance a view
+of a wrapper restricted to the ports of one instance.
+"""
+
+import sys
+
+class InstancePorts(object):
+	"""
+	View of the ports of instance index of entity. Ports listed into shared
+	are accessed unsuffixed.
+	"""
+
+	def __init__(self, entity, index, shared=("aclk", "areset_n")):
+		object.__setattr__(self, "_entity", entity)
+		object.__setattr__(self, "_suffix", "_%d" % index)
+		object.__setattr__(self, "_shared", shared)
+		object.__setattr__(self, "_log", entity._log)
+		object.__setattr__(self, "_name", "%s_%d" % (entity._name, index))
+
+
+	def _port(self, name):
+		if name in self._shared:
+			return name
+		return name + self._suffix
+
+
+	def __getattr__(self, name):
+		return getattr(self._entity, self._port(name))
+
+
+	def __setattr__(self, name, value):
+		setattr(self._entity, self._port(name), value)
+
+
+_ports = [ ("awvalid", "in",  "std_logic"),
+           ("awready", "out", "std_logic"),
+           ("awaddr",  "in",  "std_logic_vector(31 downto 0)"),
+           ("awprot",  "in",  "std_logic_vector(2 downto 0)"),
+           ("wvalid",  "in",  "std_logic"),
+           ("wready",  "out", "std_logic"),
+           ("wdata",   "in",  "std_logic_vector(31 downto 0)"),
+           ("wstrb",   "in",  "std_logic_vector(3 downto 0)"),
+           ("bvalid",  "out", "std_logic"),
+           ("bready",  "in",  "std_logic"),
+           ("bresp",   "out", "std_logic_vector(1 downto 0)"),
+           ("arvalid", "in",  "std_logic"),
+           ("arready", "out", "std_logic"),
+           ("araddr",  "in",  "std_logic_vector(31 downto 0)"),
+           ("arprot",  "in",  "std_logic_vector(3 downto 0)"),
+           ("rvalid",  "out", "std_logic"),
+           ("rready",  "in",  "std_logic"),
+           ("rdata",   "out", "std_logic_vector(31 downto 0)"),
+           ("rresp",   "out", "std_logic_vector(1 downto 0)"),
+           ("int",     "out", "std_logic") ]
+
+_header = """\
+--------------------------------------------------------------------------------
+-- Wrapper around %(count)d tmr_axi4ls instances sharing clock and reset.
+-- Generated by test/multi.py: do not edit.
+-- Not meant to be synthesizable.
+--------------------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library time;
+use time.timer.all;
+
+entity %(name)s is
+	port(
+		aclk     : in  std_logic;
+		areset_n : in  std_logic;
+%(ports)s
+		-- clock generated internally instead of aclk when hclk_en is
+		-- high (see test/clk_gen.vhd)
+		hclk_en  : in  std_logic;
+		hclk_half: in  unsigned(31 downto 0)
+	);
+end entity %(name)s;
+
+architecture behaviour of %(name)s is
+	component clk_gen is
+		port(
+			en  : in  std_logic;
+			half: in  unsigned(31 downto 0);
+			clk : out std_logic
+		);
+	end component clk_gen;
+
+	signal hclk_a: std_logic;
+	signal aclk_a: std_logic;
+begin
+	hclk: clk_gen port map (
+		en   => hclk_en,
+		half => hclk_half,
+		clk  => hclk_a
+	);
+
+	aclk_a <= hclk_a when hclk_en = '1' else aclk;
+"""
+
+_instance = """
+	tmr_%(index)d: tmr_axi4ls port map (
+		aclk     => aclk_a,
+		areset_n => areset_n,
+%(ports)s
+	);
+"""
+
+def vhdl(count):
+	"""
+	Return VHDL source of wrapper instantiating count timers.
+	"""
+	name = "tmr_multi%d_tb" % count
+	ports = []
+	for i in range(count):
+		for (p, d, t) in _ports:
+			ports.append("\t\t%-10s: %-4s%s;" %
+			             ("%s_%d" % (p, i), d, t))
+		ports.append("")
+
+	src = _header % { "count": count, "name": name,
+	                  "ports": "\n".join(ports) }
+	for i in range(count):
+		maps = ["\t\t%-8s => %s_%d" % (p, p, i) for (p, d, t) in _ports]
+		src += _instance % { "index": i, "ports": ",\n".join(maps) }
+	src += "end architecture behaviour;\n"
+
+	return src
+
+
+if __name__ == "__main__":
+	sys.stdout.write(vhdl(int(sys.argv[1])))
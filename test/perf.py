@@ -0,0 +1,269 @@
+"""
+AXI4-Lite slave latency and throughput characterization.
+
+A performance monitor samples channel handshakes at clock rising edges and
+measures, in clock cycles:
+  * write latency, from awvalid assertion to bvalid assertion,
+  * read latency, from arvalid assertion to rvalid assertion,
+  * sustained throughput, i.e. completed transactions per cycle from first
+    request to last response,
+  * cycles spent with both a write and a read outstanding.
+
+Perf bench drives slaves through an AXI4-Lite master with various ready
+back-pressure patterns and transaction mixes, then saves results as JSON
+reports under the directory given by the PERF_DIR environment variable.
+"""
+
+import random
+import cocotb
+from cocotb_bus.monitors import BusMonitor
+from cocotb.triggers import RisingEdge
+from amba import Axi4lMaster
+from clocking import TbClock
+from bench import save_report
+
+class Histogram(object):
+	"""
+	Histogram of integer values.
+	"""
+
+	def __init__(self):
+		self._bins = {}
+		self.count = 0
+		self._total = 0
+
+
+	def add(self, value):
+		self._bins[value] = self._bins.get(value, 0) + 1
+		self.count += 1
+		self._total += value
+
+
+	def percentile(self, pct):
+		rank = pct * self.count / 100.0
+		seen = 0
+		for v in sorted(self._bins):
+			seen += self._bins[v]
+			if seen >= rank:
+				return v
+		return None
+
+
+	def to_dict(self):
+		if not self.count:
+			return { "count": 0 }
+		return {
+		        "count": self.count,
+		        "min"  : min(self._bins),
+		        "max"  : max(self._bins),
+		        "mean" : float(self._total) / self.count,
+		        "p50"  : self.percentile(50),
+		        "p90"  : self.percentile(90),
+		        "p99"  : self.percentile(99),
+		        "bins" : dict((str(v), n)
+		                      for (v, n) in sorted(self._bins.items()))
+		}
+
+
+class Axi4lPerfMonitor(BusMonitor):
+	"""
+	AXI4-Lite latency and throughput monitor.
+	"""
+
+	_signals = ["awvalid", "awready", "wvalid", "wready", "bvalid",
+	            "bready", "arvalid", "arready", "rvalid", "rready"]
+
+	def __init__(self, entity, clock):
+		self.restart()
+		BusMonitor.__init__(self, entity, "", clock)
+
+
+	def restart(self):
+		self.write = Histogram()
+		self.read = Histogram()
+		self.concurrent = 0
+		self._cycle = 0
+		self._first = None
+		self._last = None
+		self._aw = None
+		self._ar = None
+		self._bvalid = False
+		self._rvalid = False
+
+
+	def _start(self):
+		if self._first is None:
+			self._first = self._cycle
+
+
+	async def _monitor_recv(self):
+		bus = self.bus
+		while True:
+			await RisingEdge(self.clock)
+			self._cycle += 1
+
+			try:
+				self._sample(bus)
+			except ValueError:
+				# unresolved values, i.e. bus not reset yet
+				pass
+
+
+	def _sample(self, bus):
+		cyc = self._cycle
+
+		if self._aw is None and int(bus.awvalid.value):
+			self._aw = cyc
+			self._start()
+		bvalid = bool(int(bus.bvalid.value))
+		if bvalid and not self._bvalid and self._aw is not None:
+			self.write.add(cyc - self._aw)
+		self._bvalid = bvalid
+		if bvalid and int(bus.bready.value):
+			self._aw = None
+			self._last = cyc
+
+		if self._ar is None and int(bus.arvalid.value):
+			self._ar = cyc
+			self._start()
+		rvalid = bool(int(bus.rvalid.value))
+		if rvalid and not self._rvalid and self._ar is not None:
+			self.read.add(cyc - self._ar)
+		self._rvalid = rvalid
+		if rvalid and int(bus.rready.value):
+			self._ar = None
+			self._last = cyc
+
+		if self._aw is not None and self._ar is not None:
+			self.concurrent += 1
+
+
+	def report(self):
+		"""
+		Return measurements as a dictionary.
+		"""
+		cycles = 0
+		if self._first is not None and self._last is not None:
+			cycles = self._last - self._first + 1
+		xacts = self.write.count + self.read.count
+		return {
+		        "cycles"           : cycles,
+		        "xacts"            : xacts,
+		        "throughput"       : cycles and float(xacts) / cycles,
+		        "concurrent_cycles": self.concurrent,
+		        "write_latency"    : self.write.to_dict(),
+		        "read_latency"     : self.read.to_dict()
+		}
+
+
+class Axi4lPerfBench(object):
+	"""
+	Characterization bench for an AXI4-Lite slave entity clocked by aclk
+	and decoding the given list of register addresses.
+	"""
+
+	def __init__(self, entity, period, addrs, rng=random):
+		self._entity = entity
+		self._period = period
+		self._addrs = addrs
+		self._rng = rng
+		self._clk = TbClock(entity, "aclk")
+		self._mst = Axi4lMaster(entity, self._clk.signal, 32)
+		self.monitor = Axi4lPerfMonitor(entity, self._clk.signal)
+
+
+	async def start(self):
+		period = self._period
+		self._entity.bready.value = 0
+		self._entity.rready.value = 0
+		await self._mst.reset(period)
+		self._clk.start(period)
+		await RisingEdge(self._clk.signal)
+		await self._mst.dereset()
+		self.monitor.restart()
+
+
+	def _ready_delay(self, pattern):
+		# master ready assertion delay, i.e. back-pressure applied to
+		# slave response channels
+		if pattern == "none":
+			return 0
+		elif pattern == "fixed":
+			return 5 * self._period // 4
+		elif pattern == "random":
+			return self._rng.randint(0, 48) * self._period // 16
+		raise ValueError("unknown back-pressure pattern " + pattern)
+
+
+	async def _writes(self, count, pattern):
+		for x in range(count):
+			delay = self._ready_delay(pattern)
+			await self._mst.wrxact(self._rng.choice(self._addrs),
+			                       self._rng.getrandbits(32),
+			                       resp_delay=delay)
+
+
+	async def _reads(self, count, pattern):
+		for x in range(count):
+			delay = self._ready_delay(pattern)
+			await self._mst.rdxact(self._rng.choice(self._addrs),
+			                       data_delay=delay)
+
+
+	async def run(self, mix, pattern, count):
+		"""
+		Issue count back to back transactions of the given mix ("write",
+		"read" or "concurrent", i.e. count writes and count reads issued
+		simultaneously) under the given back-pressure pattern ("none",
+		"fixed" or "random").
+		"""
+		threads = []
+		if mix in ("write", "concurrent"):
+			threads.append(cocotb.start_soon(self._writes(count,
+			                                              pattern)))
+		if mix in ("read", "concurrent"):
+			threads.append(cocotb.start_soon(self._reads(count,
+			                                             pattern)))
+		if not threads:
+			raise ValueError("unknown transaction mix " + mix)
+
+		for t in threads:
+			await t
+		# let monitor sample last response handshake
+		await RisingEdge(self._clk.signal)
+		await RisingEdge(self._clk.signal)
+
+
+	def save(self, name, **params):
+		"""
+		Save measurements along with the given parameters as a JSON
+		report under PERF_DIR if not empty. Return the report.
+		"""
+		rep = self.monitor.report()
+		rep.update(params)
+		rep["period"] = self._period
+		save_report(name, rep)
+		return rep
+
+
+async def axi4l_test_perf(dut, period, addrs, mix, pattern, count):
+	"""
+	Characterize slave dut under the given transaction mix and
+	back-pressure pattern.
+	"""
+	bench = Axi4lPerfBench(dut, period, addrs)
+	await bench.start()
+	await bench.run(mix, pattern, count)
+
+	rep = bench.save("%s_%s_%s" % (dut._name, mix, pattern), dut=dut._name,
+	                 mix=mix, pattern=pattern)
+	dut._log.info("%s/%s: %d xacts in %d cycles (%.3f xacts/cycle), "
+	              "write latency p50=%s max=%s, read latency p50=%s "
+	              "max=%s, %d concurrent cycles",
+	              mix, pattern, rep["xacts"], rep["cycles"],
+	              rep["throughput"],
+	              rep["write_latency"].get("p50"),
+	              rep["write_latency"].get("max"),
+	              rep["read_latency"].get("p50"),
+	              rep["read_latency"].get("max"),
+	              rep["concurrent_cycles"])
@@ -0,0 +1,86 @@
+"""
+Packed probe vector support.
+
+Test wrappers may expose a single `probe' std_logic_vector output made of the
+concatenation of all signals watched by a monitor, so that sampling them costs
+a single simulator access instead of one per signal. The field map describing
+the concatenation is generated from the monitor signal list and the widths of
+the corresponding entity handles: wrappers MUST concatenate signals in the very
+same order, first signal holding the most significant bits (see FieldMap.vhdl()
+to generate the matching VHDL assignment).
+"""
+
+class FieldMap(object):
+	"""
+	Layout of signals packed into a probe vector.
+
+	`fields' is a list of (name, width) tuples, first field being located
+	at the most significant end of the vector.
+	"""
+
+	def __init__(self, fields):
+		self.names = [n for (n, w) in fields]
+		self.width = sum(w for (n, w) in fields)
+
+		self._slices = []
+		shift = self.width
+		for (n, w) in fields:
+			shift -= w
+			self._slices.append((n, shift, (1 << w) - 1))
+
+
+	@classmethod
+	def from_handles(cls, entity, names):
+		return cls([(n, len(getattr(entity, n))) for n in names])
+
+
+	def unpack(self, value):
+		"""
+		Unpack integer value into a dictionary of field integer values.
+		"""
+		return dict((n, (value >> s) & m) for (n, s, m) in self._slices)
+
+
+	def pack(self, values):
+		"""
+		Pack a dictionary of field integer values into an integer value.
+		Missing fields are packed as zeros.
+		"""
+		return sum((values[n] & m) << s for (n, s, m) in self._slices
+		           if n in values)
+
+
+	def unpack_str(self, binstr):
+		"""
+		Unpack binary string value into a dictionary of field values.
+		Fields holding unresolved bits (X, Z, U, ...) are given as their
+		binary string.
+		"""
+		res = {}
+		for (n, s, m) in self._slices:
+			bits = binstr[self.width - s - m.bit_length():self.width - s]
+			try:
+				res[n] = int(bits, 2)
+			except ValueError:
+				res[n] = bits
+		return res
+
+
+	def decode(self, handle):
+		"""
+		Read probe vector handle once and unpack its fields.
+		"""
+		value = handle.value
+		try:
+			return self.unpack(int(value))
+		except ValueError:
+			return self.unpack_str(value.binstr)
+
+
+	def vhdl(self, target="probe"):
+		"""
+		Return VHDL concurrent assignment of target probe vector matching
+		this layout.
+		"""
+		pad = " " * (len(target) + 4)
+		return "%s <= %s;" % (target, (" &\n" + pad).join(self.names))
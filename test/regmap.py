@@ -0,0 +1,230 @@
+"""
+Timer register map.
+
+Register indexes and control modes are parsed from the constants of the timer
+package (src/timer_pkg.vhd) so that test benches need not hand-copy them. Field
+layouts and volatility are not expressed in the package: they are described
+below and MUST be kept in sync with tmr_regs.vhd.
+
+Mirror shadows register contents as written by a test bench: reads of
+non-volatile registers are served from the shadow copy without any bus
+transaction, whereas volatile ones (STAT cleared upon read, free running CNT)
+are always read from the bus. In checked-read mode, requested by setting the
+MIRROR_CHECK environment variable, all reads go to the bus and non-volatile
+register values are verified against the shadow copy.
+"""
+
+import os
+import re
+from collections import OrderedDict
+from probe import FieldMap
+
+# Default read mode, as requested by the MIRROR_CHECK environment variable.
+mirror_check = bool(os.getenv("MIRROR_CHECK"))
+
+# Timer package, located relative to test sources.
+timer_pkg = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         os.pardir, "src", "timer_pkg.vhd")
+
+# Register layouts: (name, fields, volatile, write only fields), fields being
+# (name, width) tuples, first field holding the most significant bits and
+# unnamed ones being reserved. Keep in sync with tmr_regs.vhd.
+_layouts = [
+	("CTRL", [(None, 30), ("mode", 2)],               False, ()),
+	("STAT", [(None, 30), ("arm", 1), ("alrm", 1)],   True,  ()),
+	("ALRM", [("lapse", 30), ("arm", 1), ("load", 1)], False,
+	 ("arm", "load")),
+	("CNT",  [("count", 32)],                         True,  ())
+]
+
+_reg_re = re.compile(r"constant\s+TMR_(\w+)_REG\s*:\s*natural"
+                     r"\s*:=\s*(\d+)\s*;", re.I)
+_mode_re = re.compile(r"constant\s+TMR_CTRL_MODE_(\w+)\s*:\s*std_logic_vector"
+                      r"\s*\([^)]*\)\s*:=\s*b\"([01_]+)\"\s*;", re.I)
+
+class Register(object):
+	"""
+	Register description: name, index, byte offset on the bus, field
+	layout and volatility.
+	"""
+
+	def __init__(self, name, index, fields, volatile=False, wronly=()):
+		self.name = name
+		self.index = index
+		self.offset = index * 4
+		self.volatile = volatile
+		self.fields = [n for (n, w) in fields if n]
+		self._map = FieldMap([(n or "_rsvd%d" % i, w)
+		                      for (i, (n, w)) in enumerate(fields)])
+		# mask of bits read back as written
+		self.readback = self._map.pack(dict((n, -1) for n in self.fields
+		                                    if n not in wronly))
+
+
+	def pack(self, **fields):
+		"""
+		Return register value made of given field values, missing ones
+		being zeros.
+		"""
+		for n in fields:
+			if n not in self.fields:
+				raise KeyError("%s: no such field %s" % (self.name, n))
+		return self._map.pack(fields)
+
+
+	def unpack(self, value):
+		"""
+		Return dictionary of field values of register value.
+		"""
+		vals = self._map.unpack(int(value))
+		return dict((n, vals[n]) for n in self.fields)
+
+
+	def __repr__(self):
+		return self.name
+
+
+class _Constants(object):
+
+	def __init__(self, items):
+		self._items = items
+		for (n, v) in items:
+			setattr(self, n, v)
+
+
+	def items(self):
+		return list(self._items)
+
+
+class RegMap(object):
+	"""
+	Register map of timer package found at path. Registers are available
+	as attributes named after them (e.g. regmap.CTRL), control modes as
+	attributes of regmap.mode (e.g. regmap.mode.AUTO).
+	"""
+
+	def __init__(self, path=timer_pkg):
+		with open(path) as f:
+			text = f.read()
+
+		idx = OrderedDict((n.upper(), int(v))
+		                  for (n, v) in _reg_re.findall(text))
+		self._regs = []
+		for (name, fields, volatile, wronly) in _layouts:
+			if name not in idx:
+				raise ValueError("%s: TMR_%s_REG not defined" %
+				                 (path, name))
+			self._regs.append(Register(name, idx[name], fields,
+			                           volatile, wronly))
+		self._regs.sort(key=lambda r: r.index)
+		for r in self._regs:
+			setattr(self, r.name, r)
+
+		self.mode = _Constants([(n.upper(), int(v.replace("_", ""), 2))
+		                        for (n, v) in _mode_re.findall(text)])
+
+
+	def __iter__(self):
+		return iter(self._regs)
+
+
+	def at(self, offset):
+		"""
+		Return register located at byte offset.
+		"""
+		for r in self._regs:
+			if r.offset == offset:
+				return r
+		raise KeyError("no register at offset %d" % offset)
+
+
+# Timer register map, parsed once.
+timer_regs = RegMap()
+
+class Mirror(object):
+	"""
+	Shadow copy of registers accessed through read(offset) and
+	write(offset, data) coroutine functions, e.g. those of an AXI master.
+
+	Non-volatile registers are served from the shadow copy once known, i.e.
+	after reset() or a first write or read. Mismatches found in checked-read
+	mode raise an AssertionError.
+	"""
+
+	def __init__(self, regmap, read, write, checked=None):
+		self._regs = regmap
+		self._read = read
+		self._write = write
+		self._checked = mirror_check if checked is None else checked
+		self._shadow = {}
+		self.reads = 0
+		self.hits = 0
+
+
+	def reset(self):
+		"""
+		Load register reset values, i.e. zeros.
+		"""
+		self._shadow = dict((r, 0) for r in self._regs if not r.volatile)
+
+
+	def written(self, reg, data):
+		"""
+		Account for data written to reg by other means than write().
+		"""
+		if not reg.volatile:
+			self._shadow[reg] = int(data) & reg.readback
+
+
+	def predict(self, reg):
+		"""
+		Return value expected to be read from reg, None when unknown.
+		"""
+		return self._shadow.get(reg)
+
+
+	async def write(self, reg, data=None, **fields):
+		"""
+		Write data, or value made of given fields, to reg.
+		"""
+		if data is None:
+			data = reg.pack(**fields)
+		await self._write(reg.offset, data)
+		self.written(reg, data)
+
+
+	async def read(self, reg, fresh=False):
+		"""
+		Return reg value, from shadow copy when possible unless fresh,
+		i.e. when register content itself is to be checked.
+		"""
+		shadow = self._shadow.get(reg)
+		if shadow is not None and not (self._checked or fresh):
+			self.hits += 1
+			return shadow
+
+		data = int(await self._read(reg.offset))
+		self.reads += 1
+		if self._checked and shadow is not None and data != shadow:
+			raise AssertionError("%s: mirror mismatch (received != "
+			                     "expected): 0x%08x != 0x%08x" %
+			                     (reg, data, shadow))
+		self.written(reg, data)
+		return data
+
+
+	async def fields(self, reg, fresh=False):
+		"""
+		Return dictionary of reg field values.
+		"""
+		return reg.unpack(await self.read(reg, fresh))
+
+
+	async def update(self, reg, **fields):
+		"""
+		Read-modify-write given fields of reg, write only fields not given
+		being written as zeros.
+		"""
+		vals = reg.unpack(await self.read(reg) & reg.readback)
+		vals.update(fields)
+		await self.write(reg, **vals)
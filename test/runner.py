@@ -0,0 +1,213 @@
+"""
+Co-simulation result cache.
+
+Wrap a co-simulation command so that tests already passed with the very same
+inputs are not run again. Inputs are identified by a hash of the content of
+all sources the co-simulation depends upon (analyzed VHDL, test module and
+Python helpers) along with the random seed given by the RANDOM_SEED
+environment variable, the test selection given by the TESTPATTERN one (see
+lazytest.py) and the values of environment variables altering what
+co-simulations do or produce (see knobs below). Cached results are stored per
+test, i.e. per name of test generated by the test module, into a JSON file:
+
+  * when inputs changed, or no cache exists yet, all tests are run ;
+  * otherwise, only tests which did not pass are run again, selected through
+    the cocotb TESTCASE environment variable, and the simulator is not even
+    started when all of them passed.
+
+Results of cached tests are merged back into the cocotb results file so that
+reports remain complete. Results are never reused when RANDOM_SEED is empty
+since every run then draws a different seed. The cache is bypassed, i.e. all
+tests are run and results are not recorded, when artifacts are requested
+through any of the output directory variables below, since cached tests would
+produce none, and in coverage driven mode, since tests are then skipped
+according to coverage databases found into COVER_DIR, which content is not
+hashed.
+
+Usage:
+
+    python runner.py [-f] -c <cache> <source>... -- <command>...
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+# environment variables passed by the Makefile which alter what
+# co-simulations do or produce, hence their results
+outputs = ("TRACE_DIR", "PERF_DIR", "XACT_DIR", "HISTORY_DIR", "COVER_DIR",
+           "SOAK_DIR")
+knobs = ("HDL_CLOCK", "PACKED_DRIVE", "STIM_PLAY", "OFFLINE_CHECK",
+         "MIRROR_CHECK", "COVER_STOP", "SIM_BUDGET", "WALL_BUDGET",
+         "HISTORY_DEPTH", "XACT_REPLAY", "SOAK_CYCLES") + outputs
+
+def source_hash(paths, seed, pattern="", env={}):
+	"""
+	Return hex digest of the content of files located at paths, seed, test
+	selection pattern and values of knobs found into env.
+	"""
+	h = hashlib.sha256()
+	for p in sorted(set(paths)):
+		h.update(p.encode("utf-8") + b"\0")
+		with open(p, "rb") as f:
+			for blk in iter(lambda: f.read(1 << 16), b""):
+				h.update(blk)
+	h.update(("seed=%s" % seed).encode("ascii"))
+	if pattern:
+		h.update(("pattern=%s" % pattern).encode("utf-8"))
+	for k in knobs:
+		if env.get(k):
+			h.update(("\0%s=%s" % (k, env[k])).encode("utf-8"))
+	return h.hexdigest()
+
+
+class ResultCache(object):
+	"""
+	Per test results of a co-simulation, valid for a given source hash.
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		self.key = None
+		self.tests = {}
+		if os.path.exists(path):
+			with open(path) as f:
+				data = json.load(f)
+			self.key = data["key"]
+			self.tests = data["tests"]
+
+
+	def pending(self):
+		"""
+		Return names of tests which did not pass.
+		"""
+		return sorted(n for (n, t) in self.tests.items()
+		              if not t["pass"])
+
+
+	def update(self, key, results):
+		"""
+		Record testcase elements of results (see read_results) as
+		obtained with sources hashed as key.
+		"""
+		if key != self.key:
+			self.key = key
+			self.tests = {}
+		for (name, case) in results.items():
+			ok = (case.find("failure") is None and
+			      case.find("error") is None and
+			      case.find("skipped") is None)
+			self.tests[name] = { "pass": ok,
+			                     "xml" : ET.tostring(case)
+			                             .decode("utf-8") }
+
+
+	def save(self):
+		directory = os.path.dirname(self.path)
+		if directory and not os.path.isdir(directory):
+			os.makedirs(directory)
+		tmp = self.path + ".tmp"
+		with open(tmp, "w") as f:
+			json.dump({ "key": self.key, "tests": self.tests }, f,
+			          indent=1, sort_keys=True)
+		os.rename(tmp, self.path)
+
+
+def read_results(path):
+	"""
+	Return testcase elements of a cocotb results file indexed by test name.
+	"""
+	res = {}
+	if not os.path.exists(path):
+		return res
+	for case in ET.parse(path).iter("testcase"):
+		res[case.get("name")] = case
+	return res
+
+
+def write_results(path, fresh, cache):
+	"""
+	Write a cocotb results file holding fresh testcase elements along with
+	cached results of other tests.
+	"""
+	root = ET.Element("testsuites", name="results")
+	suite = ET.SubElement(root, "testsuite", name="all", package="all")
+	for name in sorted(set(fresh) | set(cache.tests)):
+		if name in fresh:
+			suite.append(fresh[name])
+		else:
+			case = ET.fromstring(cache.tests[name]["xml"])
+			case.set("cached", "true")
+			suite.append(case)
+	ET.ElementTree(root).write(path, encoding="UTF-8",
+	                           xml_declaration=True)
+
+
+def run(cache_path, sources, command, force=False, log=sys.stderr):
+	seed = os.getenv("RANDOM_SEED", "")
+	key = source_hash(sources, seed, os.getenv("TESTPATTERN", ""),
+	                  os.environ)
+	cache = ResultCache(cache_path)
+	results = os.getenv("COCOTB_RESULTS_FILE") or "results.xml"
+
+	bypass = (os.getenv("COVER_STOP") or
+	          any(os.getenv(o) for o in outputs))
+	if bypass:
+		log.write("%s: output directory or coverage driven mode "
+		          "requested, cache bypassed\n" % cache_path)
+
+	env = dict(os.environ)
+	if (force or bypass or not seed or key != cache.key or
+	    not cache.tests):
+		env["TESTCASE"] = ""
+		tests = None
+	else:
+		tests = cache.pending()
+		if not tests:
+			log.write("%s: all %d tests passed already, nothing to "
+			          "run\n" % (cache_path, len(cache.tests)))
+			write_results(results, {}, cache)
+			return 0
+		log.write("%s: running %d out of %d tests: %s\n" %
+		          (cache_path, len(tests), len(cache.tests),
+		           ",".join(tests)))
+		env["TESTCASE"] = ",".join(tests)
+
+	if os.path.exists(results):
+		os.remove(results)
+	ret = subprocess.call(command, env=env)
+
+	fresh = read_results(results)
+	if seed and fresh and not bypass:
+		cache.update(key, fresh)
+		cache.save()
+	if tests is not None:
+		write_results(results, fresh, cache)
+	return ret
+
+
+def main(argv):
+	import argparse
+
+	if "--" not in argv:
+		sys.stderr.write(__doc__)
+		return 2
+	sep = argv.index("--")
+
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+	parser.add_argument("-c", "--cache", required=True,
+	                    help="result cache file")
+	parser.add_argument("-f", "--force", action="store_true",
+	                    help="run all tests whatever the cache content")
+	parser.add_argument("source", nargs="*",
+	                    help="source file co-simulation depends upon")
+	args = parser.parse_args(argv[:sep])
+
+	return run(args.cache, args.source, argv[sep + 1:], args.force)
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
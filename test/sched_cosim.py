@@ -0,0 +1,138 @@
+"""
+Coroutine scheduler overhead benchmark.
+
+Run the same workload, i.e. a number of concurrent agents each awaiting a
+nested driver-like phase coroutine per clock cycle, scheduled first through
+legacy generator based coroutines (@cocotb.coroutine, cocotb.fork and join)
+then through native coroutines (async def, await and cocotb.start_soon). The
+difference of wall clock time per simulated cycle gives scheduler overhead
+saved by native coroutines.
+
+This is a proxy: test benches as they were before the port to native
+coroutines require Python 2 and a cocotb release older than supported ones,
+still shipping cocotb.bus (see Makefile install-cocotb), so that real suites
+cannot be timed before and after the port within the same environment.
+Agents mimic the structure of ported drivers instead, i.e. nested phase
+coroutines awaiting clock edges, forked and joined per transaction. To relate
+the proxy to real workloads, the same test finally times register traffic
+issued by the ported Axi4lMaster onto tmr_axi4ls: its wall clock time per
+cycle in excess of the idle baseline is the whole test bench cost of that
+workload, to be compared with the per agent scheduler overheads measured
+above.
+
+Results are saved as JSON reports under PERF_DIR if not empty.
+"""
+
+import warnings
+import cocotb
+from cocotb.triggers import Timer, RisingEdge
+from watchdog import TestFactory
+from amba import Axi4lMaster
+from clocking import TbClock
+from bench import SimRate, save_report
+from regmap import timer_regs
+
+@cocotb.coroutine
+def _legacy_phase(clock):
+	yield RisingEdge(clock)
+
+
+@cocotb.coroutine
+def _legacy_agent(clock, cycles):
+	for c in range(cycles):
+		yield _legacy_phase(clock)
+
+
+@cocotb.coroutine
+def _legacy_run(clock, agents, cycles):
+	threads = [cocotb.fork(_legacy_agent(clock, cycles))
+	           for a in range(agents)]
+	for t in threads:
+		yield t.join()
+
+
+async def _native_phase(clock):
+	await RisingEdge(clock)
+
+
+async def _native_agent(clock, cycles):
+	for c in range(cycles):
+		await _native_phase(clock)
+
+
+async def _native_run(clock, agents, cycles):
+	threads = [cocotb.start_soon(_native_agent(clock, cycles))
+	           for a in range(agents)]
+	for t in threads:
+		await t
+
+
+async def _driver_run(master, clock, cycles):
+	# alternate register writes and reads till cycles elapsed
+	rate = SimRate(clock.period)
+	while rate.cycles() < cycles:
+		await master.wrxact(timer_regs.CNT.offset, rate.cycles())
+		await master.rdxact(timer_regs.CNT.offset)
+
+
+async def sched_test_overhead(dut, agents, cycles):
+	""" Legacy versus native coroutines scheduling overhead"""
+	clk = TbClock(dut, "aclk")
+	dut.areset_n.value = 0
+	clk.start(clk_t)
+	await Timer(clk_t, "step")
+
+	# baseline: simulator and clock only
+	rate = SimRate(clk_t)
+	await clk.cycles(cycles)
+	idle = rate.report(dut._log, "idle")
+
+	with warnings.catch_warnings():
+		# fork() and generator based coroutines are deprecated
+		warnings.simplefilter("ignore", DeprecationWarning)
+		rate = SimRate(clk_t)
+		await _legacy_run(clk.signal, agents, cycles)
+		legacy = rate.report(dut._log, "%d legacy agents" % agents)
+
+	rate = SimRate(clk_t)
+	await _native_run(clk.signal, agents, cycles)
+	native = rate.report(dut._log, "%d native agents" % agents)
+
+	# real workload: ported driver issuing register traffic
+	mst = Axi4lMaster(dut, clk.signal, 32)
+	await mst.reset(clk_t)
+	await mst.dereset()
+	rate = SimRate(clk_t)
+	await _driver_run(mst, clk, cycles)
+	driver = rate.report(dut._log, "native driver")
+
+	rep = { "agents": agents,
+	        "cycles": cycles,
+	        "period": clk_t,
+	        "idle_rate": idle,
+	        "legacy_rate": legacy,
+	        "native_rate": native,
+	        "driver_rate": driver }
+	if idle and legacy and native:
+		# wall clock seconds spent into scheduler per agent and cycle
+		rep["legacy_overhead"] = (1.0 / legacy - 1.0 / idle) / agents
+		rep["native_overhead"] = (1.0 / native - 1.0 / idle) / agents
+		dut._log.info("scheduler overhead: %.1f us legacy, %.1f us "
+		              "native per agent and cycle",
+		              rep["legacy_overhead"] * 1e6,
+		              rep["native_overhead"] * 1e6)
+	if idle and driver:
+		# wall clock seconds spent into test bench per driver cycle
+		rep["driver_overhead"] = 1.0 / driver - 1.0 / idle
+		dut._log.info("driver overhead: %.1f us per cycle",
+		              rep["driver_overhead"] * 1e6)
+	save_report("%s_sched_%d" % (dut._name, agents), rep)
+	clk.stop()
+
+
+clk_t = 2000
+
+fact = TestFactory(sched_test_overhead)
+fact.add_option("agents", [1, 16, 64])
+fact.add_option("cycles", [2000])
+fact.generate_tests()
@@ -0,0 +1,210 @@
+"""
+Out of order multi-stream scoreboard.
+
+Expected items are registered per stream (e.g. AXI writes, AXI reads,
+interrupts) under a key such as an address, a transaction ID or an
+(instance, address) tuple, and stored into per stream hash maps. Actual items
+are matched against the oldest item expected under the same key, in constant
+time whatever the order they arrive in, so that overlapping or pipelined
+transactions need not be serialized to be checked.
+
+Memory remains bounded: expectations left unmatched for longer than a maximum
+age, or beyond a maximum number of pending ones, are aged out and accounted as
+errors. Expectations still pending at the end of the test are reported as
+leftovers.
+"""
+
+from collections import deque, OrderedDict
+
+class _Stream(object):
+
+	def __init__(self, name, compare):
+		self.name = name
+		self.compare = compare
+		# expectations: key -> deque of [sequence, time, item]
+		self.pending = {}
+		self.matched = 0
+		self.mismatched = 0
+		self.unexpected = 0
+		self.expired = 0
+
+
+class HashScoreboard(object):
+	"""
+	Scoreboard matching actual items against expected ones per stream and
+	key, whatever their arrival order.
+
+	Expectations older than max_age simulation steps, or exceeding
+	max_pending in total, are aged out. Errors raise an AssertionError right
+	away when fail_immediately, are logged otherwise. At most max_logs
+	errors are logged per stream.
+	"""
+
+	def __init__(self, log, fail_immediately=True, max_age=None,
+	             max_pending=65536, max_logs=16, now=None):
+		if now is None:
+			from cocotb.utils import get_sim_time
+			now = get_sim_time
+
+		self._log = log
+		self._imm = fail_immediately
+		self._max_age = max_age
+		self._max_pending = max_pending
+		self._max_logs = max_logs
+		self._now = now
+		self._streams = OrderedDict()
+		# pending expectations in registration order: (sequence, stream,
+		# key) tuples, possibly matched already
+		self._order = deque()
+		self._live = set()
+		self._seq = 0
+
+
+	def stream(self, name, compare=None):
+		"""
+		Declare stream name, matching items using compare(actual,
+		expected) function if given, equality otherwise.
+		"""
+		self._streams[name] = _Stream(name, compare or
+		                              (lambda a, e: a == e))
+
+
+	def _stream(self, name):
+		if name not in self._streams:
+			self.stream(name)
+		return self._streams[name]
+
+
+	def _error(self, strm, message):
+		if self._imm:
+			raise AssertionError("%s: %s" % (strm.name, message))
+		count = (strm.mismatched + strm.unexpected + strm.expired)
+		if count <= self._max_logs:
+			self._log.error("%s: %s", strm.name, message)
+		if count == self._max_logs:
+			self._log.error("%s: further errors not logged",
+			                strm.name)
+
+
+	def expect(self, stream, key, item):
+		"""
+		Register item as expected on stream under key.
+		"""
+		strm = self._stream(stream)
+		now = self._now()
+		self._seq += 1
+		strm.pending.setdefault(key, deque()).append([self._seq, now,
+		                                              item])
+		self._order.append((self._seq, strm, key))
+		self._live.add(self._seq)
+		if len(self._order) > 2 * len(self._live) + 1024:
+			# drop matched expectations queued behind a pending one
+			self._order = deque(o for o in self._order
+			                    if o[0] in self._live)
+		self.age_out(now)
+
+
+	def actual(self, stream, key, item):
+		"""
+		Match item received on stream under key against the oldest item
+		expected under the same key. Return True on match.
+		"""
+		strm = self._stream(stream)
+		self.age_out()
+		exp = strm.pending.get(key)
+		if not exp:
+			strm.unexpected += 1
+			self._error(strm, "unexpected %r under key %r" %
+			            (item, key))
+			return False
+
+		(seq, t, expected) = exp.popleft()
+		if not exp:
+			del strm.pending[key]
+		self._live.discard(seq)
+		if not strm.compare(item, expected):
+			strm.mismatched += 1
+			self._error(strm, "%r mismatch (received != expected): "
+			                  "%r != %r" % (key, item, expected))
+			return False
+
+		strm.matched += 1
+		return True
+
+
+	def _expire(self, strm, key):
+		exp = strm.pending[key]
+		(seq, t, expected) = exp.popleft()
+		if not exp:
+			del strm.pending[key]
+		self._live.discard(seq)
+		strm.expired += 1
+		self._error(strm, "%r expected %r aged out" % (key, expected))
+
+
+	def age_out(self, now=None):
+		"""
+		Expire expectations older than max_age and the oldest ones
+		beyond max_pending.
+		"""
+		if now is None:
+			now = self._now()
+		order = self._order
+		while order:
+			(seq, strm, key) = order[0]
+			if seq not in self._live:
+				order.popleft()
+				continue
+			full = len(self._live) > self._max_pending
+			if not full and (self._max_age is None or
+			                 now - strm.pending[key][0][1] <=
+			                 self._max_age):
+				break
+			order.popleft()
+			self._expire(strm, key)
+
+
+	def pending(self):
+		"""
+		Return number of pending expectations.
+		"""
+		return len(self._live)
+
+
+	def errors(self):
+		return sum(s.mismatched + s.unexpected + s.expired
+		           for s in self._streams.values())
+
+
+	def report(self):
+		"""
+		Log per stream statistics and leftover expectations, accounting
+		the latter as errors. Return total number of errors.
+		"""
+		leftovers = 0
+		for strm in self._streams.values():
+			left = sum(len(e) for e in strm.pending.values())
+			leftovers += left
+			self._log.info("%s: %d matched, %d mismatched, "
+			               "%d unexpected, %d aged out, %d left over",
+			               strm.name, strm.matched, strm.mismatched,
+			               strm.unexpected, strm.expired, left)
+			shown = 0
+			for (key, exp) in strm.pending.items():
+				for (seq, t, item) in exp:
+					if shown == self._max_logs:
+						break
+					self._log.error("%s: %r expected %r "
+					                "at %d never received",
+					                strm.name, key, item, t)
+					shown += 1
+		return self.errors() + leftovers
+
+
+	def result(self):
+		"""
+		Report and raise AssertionError upon any error.
+		"""
+		errors = self.report()
+		if errors:
+			raise AssertionError("scoreboard: %d errors" % errors)
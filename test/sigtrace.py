@@ -0,0 +1,219 @@
+"""
+Columnar signal trace recorder.
+
+A trace file holds one fixed width unsigned integer column per recorded signal
+plus a leading simulation time column. Samples are buffered into per column
+arrays and written out by chunks of constant row count, column after column,
+so that a whole signal may be mapped from disk as a single NumPy array without
+touching other columns.
+
+File layout (native byte order, recorded into header):
+  * magic     : 8 bytes, "RTLTRC1\\0"
+  * rows      : unsigned 64 bits row count, all ones until trace is closed
+  * hdr_len   : unsigned 32 bits length of JSON header
+  * header    : JSON encoded header, padded with spaces to a 8 bytes boundary
+  * chunks    : sequence of chunks, each made of `chunk' rows of every column
+                stored contiguously in header declaration order ; last chunk
+                is zero padded.
+"""
+
+import json
+import os
+import struct
+import sys
+from array import array
+
+_MAGIC   = b"RTLTRC1\0"
+_PREFIX  = struct.Struct("=8sQI")
+_NOROWS  = (1 << 64) - 1
+_TIME    = "time"
+
+
+def _typecode(size):
+	# Find an array typecode matching requested item size: 'L' is 64 bits
+	# wide on 64 bits Linux hosts whereas 'Q' is only available with
+	# python 3.
+	for code in "BHILQ":
+		try:
+			if array(code).itemsize == size:
+				return code
+		except ValueError:
+			pass
+	raise ValueError("no array typecode of %d bytes" % size)
+
+
+def _itemsize(bits):
+	for size in (1, 2, 4, 8):
+		if bits <= (8 * size):
+			return size
+	raise ValueError("cannot trace signals wider than 64 bits")
+
+
+class TraceWriter(object):
+	"""
+	Stream sampled signal values to a columnar trace file.
+
+	`signals' is a list of (name, handle) tuples. Values which cannot be
+	resolved to an integer (containing X, Z, ...) are recorded as 0.
+	"""
+
+	def __init__(self, path, signals, chunk=65536):
+		# keep reader side usable outside of the simulator
+		from cocotb.utils import get_sim_time
+
+		self._now = get_sim_time
+		self._path = path
+		self._chunk = chunk
+		self._names = [n for (n, h) in signals]
+		self._handles = [h for (n, h) in signals]
+
+		sizes = [8] + [_itemsize(len(h)) for h in self._handles]
+		names = [_TIME] + self._names
+		self._cols = [array(_typecode(s)) for s in sizes]
+
+		hdr = json.dumps({
+		        "byteorder": sys.byteorder,
+		        "chunk"    : chunk,
+		        "columns"  : [[n, s] for (n, s) in zip(names, sizes)]
+		}).encode("ascii")
+		hdr += b" " * (-(_PREFIX.size + len(hdr)) % 8)
+
+		self._rows = 0
+		self._file = open(path, "wb")
+		self._file.write(_PREFIX.pack(_MAGIC, _NOROWS, len(hdr)))
+		self._file.write(hdr)
+
+
+	def _flush(self):
+		for c in self._cols:
+			c.tofile(self._file)
+			del c[:]
+
+
+	def sample(self, values=None):
+		"""
+		Record current value of all signals at current simulation time.
+		Values already sampled may be given as a dictionary indexed by
+		signal names so that signals are not read once again.
+		"""
+		cols = self._cols
+		cols[0].append(self._now())
+		if values is None:
+			values = {}
+		for (c, n, h) in zip(cols[1:], self._names, self._handles):
+			try:
+				c.append(int(values[n] if n in values
+				             else h.value))
+			except ValueError:
+				c.append(0)
+
+		self._rows += 1
+		if len(cols[0]) == self._chunk:
+			self._flush()
+
+
+	def close(self):
+		if self._file is None:
+			return
+
+		# pad last chunk so that chunks remain of constant size
+		pad = -self._rows % self._chunk
+		if pad:
+			for c in self._cols:
+				c.extend([0] * pad)
+			self._flush()
+
+		self._file.seek(0)
+		self._file.write(_PREFIX.pack(_MAGIC, self._rows, 0)[:16])
+		self._file.close()
+		self._file = None
+
+
+class TraceReader(object):
+	"""
+	Memory mapped access to a trace file recorded by TraceWriter.
+
+	Requires NumPy. Column arrays are served as read-only views of the
+	underlying file.
+	"""
+
+	def __init__(self, path):
+		import numpy
+
+		with open(path, "rb") as f:
+			(magic, rows, hlen) = _PREFIX.unpack(f.read(_PREFIX.size))
+			if magic != _MAGIC:
+				raise ValueError("%s: not a trace file" % path)
+			hdr = json.loads(f.read(hlen).decode("ascii"))
+
+		order = hdr["byteorder"] == "little" and "<" or ">"
+		chunk = hdr["chunk"]
+		dtype = numpy.dtype([(str(n), "%su%d" % (order, s), (chunk,))
+		                     for (n, s) in hdr["columns"]])
+		data = numpy.memmap(path, dtype=numpy.uint8, mode="r",
+		                    offset=_PREFIX.size + hlen)
+		nr = len(data) // dtype.itemsize
+
+		# a trace which was not properly closed only holds complete
+		# chunks
+		if rows == _NOROWS:
+			rows = nr * chunk
+
+		self.path = path
+		self.rows = rows
+		self.columns = [str(n) for (n, s) in hdr["columns"]]
+		self._chunks = data[:nr * dtype.itemsize].view(dtype)
+
+
+	def __getitem__(self, name):
+		# per chunk column slices are not contiguous: collapsing them
+		# only loads the requested column from disk.
+		return self._chunks[name].reshape(-1)[:self.rows]
+
+
+	def __contains__(self, name):
+		return name in self.columns
+
+
+	@property
+	def time(self):
+		return self[_TIME]
+
+
+# number of artifact paths built so far per (extension, name)
+_count = {}
+
+def artifact_path(env, ext, name):
+	"""
+	Build a unique artifact file path with extension ext for current test
+	from the given name, located into directory given by the env
+	environment variable. Return None when the artifact is disabled, i.e.
+	env is empty or unset.
+	"""
+	directory = os.getenv(env)
+	if not directory:
+		return None
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+
+	key = (ext, name)
+	_count[key] = _count.get(key, 0) + 1
+	return os.path.join(directory, "%s_%03d.%s" % (name, _count[key], ext))
+
+
+def trace_path(name):
+	"""
+	Build a unique trace file path for current test from the given entity
+	name, located into directory given by the TRACE_DIR environment
+	variable. Return None when tracing is disabled, i.e. TRACE_DIR is empty
+	or unset.
+	"""
+	return artifact_path("TRACE_DIR", "trc", name)
+
+
+if __name__ == "__main__":
+	for p in sys.argv[1:]:
+		trc = TraceReader(p)
+		print("%s: %d rows" % (p, trc.rows))
+		for c in trc.columns:
+			print("    %s" % c)
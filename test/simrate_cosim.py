@@ -0,0 +1,53 @@
+"""
+Simulator backend throughput benchmark.
+
+Run any of the test bench toplevels out of reset for a fixed number of clock
+cycles and measure simulated cycles per wall clock second. Clock is generated
+from within the simulator (see clocking.py) so that measurements reflect the
+simulation engine rather than Python callbacks. Results are saved under
+PERF_DIR if not empty, tagged with the backend given by the SIM_BACKEND
+environment variable (see bench.py to compare them).
+"""
+
+import os
+from cocotb.triggers import Timer
+from watchdog import TestFactory
+from clocking import TbClock
+from bench import SimRate, save_report
+
+# clock and active low reset port names of supported toplevels
+_ports = [("aclk", "areset_n"), ("clk", "rst_n")]
+
+async def simrate_test_idle(dut, cycles):
+	""" Simulated clock cycles per second"""
+	for (clk, rst) in _ports:
+		if hasattr(dut, clk):
+			break
+
+	clock = TbClock(dut, clk, hdl=True)
+	if hasattr(dut, rst):
+		getattr(dut, rst).value = 0
+	clock.start(clk_t)
+	await clock.cycles(2)
+	if hasattr(dut, rst):
+		getattr(dut, rst).value = 1
+
+	rate = SimRate(clk_t)
+	await clock.cycles(cycles)
+	backend = os.getenv("SIM_BACKEND", "unknown")
+	rep = { "backend": backend,
+	        "toplevel": dut._name,
+	        "cycles": rate.cycles(),
+	        "period": clk_t,
+	        "rate": rate.report(dut._log, "%s %s" % (backend,
+	                                                 dut._name)) }
+	save_report("simrate_%s_%s" % (backend, dut._name), rep)
+	clock.stop()
+	await Timer(clk_t, "step")
+
+
+clk_t = 2000
+
+fact = TestFactory(simrate_test_idle)
+fact.add_option("cycles", [100000])
+fact.generate_tests()
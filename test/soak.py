@@ -0,0 +1,213 @@
+"""
+Long running soak test support.
+
+Soak runs last for millions of clock cycles: test benches MUST NOT keep
+anything per transaction or per sample. Soak keeps streaming statistics
+instead, i.e. count, min, max, mean and standard deviation of sampled values
+together with error tallies, all updated in constant memory.
+
+Every checkpoint period, progress is logged and appended as a JSON line to
+<SOAK_DIR>/<name>.jsonl if SOAK_DIR is not empty: simulated cycles, wall clock
+time, throughput, statistics, errors and resident set size (RSS) of the
+simulator process. RSS growth since the first checkpoint, once test bench is
+warmed up, is reported at the end of the run so that test bench leaks show
+up.
+
+Soak duration and checkpoint period are given in clock cycles by the
+SOAK_CYCLES and SOAK_CHECKPOINT environment variables, soak tests being
+skipped when the former is empty or 0. Checkpoint period defaults to 100000.
+"""
+
+import json
+import math
+import os
+import resource
+import time
+from collections import OrderedDict
+
+def _cycles(name, default):
+	value = os.getenv(name)
+	return int(value) if value else default
+
+
+soak_cycles = _cycles("SOAK_CYCLES", 0)
+soak_every = _cycles("SOAK_CHECKPOINT", 100000)
+soak_dir = os.getenv("SOAK_DIR")
+
+def rss():
+	"""
+	Return resident set size of current process in bytes.
+	"""
+	try:
+		with open("/proc/self/statm") as f:
+			return int(f.read().split()[1]) * resource.getpagesize()
+	except (IOError, OSError):
+		# peak instead of current RSS without procfs
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RunningStats(object):
+	"""
+	Count, min, max, mean and standard deviation of values, computed on the
+	fly (Welford's algorithm).
+	"""
+
+	def __init__(self):
+		self.count = 0
+		self.min = None
+		self.max = None
+		self.mean = 0.0
+		self._m2 = 0.0
+
+
+	def add(self, value):
+		self.count += 1
+		if self.count == 1:
+			self.min = self.max = value
+		else:
+			self.min = min(self.min, value)
+			self.max = max(self.max, value)
+		delta = value - self.mean
+		self.mean += delta / self.count
+		self._m2 += delta * (value - self.mean)
+
+
+	def stddev(self):
+		if self.count < 2:
+			return 0.0
+		return math.sqrt(self._m2 / (self.count - 1))
+
+
+	def to_dict(self):
+		if not self.count:
+			return { "count": 0 }
+		return { "count" : self.count,
+		         "min"   : self.min,
+		         "max"   : self.max,
+		         "mean"  : self.mean,
+		         "stddev": self.stddev() }
+
+
+class Soak(object):
+	"""
+	Streaming statistics and progress checkpoints of soak run name, clocked
+	at period. At most max_logs errors are logged per kind.
+	"""
+
+	def __init__(self, name, log, period, every=None, directory=None,
+	             max_logs=16):
+		from cocotb.utils import get_sim_time
+
+		self._now = get_sim_time
+		self._name = name
+		self._log = log
+		self._period = period
+		self._every = every or soak_every
+		self._max_logs = max_logs
+		self._path = None
+		directory = directory or soak_dir
+		if directory:
+			if not os.path.isdir(directory):
+				os.makedirs(directory)
+			self._path = os.path.join(directory, name + ".jsonl")
+			# start afresh
+			open(self._path, "w").close()
+
+		self.stats = OrderedDict()
+		self.errors = OrderedDict()
+		self._sim = self._now()
+		self._wall = time.time()
+		self._next = self._every
+		# RSS at first checkpoint and maximum since then
+		self._rss0 = None
+		self._rss_max = 0
+
+
+	def cycles(self):
+		return (self._now() - self._sim) // self._period
+
+
+	def sample(self, what, value):
+		"""
+		Account value into what statistics.
+		"""
+		stats = self.stats.get(what)
+		if stats is None:
+			stats = self.stats[what] = RunningStats()
+		stats.add(value)
+
+
+	def error(self, what, message):
+		"""
+		Account an error of kind what.
+		"""
+		count = self.errors.get(what, 0) + 1
+		self.errors[what] = count
+		if count <= self._max_logs:
+			self._log.error("%s: %s", what, message)
+		if count == self._max_logs:
+			self._log.error("%s: further errors not logged", what)
+
+
+	def poll(self):
+		"""
+		Checkpoint if checkpoint period elapsed since the last one.
+		"""
+		if self.cycles() >= self._next:
+			self.checkpoint()
+			while self._next <= self.cycles():
+				self._next += self._every
+
+
+	def checkpoint(self):
+		"""
+		Log progress and append it to checkpoint file. Return progress
+		record.
+		"""
+		cyc = self.cycles()
+		wall = time.time() - self._wall
+		mem = rss()
+		if self._rss0 is None:
+			self._rss0 = mem
+		self._rss_max = max(self._rss_max, mem)
+
+		rec = OrderedDict([
+		        ("cycles", cyc),
+		        ("wall", wall),
+		        ("rate", wall and cyc / wall or 0.0),
+		        ("rss", mem),
+		        ("rss_growth", mem - self._rss0),
+		        ("stats", OrderedDict((n, s.to_dict())
+		                              for (n, s) in self.stats.items())),
+		        ("errors", dict(self.errors))])
+		self._log.info("%s: %d cycles in %.1f s (%.1f cycles/s), "
+		               "RSS %.1f MiB (%+.1f MiB), %d errors",
+		               self._name, cyc, wall, rec["rate"],
+		               mem / 1048576.0, rec["rss_growth"] / 1048576.0,
+		               sum(self.errors.values()))
+		if self._path:
+			with open(self._path, "a") as f:
+				f.write(json.dumps(rec) + "\n")
+		return rec
+
+
+	def result(self):
+		"""
+		Checkpoint, log statistics summary and raise AssertionError upon
+		any error.
+		"""
+		rec = self.checkpoint()
+		for (n, s) in self.stats.items():
+			if s.count:
+				self._log.info("%s: %d samples, min %d, max %d, "
+				               "mean %.2f, stddev %.2f", n, s.count,
+				               s.min, s.max, s.mean, s.stddev())
+		self._log.info("RSS grew by %.1f MiB over run (max %.1f MiB)",
+		               rec["rss_growth"] / 1048576.0,
+		               self._rss_max / 1048576.0)
+		errors = sum(self.errors.values())
+		if errors:
+			raise AssertionError("soak: %d errors (%s)" %
+			                     (errors,
+			                      ", ".join("%s: %d" % e for e in
+			                                self.errors.items())))
@@ -0,0 +1,116 @@
+--------------------------------------------------------------------------------
+-- Test bench stimulus player.
+--
+-- Streams precomputed per-cycle vectors from a text file so that deterministic
+-- tests run at native simulator speed instead of having Python drive every
+-- input change (see test/vectors.py).
+--
+-- File is (re)opened each time en rises. Each line holds a repeat count
+-- followed by drive, expect and mask bit strings, most significant bit first:
+--   <count> <drive> <expect> <mask>
+-- At every falling edge of clk, the chk input is compared to the expect bits
+-- of the previous vector wherever mask bits are set, then drv is driven with
+-- the drive bits of the next vector. Inputs are therefore held for a whole
+-- cycle around the rising edge and outputs are checked half a cycle after it.
+-- act is high from the first vector being driven until en falls, so that
+-- wrappers know when to select drv. done rises once the last vector has been
+-- checked, errs giving the number of mismatching cycles and first the index
+-- (counting from 1) of the first one.
+-- Not meant to be synthesizable.
+--------------------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library std;
+use std.textio.all;
+
+entity stim_play is
+	generic(
+		path     : string;
+		drv_width: positive;
+		chk_width: positive
+	);
+	port(
+		clk  : in  std_logic;
+		-- active high play enable
+		en   : in  std_logic;
+		act  : out std_logic;
+		drv  : out std_logic_vector(drv_width - 1 downto 0);
+		chk  : in  std_logic_vector(chk_width - 1 downto 0);
+		done : out std_logic;
+		errs : out unsigned(31 downto 0);
+		first: out unsigned(31 downto 0)
+	);
+end entity stim_play;
+
+architecture behaviour of stim_play is
+begin
+	process is
+		file     vecs  : text;
+		variable l     : line;
+		variable count : natural;
+		variable dbits : bit_vector(drv_width - 1 downto 0);
+		variable ebits : bit_vector(chk_width - 1 downto 0);
+		variable mbits : bit_vector(chk_width - 1 downto 0);
+		variable exp   : bit_vector(chk_width - 1 downto 0);
+		variable mask  : bit_vector(chk_width - 1 downto 0);
+		variable cyc   : natural;
+		variable nerr  : natural;
+		variable ferr  : natural;
+
+		procedure check is
+		begin
+			for b in chk'range loop
+				if (mask(b) = '1' and
+				    chk(b) /= to_stdulogic(exp(b))) then
+					nerr := nerr + 1;
+					if (ferr = 0) then
+						ferr := cyc;
+						report path & ": mismatch at cycle " &
+						       integer'image(cyc)
+						       severity warning;
+					end if;
+					exit;
+				end if;
+			end loop;
+		end procedure check;
+	begin
+		act  <= '0';
+		done <= '0';
+		if (en /= '1') then
+			wait until en = '1';
+		end if;
+
+		file_open(vecs, path, read_mode);
+		cyc  := 0;
+		nerr := 0;
+		ferr := 0;
+		mask := (others => '0');
+		while not endfile(vecs) loop
+			readline(vecs, l);
+			read(l, count);
+			read(l, dbits);
+			read(l, ebits);
+			read(l, mbits);
+			for r in 1 to count loop
+				wait until falling_edge(clk);
+				check;
+				drv  <= to_stdlogicvector(dbits);
+				act  <= '1';
+				exp  := ebits;
+				mask := mbits;
+				cyc  := cyc + 1;
+			end loop;
+		end loop;
+		file_close(vecs);
+
+		wait until falling_edge(clk);
+		check;
+		errs  <= to_unsigned(nerr, errs'length);
+		first <= to_unsigned(ferr, first'length);
+		done  <= '1';
+
+		wait until en = '0';
+	end process;
+end architecture behaviour;
@@ -0,0 +1,155 @@
+"""
+Constrained random AXI4-lite stimulus generation.
+
+Transactions are drawn from weighted distributions of per channel valid
+delays, ready back-pressure delays, address kinds and data instead of being
+swept over a fixed cartesian product of timings. When given an AXI4-lite
+coverage collector (see amba.Axi4lCoverage), draws are biased toward bins not
+hit yet: a hole is picked at random and the transaction constrained so that
+it is certain to hit it, e.g. a write data valid delay at least one clock
+period longer than the write address one to cover AW-before-W ordering.
+
+All delays are multiples of a sixteenth of the clock period, i.e. the
+sampling period of test bench monitors.
+"""
+
+import random
+from collections import namedtuple
+from amba import addr_kind
+
+class Dist(object):
+	"""
+	Weighted distribution. Choices are given as (weight, item) tuples where
+	item is either a plain value or an inclusive (low, high) integer range
+	drawn uniformly.
+	"""
+
+	def __init__(self, choices):
+		self._choices = choices
+		self._total = sum(w for (w, i) in choices)
+
+
+	def draw(self, rng):
+		x = rng.uniform(0, self._total)
+		for (w, item) in self._choices:
+			x -= w
+			if x <= 0:
+				break
+		if isinstance(item, tuple):
+			return rng.randint(*item)
+		return item
+
+
+# Transaction drawn by Axi4lRandom. Delays are given in simulator time units
+# and resp holds the response expected from slave.
+Axi4lXact = namedtuple("Axi4lXact", ["read", "addr", "data", "addr_delay",
+                                     "data_delay", "resp_delay", "resp",
+                                     "post_cycles"])
+
+
+class Axi4lRandom(object):
+	"""
+	Constrained random AXI4-lite transaction generator targeting a slave
+	decoding size bytes of address space.
+
+	Transactions are constrained toward holes of cover (an
+	amba.Axi4lCoverage instance) with probability bias.
+	"""
+
+	# Valid and ready delays, in sixteenths of clock period: mostly back to
+	# back or within the first cycle, sometimes a few cycles late.
+	delay = Dist([(4, 0), (3, (1, 15)), (2, (16, 47)), (1, (48, 160))])
+	# Address kinds
+	kind = Dist([(6, "aligned"), (2, "unaligned"), (2, "illegal")])
+	# Idle clock cycles between transactions
+	post = Dist([(6, 0), (3, (1, 4)), (1, (5, 16))])
+
+	def __init__(self, period, size, cover=None, bias=0.75, rng=random):
+		self._tick = period // 16
+		self._size = size
+		self._cover = cover
+		self._bias = bias
+		self._rng = rng
+
+
+	def _ticks(self, dist):
+		return dist.draw(self._rng) * self._tick
+
+
+	def address(self, kind):
+		"""
+		Draw an address of the given kind.
+		"""
+		rng = self._rng
+		if kind == "illegal":
+			# mostly right above the decoded space, sometimes far
+			# away from it
+			if rng.random() < 0.75:
+				return rng.randint(self._size, self._size + 15)
+			return rng.randint(self._size, (1 << 32) - 1)
+
+		addr = rng.randrange(0, self._size, 4)
+		if kind == "unaligned":
+			addr += rng.randint(1, 3)
+		return addr
+
+
+	def _holes(self):
+		# list of (group, hole) tuples not hit yet
+		cov = self._cover
+		res = []
+		for grp in (cov.wr, cov.rd, cov.addr):
+			if grp is not None:
+				res.extend((grp, h) for h in grp.holes())
+		return res
+
+
+	def _target(self):
+		# constraints required to hit a randomly picked coverage hole
+		if self._cover is None or self._rng.random() >= self._bias:
+			return {}
+
+		holes = self._holes()
+		if not holes:
+			return {}
+
+		(grp, hole) = self._rng.choice(holes)
+		if grp is self._cover.wr:
+			(order, resp) = hole
+			return { "read": False, "order": order,
+			         "legal": resp == 0 }
+		elif grp is self._cover.rd:
+			return { "read": True, "legal": hole[0] == 0 }
+
+		(d, kind) = hole
+		return { "read": d == "rd", "kind": kind }
+
+
+	def next(self):
+		"""
+		Draw next transaction.
+		"""
+		rng = self._rng
+		tgt = self._target()
+
+		read = tgt.get("read", rng.random() < 0.5)
+		kind = tgt.get("kind")
+		while (kind is None or
+		       ("legal" in tgt and tgt["legal"] != (kind != "illegal"))):
+			kind = self.kind.draw(rng)
+		addr = self.address(kind)
+		resp = addr_kind(addr, self._size) == "illegal" and 3 or 0
+
+		addr_delay = self._ticks(self.delay)
+		data_delay = self._ticks(self.delay)
+		order = tgt.get("order")
+		if order == "same":
+			data_delay = addr_delay
+		elif order == "aw_first":
+			data_delay = addr_delay + 16 * self._tick + data_delay
+		elif order == "w_first":
+			addr_delay = data_delay + 16 * self._tick + addr_delay
+
+		return Axi4lXact(read, addr, rng.getrandbits(32), addr_delay,
+		                 data_delay, self._ticks(self.delay), resp,
+		                 self.post.draw(rng))
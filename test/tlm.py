@@ -0,0 +1,316 @@
+"""
+Transaction level model of the timer.
+
+Pure Python model of tmr_axi4ls, i.e. of the register logic (tmr_regs.vhd)
+and timer logic (tmr_impl.vhd) behind an AXI4-Lite slave, so that test
+sequences may be developed without any simulator. Time is counted in clock
+cycles and only advances by whole transactions and waits: counter and alarm
+state is computed analytically for each elapsed stretch of cycles, making the
+model thousands of times faster than RTL simulation.
+
+The model exposes the driver interfaces of RTL test benches:
+  * TlmAxi4lMaster, the wrxact() and rdxact() coroutines of Axi4lMaster,
+  * TlmTmrRegs, the write_reg() and read_reg() coroutines of TmrRegs,
+  * TlmTmrTB, the TmrDriver interface of tmr_axi4ls test benches (see
+    tmrdrv.py),
+so that sequences written against these run unchanged against the model and
+RTL. Sequences MUST NOT await simulator triggers, which the model has no
+notion of, and MUST NOT depend on exact cycle timing: bus transaction costs
+are fixed approximations of RTL ones and register updates take effect at
+transaction completion.
+
+Sequences of tmrdrv.py may be run against the model from the command line:
+
+    python tlm.py [<sequence>...]
+"""
+
+import logging
+import sys
+import time
+from xactfile import AxiError
+from regmap import timer_regs
+import tmrdrv
+
+# lapse register width
+_laps_mask = (1 << 30) - 1
+
+class TmrModel(object):
+	"""
+	Timer register and timer logic model. `now' is the current time in
+	clock cycles and `irq' the interrupt line level.
+
+	As tmr_regs.vhd does, a status read latches whether it saw an alarm
+	till the next status read: while latched, alarms are discarded and
+	arming is cleared, in automatic mode as well, so that no interrupt may
+	be raised till status is read again.
+	"""
+
+	def __init__(self):
+		self.now = 0
+		self.reset()
+
+
+	def reset(self):
+		self.mode = timer_regs.mode.NONE
+		self.irq = 0
+		self._lapse = 0
+		self._arm = 0
+		self._alrm = 0
+		self._count = 0
+		# alarm clearing latched by last status read
+		self._clr = 0
+		# enabled cycles left till next alarm
+		self._left = self._period()
+
+
+	def _period(self):
+		# an alarm is raised every lapse cycles, lapse counter wrapping
+		# around when 0
+		return self._lapse or (_laps_mask + 1)
+
+
+	def _armed(self):
+		if self._clr:
+			return 0
+		return self._arm or self.mode == timer_regs.mode.AUTO
+
+
+	def _update(self):
+		if self._alrm and self._armed():
+			self.irq = 1
+
+
+	def advance(self, cycles):
+		"""
+		Let cycles clock cycles elapse.
+		"""
+		self.now += cycles
+		if self.mode == timer_regs.mode.NONE:
+			# timer clock gated
+			return
+
+		self._count = (self._count + cycles) & 0xffffffff
+		left = self._left - cycles
+		if left <= 0:
+			period = self._period()
+			if not self._clr:
+				self._alrm = 1
+			left = period - (-left % period)
+		self._left = left
+		self._update()
+
+
+	def next_irq(self):
+		"""
+		Return the number of cycles till interrupt is raised, None if it
+		cannot be raised without register accesses.
+		"""
+		if self.irq:
+			return 0
+		if self.mode == timer_regs.mode.NONE or not self._armed():
+			return None
+		return self._left
+
+
+	def write(self, reg, data):
+		"""
+		Write data to register reg.
+		"""
+		if reg is timer_regs.CTRL:
+			self.mode = timer_regs.CTRL.unpack(data)["mode"]
+		elif reg is timer_regs.ALRM:
+			alrm = timer_regs.ALRM.unpack(data)
+			self._lapse = alrm["lapse"]
+			self._arm = alrm["arm"] and not self._clr
+			if alrm["load"]:
+				self._left = self._period()
+		elif reg is timer_regs.CNT:
+			self._count = data & 0xffffffff
+		self._update()
+
+
+	def read(self, reg):
+		"""
+		Return register reg value, clearing alarm when reading status.
+		"""
+		if reg is timer_regs.CTRL:
+			return timer_regs.CTRL.pack(mode=self.mode)
+		if reg is timer_regs.ALRM:
+			return timer_regs.ALRM.pack(lapse=self._lapse)
+		if reg is timer_regs.CNT:
+			return self._count
+
+		# arm is sampled once automatic mode re-armed, even when
+		# latched clearing disarms it right after
+		arm = self._arm or self.mode == timer_regs.mode.AUTO
+		stat = timer_regs.STAT.pack(arm=int(bool(arm)), alrm=self._alrm)
+		self._clr = self._alrm
+		if self._clr:
+			self._alrm = 0
+			self._arm = 0
+			self.irq = 0
+		self._update()
+		return stat
+
+
+class TlmAxi4lMaster(object):
+	"""
+	AXI4-Lite master of model, clocked at period simulation steps so that
+	phase delays given in steps are converted to cycles. Transactions last
+	write_cycles and read_cycles cycles respectively, plus delays.
+	"""
+
+	def __init__(self, model, period, write_cycles=3, read_cycles=3):
+		self._model = model
+		self._period = period
+		self._wcyc = write_cycles
+		self._rcyc = read_cycles
+
+
+	def _cycles(self, *delays):
+		return sum(-(-d // self._period) for d in delays)
+
+
+	def _reg(self, addr, read):
+		try:
+			return timer_regs.at(addr & ~0x3)
+		except KeyError:
+			# decode error
+			raise AxiError("axi4 lite master", read, addr, 3)
+
+
+	async def reset(self, hold_delay=0):
+		self._model.advance(self._cycles(hold_delay))
+		self._model.reset()
+
+
+	async def dereset(self):
+		self._model.advance(1)
+
+
+	async def wrxact(self, addr, data, addr_delay=0, data_delay=0,
+	                 resp_delay=0):
+		self._model.advance(self._wcyc +
+		                    self._cycles(max(addr_delay, data_delay),
+		                                 resp_delay))
+		self._model.write(self._reg(addr, False), int(data))
+
+
+	async def rdxact(self, addr, addr_delay=0, data_delay=0, resp_delay=0):
+		self._model.advance(self._rcyc +
+		                    self._cycles(max(addr_delay, data_delay)))
+		return self._model.read(self._reg(addr, True))
+
+
+class TlmTmrRegs(object):
+	"""
+	Timer register logic driver of model. Setup and hold triggers cannot
+	be awaited: each one given costs a cycle.
+	"""
+
+	def __init__(self, model):
+		self._model = model
+
+
+	def reset(self):
+		self._model.reset()
+
+
+	async def dereset(self):
+		self._model.advance(1)
+
+
+	def _access(self, setup_trigger, hold_trigger):
+		self._model.advance((setup_trigger is not None) +
+		                    (hold_trigger is not None))
+
+
+	async def write_reg(self, reg, data, setup_trigger, hold_trigger):
+		self._access(setup_trigger, hold_trigger)
+		self._model.write(list(timer_regs)[reg], int(data))
+
+
+	async def read_reg(self, reg, setup_trigger, hold_trigger):
+		self._access(setup_trigger, hold_trigger)
+		return self._model.read(list(timer_regs)[reg])
+
+
+class TlmTmrTB(tmrdrv.TmrDriver):
+	"""
+	tmr_axi4ls test bench running against model.
+	"""
+
+	def __init__(self, model=None, period=2000):
+		self.model = model or TmrModel()
+		self._mst = TlmAxi4lMaster(self.model, period)
+		tmrdrv.TmrDriver.__init__(self, self._mst)
+
+
+	def master(self):
+		return self._mst
+
+
+	async def start(self, period=None):
+		await self._mst.reset()
+		await self._mst.dereset()
+		self.regs.reset()
+
+
+	async def idle(self, cycles):
+		self.model.advance(cycles)
+
+
+	async def wait_int(self, level, cycles):
+		if self.model.irq == level:
+			return 0
+
+		# interrupt is only lowered by status reads
+		cyc = None
+		if level:
+			cyc = self.model.next_irq()
+		if cyc is None or cyc > cycles:
+			self.model.advance(cycles)
+			return None
+
+		self.model.advance(cyc)
+		return cyc
+
+
+def run(coro):
+	"""
+	Run coroutine to completion and return its result. Coroutines run
+	against the model complete without ever suspending.
+	"""
+	try:
+		coro.send(None)
+	except StopIteration as e:
+		return e.value
+	coro.close()
+	raise RuntimeError("%s awaited a simulator trigger" %
+	                   coro.__qualname__)
+
+
+def main(argv):
+	logging.basicConfig(level=logging.INFO, format="%(message)s")
+	log = logging.getLogger("tlm")
+	seqs = dict((s.__name__, s) for s in tmrdrv.sequences)
+	names = argv or [s.__name__ for s in tmrdrv.sequences]
+	for n in names:
+		if n not in seqs:
+			sys.stderr.write("unknown sequence %s, one of: %s\n" %
+			                 (n, " ".join(sorted(seqs))))
+			return 2
+
+	for n in names:
+		tb = TlmTmrTB()
+		run(tb.start())
+		wall = time.time()
+		run(seqs[n](tb, log))
+		wall = time.time() - wall
+		log.info("%s: %d cycles in %.6f s (%.1f cycles/s)", n,
+		         tb.model.now, wall, wall and tb.model.now / wall or 0.0)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -1,54 +1,142 @@
+import os
 import cocotb
-from cocotb.clock import Clock
-from cocotb.triggers import Timer, RisingEdge
-from cocotb.binary import BinaryValue
-from cocotb.result import ReturnValue
-from amba import Axi4lMaster, AxiError
-
-class Axi4lsTmrTB():
-	def __init__(self, entity):
+from cocotb.triggers import Timer, RisingEdge, FallingEdge, First
+from cocotb.utils import get_sim_time
+from amba import Axi4lMaster, Axi4lRecorder, Axi4lReplayer
+from clocking import TbClock
+from bench import SimRate
+from drive import drive_view
+from xactfile import XactReader, xact_path
+from watchdog import watched
+from tmrdrv import TmrDriver, count_sequence, alarm_sequence, irq_sequence, \
+                   auto_sequence
+
+class Axi4lsTmrTB(TmrDriver):
+	def __init__(self, entity, record=None):
 		self._entity = entity
-		self._mst = Axi4lMaster(entity, entity.aclk, 32)
+		self._clk = TbClock(entity, "aclk")
+		if record is not None:
+			# recorder observes input ports: drive them directly
+			self._mst = Axi4lMaster(entity, self.clock, 32)
+			self._rec = Axi4lRecorder(entity, self.clock, record)
+		else:
+			self._mst = Axi4lMaster(drive_view(entity,
+			                                   Axi4lMaster.inputs),
+			                        self.clock, 32)
+		TmrDriver.__init__(self, self._mst)
+
+
+	def master(self):
+		return self._mst
+
+
+	@property
+	def clock(self):
+		return self._clk.signal
+
 
+	async def start(self, period):
+		await Timer(period // 2, "step")
+		await self._mst.reset(period // 2)
+		self._clk.start(period)
+		await Timer(period // 2, "step")
+		await self._mst.dereset()
+		self.regs.reset()
 
-	@cocotb.coroutine
-	def start(self, period):
-		yield Timer(period / 2)
-		yield self._mst.reset(period / 2)
-		cocotb.fork(Clock(self._entity.aclk, period).start())
-		yield Timer(period / 2)
-		yield self._mst.dereset()
 
+	async def idle(self, cycles):
+		await self._clk.cycles(cycles)
 
-	@cocotb.coroutine
-	def set_mode(self, mode):
-		yield self._mst.wrxact(0, mode)
 
+	async def wait_int(self, level, cycles):
+		"""
+		See TmrDriver.wait_int(), waiting using a single trigger.
+		"""
+		irq = self._entity.int
+		if int(irq.value) == level:
+			return 0
 
-	@cocotb.coroutine
-	def get_count(self):
-		cnt = yield self._mst.rdxact(12)
-		raise ReturnValue(cnt)
+		start = get_sim_time()
+		tmout = Timer(cycles * self._clk.period, "step")
+		edge = level and RisingEdge(irq) or FallingEdge(irq)
+		if await First(edge, tmout) is tmout:
+			return None
 
+		return (get_sim_time() - start) // self._clk.period
+
+
+@cocotb.test()
+@watched
+async def axi4ls_test_cnt(dut):
+	tb = Axi4lsTmrTB(dut, xact_path(dut._name))
+	await tb.start(clk_t)
+
+	await count_sequence(tb, dut._log)
+	await RisingEdge(tb.clock)
+	await RisingEdge(tb.clock)
+
+@cocotb.test()
+@watched
+async def axi4ls_test_driver(dut):
+	"""
+	Typical driver register access sequence: program a periodic alarm and
+	poll status till alarm is raised.
+	"""
+	tb = Axi4lsTmrTB(dut, xact_path(dut._name))
+	await tb.start(clk_t)
 
-	@cocotb.coroutine
-	def set_count(self, count):
-		yield self._mst.wrxact(12, count)
+	await alarm_sequence(tb, dut._log)
 
 
 @cocotb.test()
-def axi4ls_test_cnt(dut):
+@watched
+async def axi4ls_test_irq(dut):
+	"""
+	Single shot interrupt servicing.
+	"""
+	tb = Axi4lsTmrTB(dut, xact_path(dut._name))
+	await tb.start(clk_t)
+
+	await irq_sequence(tb, dut._log)
+
+
+@cocotb.test()
+@watched
+async def axi4ls_test_auto(dut):
+	"""
+	Automatic mode interrupt servicing across alarms.
+	"""
+	tb = Axi4lsTmrTB(dut, xact_path(dut._name))
+	await tb.start(clk_t)
+
+	await auto_sequence(tb, dut._log)
+
+
+@cocotb.test()
+@watched
+async def axi4ls_test_replay(dut):
+	"""
+	Replay the transaction file given by the XACT_REPLAY environment
+	variable at maximum bus rate.
+	"""
+	path = os.getenv("XACT_REPLAY")
+	if not path:
+		dut._log.info("no transaction file to replay: skipped")
+		return
+
 	tb = Axi4lsTmrTB(dut)
-	yield tb.start(clk_t)
-
-	yield tb.set_mode(1)
-	yield tb.get_count()
-	yield tb.get_count()
-	yield tb.get_count()
-	yield tb.set_count(10)
-	cnt = yield tb.get_count()
-	print cnt
-	yield RisingEdge(dut.aclk)
-	yield RisingEdge(dut.aclk)
+	await tb.start(clk_t)
+
+	rate = SimRate(clk_t)
+	rply = Axi4lReplayer(tb.master(), XactReader(path), dut._log)
+	await rply.run()
+	rate.report(dut._log, "replay")
+
+	dut._log.info("%d transactions replayed from %s: %d errors, "
+	              "%d read data mismatches",
+	              rply.count, path, rply.errors, rply.mismatches)
+	if rply.errors:
+		raise AssertionError("%d unexpected responses" %
+		                     rply.errors)
 
 clk_t = 2000
@@ -0,0 +1,16 @@
+"""
+AXI lite timer latency and throughput characterization (see perf.py).
+"""
+
+from watchdog import TestFactory
+from perf import axi4l_test_perf
+
+clk_t = 2000
+
+fact = TestFactory(axi4l_test_perf)
+fact.add_option("period",  [clk_t])
+fact.add_option("addrs",   [[0, 4, 8, 12]])
+fact.add_option("mix",     ["write", "read", "concurrent"])
+fact.add_option("pattern", ["none", "fixed", "random"])
+fact.add_option("count",   [64])
+fact.generate_tests()
@@ -0,0 +1,101 @@
+"""
+AXI lite timer soak test (see soak.py).
+
+Rounds of random timer programming, i.e. mode, count and alarm, each followed
+by interrupt servicing, are run till SOAK_CYCLES clock cycles elapsed.
+Bus transaction, alarm and interrupt servicing latencies are accounted in
+clock cycles as streaming statistics only.
+
+Soak runs are not bounded by the watchdog: every wait of a round is bounded
+instead, bus handshakes by bus_timeout cycles and interrupt waits by lapse
+plus slack cycles, so that a stuck design is reported as errors rather than
+hanging the run.
+"""
+
+from random import choice, getrandbits, randint, random
+import cocotb
+from cocotb.utils import get_sim_time
+from amba import AxiError, AxiTimeout
+from regmap import timer_regs
+from soak import Soak, soak_cycles
+from tmr_axi4ls_cosim import Axi4lsTmrTB
+from watchdog import watched
+
+# cycles allowed in addition to lapse for alarm to raise interrupt, and for
+# interrupt to be lowered once status is read
+slack = 16
+
+async def _timed(soak, what, coro):
+	start = get_sim_time()
+	res = await coro
+	soak.sample(what, (get_sim_time() - start) // clk_t)
+	return res
+
+
+async def _round(tb, soak, max_lapse):
+	mode = choice([timer_regs.mode.CNT, timer_regs.mode.SNGL,
+	               timer_regs.mode.AUTO])
+	lapse = randint(1, max_lapse)
+
+	# stop timer and clear any alarm left pending by previous round
+	await _timed(soak, "write", tb.set_mode(timer_regs.mode.NONE))
+	await _timed(soak, "read", tb.get_status())
+	if random() < 0.5:
+		await _timed(soak, "write", tb.set_count(getrandbits(32)))
+	await _timed(soak, "write", tb.set_alarm(lapse, 1, 1))
+	await _timed(soak, "write", tb.set_mode(mode))
+
+	cyc = await tb.wait_int(1, lapse + slack)
+	if cyc is None:
+		soak.error("missed", "interrupt not raised within %d cycles "
+		                     "(lapse %d)" % (lapse + slack, lapse))
+		return
+	soak.sample("alarm", cyc)
+
+	(arm, alrm) = await _timed(soak, "read", tb.get_status())
+	if not alrm:
+		soak.error("status", "alarm not set while interrupt raised")
+	cyc = await tb.wait_int(0, slack)
+	if cyc is None:
+		soak.error("service", "interrupt not lowered within %d cycles "
+		                      "from status read" % slack)
+		return
+	soak.sample("service", cyc)
+
+	if random() < 0.25:
+		await _timed(soak, "read", tb.get_count())
+	if random() < 0.25 and await tb.get_alarm(fresh=True) != lapse:
+		soak.error("lapse", "lapse not kept")
+
+
+async def tmr_axi4ls_test_soak(dut):
+	"""
+	Soak timer with random programming and interrupt servicing.
+	"""
+	if not soak_cycles:
+		dut._log.info("no soak cycles requested: skipped")
+		return
+
+	tb = Axi4lsTmrTB(dut)
+	tb.master().timeout = bus_timeout
+	await tb.start(clk_t)
+
+	soak = Soak(dut._name, dut._log, clk_t)
+	while soak.cycles() < soak_cycles:
+		try:
+			await _round(tb, soak, max_lapse)
+		except AxiTimeout as e:
+			soak.error("timeout", str(e))
+		except AxiError as e:
+			soak.error("axi", str(e))
+		soak.poll()
+	soak.result()
+
+
+clk_t = 2000
+max_lapse = 256
+# cycles allowed for any bus handshake
+bus_timeout = 64
+
+# soak runs last as long as requested: no wall clock budget
+tmr_axi4ls_test_soak = cocotb.test()(watched(tmr_axi4ls_test_soak, wall=0))
@@ -0,0 +1,123 @@
+--------------------------------------------------------------------------------
+-- Just a wrapper around tmr_axi4ls allowing to generate clock from within the
+-- simulator instead of the python test bench, and to drive all slave inputs
+-- through a single packed vector.
+-- Not meant to be synthesizable.
+--------------------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library time;
+use time.timer.all;
+
+entity tmr_axi4ls_tb is
+	port(
+		aclk     : in  std_logic;
+		areset_n : in  std_logic;
+		awvalid  : in  std_logic;
+		awready  : out std_logic;
+		awaddr   : in  std_logic_vector(31 downto 0);
+		awprot   : in  std_logic_vector(2 downto 0);
+		wvalid   : in  std_logic;
+		wready   : out std_logic;
+		wdata    : in  std_logic_vector(31 downto 0);
+		wstrb    : in  std_logic_vector(3 downto 0);
+		bvalid   : out std_logic;
+		bready   : in  std_logic;
+		bresp    : out std_logic_vector(1 downto 0);
+		arvalid  : in  std_logic;
+		arready  : out std_logic;
+		araddr   : in  std_logic_vector(31 downto 0);
+		arprot   : in  std_logic_vector(3 downto 0);
+		rvalid   : out std_logic;
+		rready   : in  std_logic;
+		rdata    : out std_logic_vector(31 downto 0);
+		rresp    : out std_logic_vector(1 downto 0);
+		int      : out std_logic;
+
+		-- clock generated internally instead of aclk when hclk_en is
+		-- high (see test/clk_gen.vhd)
+		hclk_en  : in  std_logic;
+		hclk_half: in  unsigned(31 downto 0);
+
+		-- all slave inputs packed into a single vector, used instead
+		-- of input ports when stim_en is high (see test/drive.py)
+		stim_en  : in  std_logic;
+		stim     : in  std_logic_vector(112 downto 0)
+	);
+end entity tmr_axi4ls_tb;
+
+architecture behaviour of tmr_axi4ls_tb is
+	component clk_gen is
+		port(
+			en  : in  std_logic;
+			half: in  unsigned(31 downto 0);
+			clk : out std_logic
+		);
+	end component clk_gen;
+
+	signal hclk_a: std_logic;
+	signal aclk_a: std_logic;
+
+	-- slave inputs, decoded from either input ports or stim vector
+	signal areset_n_a: std_logic;
+	signal awvalid_a : std_logic;
+	signal awaddr_a  : std_logic_vector(31 downto 0);
+	signal awprot_a  : std_logic_vector(2 downto 0);
+	signal wvalid_a  : std_logic;
+	signal wdata_a   : std_logic_vector(31 downto 0);
+	signal wstrb_a   : std_logic_vector(3 downto 0);
+	signal bready_a  : std_logic;
+	signal arvalid_a : std_logic;
+	signal araddr_a  : std_logic_vector(31 downto 0);
+	signal arprot_a  : std_logic_vector(3 downto 0);
+	signal rready_a  : std_logic;
+begin
+	hclk: clk_gen port map (
+		en   => hclk_en,
+		half => hclk_half,
+		clk  => hclk_a
+	);
+
+	aclk_a <= hclk_a when hclk_en = '1' else aclk;
+
+	-- Keep in sync with amba.Axi4lMaster.inputs.
+	areset_n_a <= stim(112) when stim_en = '1' else areset_n;
+	awvalid_a  <= stim(111) when stim_en = '1' else awvalid;
+	awaddr_a   <= stim(110 downto 79) when stim_en = '1' else awaddr;
+	awprot_a   <= stim(78 downto 76) when stim_en = '1' else awprot;
+	wvalid_a   <= stim(75) when stim_en = '1' else wvalid;
+	wdata_a    <= stim(74 downto 43) when stim_en = '1' else wdata;
+	wstrb_a    <= stim(42 downto 39) when stim_en = '1' else wstrb;
+	bready_a   <= stim(38) when stim_en = '1' else bready;
+	arvalid_a  <= stim(37) when stim_en = '1' else arvalid;
+	araddr_a   <= stim(36 downto 5) when stim_en = '1' else araddr;
+	arprot_a   <= stim(4 downto 1) when stim_en = '1' else arprot;
+	rready_a   <= stim(0) when stim_en = '1' else rready;
+
+	tmr: tmr_axi4ls port map (
+		aclk     => aclk_a,
+		areset_n => areset_n_a,
+		awvalid  => awvalid_a,
+		awready  => awready,
+		awaddr   => awaddr_a,
+		awprot   => awprot_a,
+		wvalid   => wvalid_a,
+		wready   => wready,
+		wdata    => wdata_a,
+		wstrb    => wstrb_a,
+		bvalid   => bvalid,
+		bready   => bready_a,
+		bresp    => bresp,
+		arvalid  => arvalid_a,
+		arready  => arready,
+		araddr   => araddr_a,
+		arprot   => arprot_a,
+		rvalid   => rvalid,
+		rready   => rready_a,
+		rdata    => rdata,
+		rresp    => rresp,
+		int      => int
+	);
+end architecture behaviour;
@@ -1,21 +1,25 @@
+import os
 import random
-import time
 import cocotb
-from cocotb.clock import Clock
-from cocotb.monitors import BusMonitor
-from cocotb.scoreboard import Scoreboard
+from cocotb_bus.scoreboard import Scoreboard
 from cocotb.triggers import Timer, RisingEdge, ReadOnly, ClockCycles
-from cocotb.utils import get_sim_steps
 from cocotb.binary import BinaryValue
-from cocotb.result import ReturnValue
 from monitor import BaseMonitor
-from cocotb.regression import TestFactory
+from clocking import TbClock
+from bench import SimRate
+from sigtrace import trace_path
+from drive import drive_view
+from vectors import stim_play, set_count_vectors, alarm_vectors
+from watchdog import TestFactory, watched
 
 class TmrImpl():
 	"""
 	Timer logic driver
 	"""
 
+	# inputs in packed stimulus vector order (see drive.py)
+	inputs = ["ld_cnt", "cnt", "set_laps", "laps", "clr_alrm"]
+
 	def __init__(self, entity, clock, bits):
 		self._entity = entity
 		self._clk = clock
@@ -25,85 +29,85 @@ class TmrImpl():
 	def reset(self):
 		# At reset assertion time, master MUST drive arvalid, awvalid
 		# and awvalid to low level in addition to areset_n.
-		self._entity.ld_cnt   = 1
-		self._entity.cnt      = BinaryValue(0, bits=self._bits)
-		self._entity.set_laps = 1
-		self._entity.laps     = BinaryValue(0, bits=self._bits - 2)
-		self._entity.clr_alrm = 1
+		self._entity.ld_cnt.value = 1
+		self._entity.cnt.value = BinaryValue(0, bits=self._bits)
+		self._entity.set_laps.value = 1
+		self._entity.laps.value = BinaryValue(0, bits=self._bits - 2)
+		self._entity.clr_alrm.value = 1
 
 
 	def dereset(self):
-		self._entity.ld_cnt   = 0
-		self._entity.set_laps = 0
-		self._entity.laps     = BinaryValue(0, bits=self._bits - 2)
-		self._entity.clr_alrm = 0
+		self._entity.ld_cnt.value = 0
+		self._entity.set_laps.value = 0
+		self._entity.laps.value = BinaryValue(0, bits=self._bits - 2)
+		self._entity.clr_alrm.value = 0
 
 
-	@cocotb.coroutine
-	def get_count(self):
+	async def get_count(self):
 		while True:
-			yield ReadOnly()
-			if self._entity.ld_cnt == 0:
+			await ReadOnly()
+			if int(self._entity.ld_cnt.value) == 0:
 				break
+			await RisingEdge(self._clk)
 
-		raise ReturnValue(self._entity.cntdwn)
+		return self._entity.cntdwn.value
 
 
-	@cocotb.coroutine
-	def set_count(self, count, trigger):
-		self._entity.ld_cnt = 1
-		self._entity.cnt    = BinaryValue(count, bits=self._bits,
-		                                  bigEndian=False)
+	async def set_count(self, count, trigger):
+		self._entity.ld_cnt.value = 1
+		self._entity.cnt.value = BinaryValue(count, bits=self._bits,
+		                                     bigEndian=False)
 
 		while True:
-			yield ReadOnly()
-			if self._entity.cnt_ld == 1:
+			await ReadOnly()
+			if int(self._entity.cnt_ld.value) == 1:
 				break
+			await RisingEdge(self._clk)
 
-		yield trigger
-		self._entity.ld_cnt = 0
+		await trigger
+		self._entity.ld_cnt.value = 0
 
 
-	@cocotb.coroutine
-	def set_lapse(self, lapse, trigger):
-		self._entity.set_laps = 1
-		self._entity.laps     = BinaryValue(lapse, bits=self._bits - 2,
-		                                    bigEndian=False)
+	async def set_lapse(self, lapse, trigger):
+		self._entity.set_laps.value = 1
+		self._entity.laps.value = BinaryValue(lapse,
+		                                      bits=self._bits - 2,
+		                                      bigEndian=False)
 
 		while True:
-			yield ReadOnly()
-			if self._entity.laps_set == 1:
+			await ReadOnly()
+			if int(self._entity.laps_set.value) == 1:
 				break
+			await RisingEdge(self._clk)
 
-		yield trigger
-		self._entity.set_laps = 0
+		await trigger
+		self._entity.set_laps.value = 0
 
 
-	@cocotb.coroutine
-	def wait_alarm(self, trigger):
+	async def wait_alarm(self, trigger):
 		cyc = 0
 		while True:
-			yield ReadOnly()
-			if self._entity.alrm_set == 1:
+			await ReadOnly()
+			if int(self._entity.alrm_set.value) == 1:
 				break
-			yield RisingEdge(self._clk)
+			await RisingEdge(self._clk)
 			cyc = cyc + 1
 
-		yield trigger
-		raise ReturnValue(cyc)
+		await trigger
+		return cyc
 
 
-	@cocotb.coroutine
-	def clr_alarm(self, trigger):
-		self._entity.clr_alrm = 1
+	async def clr_alarm(self, trigger):
+		self._entity.clr_alrm.value = 1
 
 		while True:
-			yield ReadOnly()
-			if self._entity.alrm_set == 0:
+			await ReadOnly()
+			if int(self._entity.alrm_set.value) == 0:
 				break
+			await RisingEdge(self._clk)
 
-		yield trigger
-		self._entity.clr_alrm = 0
+		await trigger
+		self._entity.clr_alrm.value = 0
 
 
 class TmrImplMonitor(BaseMonitor):
@@ -113,90 +117,135 @@ class TmrImplMonitor(BaseMonitor):
 
 	_signals = [ "cnt_ld", "cntdwn", "laps_set", "alrm_set" ]
 
-	def __init__(self, entity, scoreboard):
-		BaseMonitor.__init__(self, entity, entity.clk, scoreboard)
+	def __init__(self, entity, clock, scoreboard):
+		BaseMonitor.__init__(self, entity, clock, scoreboard)
 
 
 class TmrImplTestBench():
 
-	def __init__(self, entity, fail_immediately):
+	def __init__(self, entity, fail_immediately, trace=None):
 		self._entity = entity
-		self._drv = TmrImpl(entity, entity.clk, 32)
+		self._clk = TbClock(entity, "clk")
+		entity.play_en.value = 0
+		self._drv = TmrImpl(drive_view(entity, TmrImpl.inputs), self.clock,
+		                    32)
 		self._sbrd = Scoreboard(entity,
 		                        fail_immediately=fail_immediately)
-		self._mon = TmrImplMonitor(entity, self._sbrd)
+		self._mon = TmrImplMonitor(entity, self.clock, self._sbrd)
+		if trace is not None:
+			self._mon.trace(trace)
 
 
 	def driver(self):
 		return self._drv
 
 
-	@cocotb.coroutine
-	def expect(self, expected):
-		yield self._mon.expect(expected)
+	@property
+	def clock(self):
+		return self._clk.signal
+
+
+	async def expect(self, expected):
+		await self._mon.expect(expected)
 
 
-	@cocotb.coroutine
-	def start(self, period):
-		yield Timer(3 * period / 4)
+	async def start(self, period):
+		await Timer(3 * period // 4, "step")
 		self._drv.reset()
-		yield Timer(period / 4)
-		cocotb.fork(Clock(self._entity.clk, period).start())
-		yield Timer(3 * period / 4)
+		await Timer(period // 4, "step")
+		self._clk.start(period)
+		await Timer(3 * period // 4, "step")
 		self._drv.dereset()
-		yield RisingEdge(self._entity.clk)
+		await RisingEdge(self.clock)
 
 
 	def failure(self, message):
 		self._mon.failure(message)
 
 
+async def tmr_play(dut, vecs, name):
+	"""
+	Play vectors from within simulator (see vectors.py) and check the
+	number of mismatching cycles it reports.
+	"""
+	clock = TbClock(dut, "clk")
+	dut.play_en.value = 0
+	path = dut._name + ".vec"
+	vecs.write(path)
+
+	clock.start(clk_t)
+	rate = SimRate(clk_t)
+	dut.play_en.value = 1
+	await RisingEdge(dut.play_done)
+	errs = int(dut.play_errs.value)
+	first = int(dut.play_first.value)
+	dut.play_en.value = 0
+	rate.report(dut._log, name)
+	clock.stop()
+	os.remove(path)
+
+	if errs:
+		raise AssertionError("%d mismatching cycles out of %d, first at "
+		                     "cycle %d" % (errs, vecs.cycles, first))
+
+
 @cocotb.test()
-def tmr_test_count(dut):
-	tb  = TmrImplTestBench(dut, exit_on_fail)
+@watched
+async def tmr_test_count(dut):
+	tb  = TmrImplTestBench(dut, exit_on_fail, trace_path(dut._name))
 	drv = tb.driver()
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
 
 	for c in range(1, 9):
 		exp = {
 		        "name"  : "get count",
 		        "cntdwn": BinaryValue(c, bits=32, bigEndian=False)
 		}
-		yield tb.expect(exp)
-		yield RisingEdge(dut.clk)
+		await tb.expect(exp)
+		await RisingEdge(tb.clock)
+
 
+async def tmr_test_alarm(dut, lapse, lapse_cycles):
+	if stim_play:
+		await tmr_play(dut, alarm_vectors(lapse, lapse_cycles), "alarm")
+		return
 
-@cocotb.coroutine
-def tmr_test_alarm(dut, lapse, lapse_cycles):
-	tb  = TmrImplTestBench(dut, exit_on_fail)
+	tb  = TmrImplTestBench(dut, exit_on_fail, trace_path(dut._name))
 	drv = tb.driver()
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
+	rate = SimRate(clk_t)
 
-	yield drv.set_lapse(lapse, ClockCycles(dut.clk, lapse_cycles))
+	await drv.set_lapse(lapse, ClockCycles(tb.clock, lapse_cycles))
 
 	for l in range(0, 5):
-		cyc = yield drv.wait_alarm(Timer(clk_t / 4))
+		cyc = await drv.wait_alarm(Timer(clk_t // 4, "step"))
 		if cyc != lapse:
 			tb.failure("unexpected alarm ticks (received != " +
 			           "expected): %d != %d" % (cyc, lapse))
-		yield drv.clr_alarm(Timer(clk_t / 4))
+		await drv.clr_alarm(Timer(clk_t // 4, "step"))
+
+	rate.report(dut._log, "alarm")
+
 
+async def tmr_test_set_count(dut, hold_cycles, wait_cycles):
+	if stim_play:
+		await tmr_play(dut, set_count_vectors(hold_cycles, wait_cycles),
+		               "set count")
+		return
 
-@cocotb.coroutine
-def tmr_test_set_count(dut, hold_cycles, wait_cycles):
-	tb  = TmrImplTestBench(dut, exit_on_fail)
+	tb  = TmrImplTestBench(dut, exit_on_fail, trace_path(dut._name))
 	drv = tb.driver()
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
 
 	for c in range(0, 5):
-		yield RisingEdge(dut.clk)
+		await RisingEdge(tb.clock)
 
 	for c in range(0, 5):
 		cnt = random.getrandbits(32)
-		yield drv.set_count(cnt, ClockCycles(dut.clk, hold_cycles))
+		await drv.set_count(cnt, ClockCycles(tb.clock, hold_cycles))
 		exp = {
 		        "name"  : "set count",
 		}
@@ -204,12 +253,11 @@ def tmr_test_set_count(dut, hold_cycles, wait_cycles):
 		for w in range (0, wait_cycles):
 			exp["cntdwn"] = BinaryValue(cnt, bits=32,
 			                            bigEndian=False)
-			yield tb.expect(exp)
-			yield RisingEdge(dut.clk)
+			await tb.expect(exp)
+			await RisingEdge(tb.clock)
 			cnt = cnt + 1
 
 
-random.seed(time.time())
 clk_t = 2000
 exit_on_fail=True
 
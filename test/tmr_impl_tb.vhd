@@ -0,0 +1,163 @@
+--------------------------------------------------------------------------------
+-- Just a wrapper around tmr_impl allowing to generate clock from within the
+-- simulator instead of the python test bench, and to play precomputed input
+-- vectors from file tmr_impl_tb.vec (see test/stim_play.vhd).
+-- Not meant to be synthesizable.
+--------------------------------------------------------------------------------
+library ieee;
+use ieee.std_logic_1164.all;
+use ieee.numeric_std.all;
+
+library time;
+use time.timer.all;
+
+entity tmr_impl_tb is
+	port(
+		clk      : in  std_logic;
+
+		ld_cnt   : in  std_logic;
+		cnt      : in  unsigned(31 downto 0);
+		cnt_ld   : out std_logic;
+		cntdwn   : out unsigned(31 downto 0);
+
+		set_laps : in  std_logic;
+		laps     : in  unsigned(31 - 2 downto 0);
+		laps_set : out std_logic;
+
+		clr_alrm : in  std_logic;
+		alrm_set : out std_logic;
+
+		-- clock generated internally instead of clk when hclk_en is
+		-- high (see test/clk_gen.vhd)
+		hclk_en  : in  std_logic;
+		hclk_half: in  unsigned(31 downto 0);
+
+		-- all tmr_impl inputs packed into a single vector, used instead
+		-- of input ports when stim_en is high (see test/drive.py)
+		stim_en   : in  std_logic;
+		stim      : in  std_logic_vector(64 downto 0);
+
+		-- tmr_impl inputs driven by stimulus player instead of ports
+		-- while playing (see test/vectors.py)
+		play_en   : in  std_logic;
+		play_done : out std_logic;
+		play_errs : out unsigned(31 downto 0);
+		play_first: out unsigned(31 downto 0)
+	);
+end entity tmr_impl_tb;
+
+architecture behaviour of tmr_impl_tb is
+	component clk_gen is
+		port(
+			en  : in  std_logic;
+			half: in  unsigned(31 downto 0);
+			clk : out std_logic
+		);
+	end component clk_gen;
+
+	component stim_play is
+		generic(
+			path     : string;
+			drv_width: positive;
+			chk_width: positive
+		);
+		port(
+			clk  : in  std_logic;
+			en   : in  std_logic;
+			act  : out std_logic;
+			drv  : out std_logic_vector(drv_width - 1 downto 0);
+			chk  : in  std_logic_vector(chk_width - 1 downto 0);
+			done : out std_logic;
+			errs : out unsigned(31 downto 0);
+			first: out unsigned(31 downto 0)
+		);
+	end component stim_play;
+
+	signal hclk_a: std_logic;
+	signal clk_a : std_logic;
+
+	-- tmr_impl inputs, decoded from either input ports or stim vector
+	signal ld_cnt_s  : std_logic;
+	signal cnt_s     : unsigned(31 downto 0);
+	signal set_laps_s: std_logic;
+	signal laps_s    : unsigned(31 - 2 downto 0);
+	signal clr_alrm_s: std_logic;
+
+	-- tmr_impl inputs and outputs, read back to feed player
+	signal ld_cnt_a  : std_logic;
+	signal cnt_a     : unsigned(31 downto 0);
+	signal set_laps_a: std_logic;
+	signal laps_a    : unsigned(31 - 2 downto 0);
+	signal clr_alrm_a: std_logic;
+	signal cnt_ld_a  : std_logic;
+	signal cntdwn_a  : unsigned(31 downto 0);
+	signal laps_set_a: std_logic;
+	signal alrm_set_a: std_logic;
+
+	signal play_act  : std_logic;
+	signal play_drv  : std_logic_vector(64 downto 0);
+	signal play_chk  : std_logic_vector(34 downto 0);
+begin
+	hclk: clk_gen port map (
+		en   => hclk_en,
+		half => hclk_half,
+		clk  => hclk_a
+	);
+
+	clk_a <= hclk_a when hclk_en = '1' else clk;
+
+	-- Keep in sync with vectors.TmrImplVectors drive and check layouts.
+	play: stim_play generic map (
+		path      => "tmr_impl_tb.vec",
+		drv_width => play_drv'length,
+		chk_width => play_chk'length
+	) port map (
+		clk   => clk_a,
+		en    => play_en,
+		act   => play_act,
+		drv   => play_drv,
+		chk   => play_chk,
+		done  => play_done,
+		errs  => play_errs,
+		first => play_first
+	);
+
+	-- Keep in sync with TmrImpl.inputs.
+	ld_cnt_s   <= stim(64) when stim_en = '1' else ld_cnt;
+	cnt_s      <= unsigned(stim(63 downto 32)) when stim_en = '1' else cnt;
+	set_laps_s <= stim(31) when stim_en = '1' else set_laps;
+	laps_s     <= unsigned(stim(30 downto 1)) when stim_en = '1' else laps;
+	clr_alrm_s <= stim(0) when stim_en = '1' else clr_alrm;
+
+	ld_cnt_a   <= play_drv(64) when play_act = '1' else ld_cnt_s;
+	cnt_a      <= unsigned(play_drv(63 downto 32)) when play_act = '1' else
+	              cnt_s;
+	set_laps_a <= play_drv(31) when play_act = '1' else set_laps_s;
+	laps_a     <= unsigned(play_drv(30 downto 1)) when play_act = '1' else
+	              laps_s;
+	clr_alrm_a <= play_drv(0) when play_act = '1' else clr_alrm_s;
+
+	play_chk   <= cnt_ld_a & std_logic_vector(cntdwn_a) & laps_set_a &
+	              alrm_set_a;
+
+	tmr: tmr_impl port map (
+		clk      => clk_a,
+
+		ld_cnt   => ld_cnt_a,
+		cnt      => cnt_a,
+		cnt_ld   => cnt_ld_a,
+		cntdwn   => cntdwn_a,
+
+		set_laps => set_laps_a,
+		laps     => laps_a,
+		laps_set => laps_set_a,
+
+		clr_alrm => clr_alrm_a,
+		alrm_set => alrm_set_a
+	);
+
+	cnt_ld     <= cnt_ld_a;
+	cntdwn     <= cntdwn_a;
+	laps_set   <= laps_set_a;
+	alrm_set   <= alrm_set_a;
+end architecture behaviour;
@@ -0,0 +1,147 @@
+"""
+Multi-instance scaling test bench.
+
+Drive every timer instance of a tmr_multi<N>_tb wrapper (see multi.py) through
+its own AXI4-lite master and register predictor, all multiplexed in a single
+simulation, and measure how simulation throughput scales with instance count.
+Read back values of all instances are checked by a single out of order
+scoreboard keyed by instance and address (see scoreboard.py).
+
+The idle test measures simulator only throughput (clock running, no
+transaction) whereas the load test keeps all masters busy: the difference
+gives Python test bench overhead per instance and cycle. Results are saved as
+JSON reports under PERF_DIR if not empty.
+"""
+
+import random
+import re
+import cocotb
+from cocotb.triggers import Timer
+from watchdog import TestFactory
+from amba import Axi4lMaster
+from clocking import TbClock
+from bench import SimRate, save_report
+from multi import InstancePorts
+from scoreboard import HashScoreboard
+from regmap import timer_regs, Mirror
+
+class TmrMultiTB(object):
+
+	def __init__(self, entity):
+		self._entity = entity
+		self.count = int(re.match(r"tmr_multi(\d+)_tb",
+		                          entity._name).group(1))
+		self._clk = TbClock(entity, "aclk")
+		self._msts = [Axi4lMaster(InstancePorts(entity, i), self.clock,
+		                          32)
+		              for i in range(self.count)]
+		# register predictors, volatile registers (STAT and CNT) cannot
+		# be predicted
+		self._preds = [Mirror(timer_regs, m.rdxact, m.wrxact)
+		               for m in self._msts]
+		for p in self._preds:
+			p.reset()
+		self.scoreboard = HashScoreboard(entity._log,
+		                                 fail_immediately=False)
+		self.scoreboard.stream("read")
+
+
+	@property
+	def clock(self):
+		return self._clk.signal
+
+
+	async def start(self, period):
+		await Timer(period // 2, "step")
+		for m in self._msts:
+			await m.reset()
+		await Timer(period // 2, "step")
+		self._clk.start(period)
+		await Timer(period // 2, "step")
+		await self._msts[0].dereset()
+
+
+	async def idle(self, cycles):
+		await self._clk.cycles(cycles)
+
+
+	async def _agent(self, index, rounds, rng):
+		mst = self._msts[index]
+		pred = self._preds[index]
+		for r in range(rounds):
+			for (reg, data) in ((timer_regs.ALRM,
+			                     timer_regs.ALRM.pack(
+			                         lapse=rng.randint(1, 64),
+			                         load=1)),
+			                    (timer_regs.CTRL,
+			                     rng.randint(0, 3))):
+				await pred.write(reg, data)
+
+			for reg in (timer_regs.CTRL, timer_regs.ALRM):
+				key = (index, reg.offset)
+				self.scoreboard.expect("read", key,
+				                       pred.predict(reg))
+				val = await mst.rdxact(reg.offset)
+				self.scoreboard.actual("read", key, int(val))
+
+			await mst.rdxact(timer_regs.CNT.offset)
+
+
+	async def load(self, rounds, rng=random):
+		"""
+		Run rounds of register accesses on all instances concurrently.
+		"""
+		agents = [cocotb.start_soon(self._agent(i, rounds, rng))
+		          for i in range(self.count)]
+		for a in agents:
+			await a
+
+
+# simulator only throughput measured by idle test
+_idle_rate = {}
+
+async def multi_test_idle(dut, cycles):
+	""" Simulator only throughput"""
+	tb = TmrMultiTB(dut)
+	await tb.start(clk_t)
+
+	rate = SimRate(clk_t)
+	await tb.idle(cycles)
+	_idle_rate[dut._name] = rate.report(dut._log,
+	                                    "%d instances idle" % tb.count)
+
+
+async def multi_test_load(dut, rounds):
+	""" Throughput with all instances driven concurrently"""
+	tb = TmrMultiTB(dut)
+	await tb.start(clk_t)
+
+	rate = SimRate(clk_t)
+	await tb.load(rounds)
+	load = rate.report(dut._log, "%d instances loaded" % tb.count)
+
+	rep = { "instances": tb.count,
+	        "period": clk_t,
+	        "cycles": rate.cycles(),
+	        "load_rate": load }
+	idle = _idle_rate.get(dut._name)
+	if idle and load:
+		# wall clock seconds spent into Python per instance and cycle
+		rep["idle_rate"] = idle
+		rep["overhead"] = (1.0 / load - 1.0 / idle) / tb.count
+		dut._log.info("test bench overhead: %.1f us per instance "
+		              "and cycle", rep["overhead"] * 1e6)
+	save_report("%s_scaling" % dut._name, rep)
+
+	tb.scoreboard.result()
+
+
+clk_t = 2000
+
+fact = TestFactory(multi_test_idle)
+fact.add_option("cycles", [2000])
+fact.generate_tests()
+
+fact = TestFactory(multi_test_load)
+fact.add_option("rounds", [8])
+fact.generate_tests()
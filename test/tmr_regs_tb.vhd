@@ -20,7 +20,18 @@ entity tmr_regs_tb is
 		oe   : in  std_logic;
 		oreg : in  unsigned(1 downto 0);
 		odat : out std_logic_vector(31 downto 0);
-		int  : out std_logic
+		int  : out std_logic;
+		-- all monitored signals packed into a single vector so that
+		-- monitors may sample them at once (see test/probe.py)
+		probe: out std_logic_vector(72 downto 0);
+		-- clock generated internally instead of clk when hclk_en is
+		-- high (see test/clk_gen.vhd)
+		hclk_en  : in  std_logic;
+		hclk_half: in  unsigned(31 downto 0);
+		-- all tmr_regs inputs packed into a single vector, used instead
+		-- of input ports when stim_en is high (see test/drive.py)
+		stim_en  : in  std_logic;
+		stim     : in  std_logic_vector(38 downto 0)
 	);
 end entity tmr_regs_tb;
 
@@ -39,26 +50,70 @@ architecture behaviour of tmr_regs_tb is
 		);
 	end component tmr_regs;
 
+	component clk_gen is
+		port(
+			en  : in  std_logic;
+			half: in  unsigned(31 downto 0);
+			clk : out std_logic
+		);
+	end component clk_gen;
+
+	signal hclk_a: std_logic;
+	signal clk_a : std_logic;
+
+	-- tmr_regs inputs, decoded from either input ports or stim vector
+	signal rst_n_a: std_logic;
+	signal we_a  : std_logic;
+	signal wreg_u: unsigned(1 downto 0);
+	signal wdat_a: std_logic_vector(31 downto 0);
+	signal oe_a  : std_logic;
+	signal oreg_u: unsigned(1 downto 0);
+
 	signal wreg_a: natural range 0 to TMR_REG_NR - 1;
 	signal oreg_a: natural range 0 to TMR_REG_NR - 1;
+	signal odat_a: std_logic_vector(31 downto 0);
+	signal int_a : std_logic;
 begin
+	hclk: clk_gen port map (
+		en   => hclk_en,
+		half => hclk_half,
+		clk  => hclk_a
+	);
+
+	clk_a <= hclk_a when hclk_en = '1' else clk;
+
+	-- Keep in sync with TmrRegs.inputs.
+	rst_n_a <= stim(38) when stim_en = '1' else rst_n;
+	we_a    <= stim(37) when stim_en = '1' else we;
+	wreg_u  <= unsigned(stim(36 downto 35)) when stim_en = '1' else wreg;
+	wdat_a  <= stim(34 downto 3) when stim_en = '1' else wdat;
+	oe_a    <= stim(2) when stim_en = '1' else oe;
+	oreg_u  <= unsigned(stim(1 downto 0)) when stim_en = '1' else oreg;
+
 	regs: tmr_regs port map (
-		rst_n => rst_n,
-		clk   => clk,
-		we    => we,
+		rst_n => rst_n_a,
+		clk   => clk_a,
+		we    => we_a,
 		wreg  => wreg_a,
-		wdat  => wdat,
-		oe    => oe,
+		wdat  => wdat_a,
+		oe    => oe_a,
 		oreg  => oreg_a,
-		odat  => odat,
-		int   => int
+		odat  => odat_a,
+		int   => int_a
 	);
 
-	process (rst_n, wreg, oreg) is
+	odat  <= odat_a;
+	int   <= int_a;
+
+	-- Keep in sync with TmrRegsMonitor._signals.
+	probe <= rst_n_a & clk_a & we_a & std_logic_vector(wreg_u) & wdat_a &
+	         oe_a & std_logic_vector(oreg_u) & odat_a & int_a;
+
+	process (rst_n_a, wreg_u, oreg_u) is
 	begin
-		if (rst_n = '1') then
-			wreg_a <= to_integer(wreg);
-			oreg_a <= to_integer(oreg);
+		if (rst_n_a = '1') then
+			wreg_a <= to_integer(wreg_u);
+			oreg_a <= to_integer(oreg_u);
 		end if;
 	end process;
 end architecture behaviour;
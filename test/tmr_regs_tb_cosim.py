@@ -1,20 +1,25 @@
-from random import seed
-from time import time
+from random import choice, getrandbits
 import cocotb
-from cocotb.clock import Clock
-from cocotb.monitors import BusMonitor
-from cocotb.scoreboard import Scoreboard
-from cocotb.triggers import Timer, RisingEdge
-from cocotb.utils import get_sim_steps
+from cocotb_bus.scoreboard import Scoreboard
+from cocotb.triggers import Timer, RisingEdge, First
+from cocotb.utils import get_sim_time
 from cocotb.binary import BinaryValue
-from cocotb.result import ReturnValue
 from monitor import BaseMonitor
-from cocotb.regression import TestFactory
+from clocking import TbClock
+from bench import SimRate
+from drive import drive_view, packed_drive
+from sigtrace import trace_path
+from funcov import CoverPoint, database
+from watchdog import TestFactory
+from regmap import timer_regs
 
 class TmrRegs():
 	"""
 	Timer registers logic driver
 	"""
+
+	# inputs in packed stimulus vector order (see drive.py)
+	inputs = ["rst_n", "we", "wreg", "wdat", "oe", "oreg"]
         
 	def __init__(self, entity, clock, bits):
 		self._entity = entity
@@ -23,57 +28,54 @@ class TmrRegs():
 
 
 	def reset(self):
-		self._entity.rst_n = 0
-		self._entity.we    = 0
-		self._entity.oe    = 0
+		self._entity.rst_n.value = 0
+		self._entity.we.value = 0
+		self._entity.oe.value = 0
 
 
-	@cocotb.coroutine
-        def dereset(self):
-		self._entity.rst_n = 1
+	async def dereset(self):
+		self._entity.rst_n.value = 1
 
-		yield RisingEdge(self._clk)
+		await RisingEdge(self._clk)
 
 
 	def _begin_write(self, reg, data):
-		self._entity.wdat = BinaryValue(data, bits=self._bits,
-		                                bigEndian=False)
-		self._entity.wreg = reg
-		self._entity.we = 1
+		self._entity.wdat.value = BinaryValue(data, bits=self._bits,
+		                                      bigEndian=False)
+		self._entity.wreg.value = reg
+		self._entity.we.value = 1
 
 
 	def _end_write(self):
-		self._entity.we = 0
+		self._entity.we.value = 0
 
 
 	def _begin_read(self, reg):
-		self._entity.oe = 1
-		self._entity.oreg = reg
+		self._entity.oe.value = 1
+		self._entity.oreg.value = reg
 
 
 	def _end_read(self):
-		self._entity.oe = 0
+		self._entity.oe.value = 0
         
-	@cocotb.coroutine
-	def write_reg(self, reg, data, setup_trigger, hold_trigger):
+	async def write_reg(self, reg, data, setup_trigger, hold_trigger):
 		if setup_trigger != None:
-			yield setup_trigger
+			await setup_trigger
 		self._begin_write(reg, data)
 		if hold_trigger != None:
-			yield hold_trigger
+			await hold_trigger
 		self._end_write()
 
 
-	@cocotb.coroutine
-	def read_reg(self, reg, setup_trigger, hold_trigger):
+	async def read_reg(self, reg, setup_trigger, hold_trigger):
 		if setup_trigger != None:
-			yield setup_trigger
+			await setup_trigger
 		self._begin_read(reg)
 		if hold_trigger != None:
-			yield hold_trigger
+			await hold_trigger
 		self._end_read()
 
-		raise ReturnValue(self._entity.odat)
+		return self._entity.odat.value
 
 
 class TmrRegsMonitor(BaseMonitor):
@@ -84,135 +86,206 @@ class TmrRegsMonitor(BaseMonitor):
 	_signals = [ "rst_n", "clk", "we", "wreg", "wdat", "oe", "oreg", "odat",
 	             "int" ]
 
-	def __init__(self, entity, scoreboard):
-		BaseMonitor.__init__(self, entity, entity.clk, scoreboard)
+	def __init__(self, entity, clock, scoreboard, probe=False):
+		BaseMonitor.__init__(self, entity, clock, scoreboard,
+		                     probe=probe)
+
 
+TmrReg = timer_regs
+TmrCtrlMode = timer_regs.mode
 
-class TmrReg:
-	CTRL = 0
-	STAT = 1
-	ALRM = 2
-	CNT  = 3
 
+class TmrRegsCoverage(object):
+	"""
+	Timer registers functional coverage collector, to be registered as a
+	monitor callback.
+
+	Covers register reads and writes crossed with timer mode current at
+	access time.
+	"""
 
-class TmrCtrlMode:
-	NONE = 0
-	CNT  = 1
-	SNGL = 2
-	AUTO = 3
+	def __init__(self, db):
+		self.access = db.group("tmr.access",
+		                       CoverPoint("dir", ["rd", "wr"]),
+		                       CoverPoint("reg",
+		                                  [(r.name, r.index)
+		                                   for r in TmrReg]),
+		                       CoverPoint("mode", TmrCtrlMode.items()))
+		self._mode = TmrCtrlMode.NONE
+		self._next = None
+
+
+	def __call__(self, xact):
+		try:
+			if not int(xact["rst_n"]):
+				self._mode = TmrCtrlMode.NONE
+				self._next = None
+				return
+
+			if int(xact["oe"]):
+				self.access.sample("rd", int(xact["oreg"]),
+				                   self._mode)
+
+			if int(xact["we"]):
+				reg = int(xact["wreg"])
+				self.access.sample("wr", reg, self._mode)
+				if reg == TmrReg.CTRL.index:
+					self._next = TmrReg.CTRL.unpack(
+						xact["wdat"])["mode"]
+			elif self._next is not None:
+				# mode update is effective once write completed
+				self._mode = self._next
+				self._next = None
+		except ValueError:
+			# unresolved values, i.e. not reset yet
+			pass
 
 
 class TmrRegsTestBench():
 
-	def __init__(self, entity, fail_immediately):
+	def __init__(self, entity, fail_immediately, trace=None, probe=True):
 		self._entity = entity
-		self._drv = TmrRegs(entity, entity.clk, 32)
+		self._clk = TbClock(entity, "clk")
+		self._drv = TmrRegs(drive_view(entity, TmrRegs.inputs), self.clock,
+		                    32)
+		# monitor MUST observe inputs decoded from stimulus vector
+		probe = probe or packed_drive
 		self._sbrd = Scoreboard(entity,
 		                        fail_immediately=fail_immediately)
-		self._mon = TmrRegsMonitor(entity, self._sbrd)
+		self._mon = TmrRegsMonitor(entity, self.clock, self._sbrd, probe)
+		self.cover = TmrRegsCoverage(database())
+		self._mon.add_callback(self.cover)
+		if trace is not None:
+			self._mon.trace(trace)
 
 
 	def driver(self):
 		return self._drv
 
 
-	@cocotb.coroutine
-	def expect(self, expected):
-		yield self._mon.expect(expected)
+	@property
+	def clock(self):
+		return self._clk.signal
 
 
-	@cocotb.coroutine
-	def start(self, period):
+	async def expect(self, expected):
+		await self._mon.expect(expected)
+
+
+	async def start(self, period):
 		self._drv.reset()
-		yield Timer(period)
-		cocotb.fork(Clock(self._entity.clk, period).start())
-		yield Timer(period / 2)
-		yield self._drv.dereset()
+		await Timer(period, "step")
+		self._clk.start(period)
+		await Timer(period // 2, "step")
+		await self._drv.dereset()
 
 
 	def failure(self, message):
 		self._mon.failure(message)
 
 
-	@cocotb.coroutine
-	def set_mode(self, mode, setup_trigger, hold_trigger):
-		yield self._drv.write_reg(TmrReg.CTRL, mode, setup_trigger,
-		                          hold_trigger)
+	async def idle(self, cycles):
+		"""
+		Let count clock cycles elapse at constant Python cost.
+		"""
+		await self._clk.cycles(cycles)
+
 
+	async def wait_alarm(self, cycles):
+		"""
+		Wait for timer alarm to be raised or for cycles clock cycles to
+		elapse, whichever comes first, using a single trigger.
 
-	@cocotb.coroutine
-	def get_mode(self, setup_trigger, hold_trigger):
-		mode = yield self._drv.read_reg(TmrReg.CTRL, setup_trigger,
-		                                hold_trigger)
-		raise ReturnValue(mode)
+		Return the number of whole clock cycles elapsed till alarm
+		rising or None upon timeout.
+		"""
+		alrm = self._entity.regs.alrm_set_a
+		if int(alrm) == 1:
+			return 0
 
+		start = get_sim_time()
+		tmout = Timer(cycles * self._clk.period, "step")
+		res = await First(RisingEdge(alrm), tmout)
+		if res is tmout:
+			return None
 
-	@cocotb.coroutine
-	def check_mode(self, mode, write_setup, write_hold, read_setup,
-	               read_hold):
-		wr = cocotb.fork(self.set_mode(mode,
-		                               Timer(write_setup),
-		                               Timer(write_hold)))
-		m = yield self.get_mode(Timer(read_setup), Timer(read_hold))
+		return (get_sim_time() - start) // self._clk.period
 
-		yield wr.join()
+
+	async def set_mode(self, mode, setup_trigger, hold_trigger):
+		await self._drv.write_reg(TmrReg.CTRL.index,
+		                          TmrReg.CTRL.pack(mode=mode),
+		                          setup_trigger, hold_trigger)
+
+
+	async def get_mode(self, setup_trigger, hold_trigger):
+		mode = await self._drv.read_reg(TmrReg.CTRL.index,
+		                                setup_trigger, hold_trigger)
+		return TmrReg.CTRL.unpack(mode)["mode"]
+
+
+	async def check_mode(self, mode, write_setup, write_hold, read_setup,
+	                     read_hold):
+		wr = cocotb.start_soon(self.set_mode(mode,
+		                                     Timer(write_setup, "step"),
+		                                     Timer(write_hold, "step")))
+		m = await self.get_mode(Timer(read_setup, "step"),
+		                        Timer(read_hold, "step"))
+
+		await wr
 
 		if m != mode:
 			self.failure("unexpected mode (received != " +
 			             "expected): %d != %d" % (m, mode))
 
-		yield RisingEdge(self._entity.clk)
+		await RisingEdge(self.clock)
 
 
-	@cocotb.coroutine
-	def set_count(self, count, setup_trigger, hold_trigger):
-		yield self._drv.write_reg(TmrReg.CNT, count, setup_trigger,
-		                          hold_trigger)
+	async def set_count(self, count, setup_trigger, hold_trigger):
+		await self._drv.write_reg(TmrReg.CNT.index, count,
+		                          setup_trigger, hold_trigger)
 
 
-	@cocotb.coroutine
-	def get_count(self, setup_trigger, hold_trigger):
-		cnt = yield self._drv.read_reg(TmrReg.CNT, setup_trigger,
+	async def get_count(self, setup_trigger, hold_trigger):
+		cnt = await self._drv.read_reg(TmrReg.CNT.index, setup_trigger,
 		                               hold_trigger)
-		raise ReturnValue(cnt)
+		return cnt
 
 
-	@cocotb.coroutine
-	def check_count(self, count, setup, hold):
-		cnt = yield self.get_count(Timer(setup), Timer(hold))
+	async def check_count(self, count, setup, hold):
+		cnt = await self.get_count(Timer(setup, "step"),
+		                           Timer(hold, "step"))
 
 		if cnt != count:
 			self.failure("unexpected count (received != " +
 			             "expected): %d != %d" % (cnt, count))
 
-		yield RisingEdge(self._entity.clk)
+		await RisingEdge(self.clock)
 
 
-	@cocotb.coroutine
-	def set_alarm(self, lapse, arm, load, setup_trigger, hold_trigger):
-		yield self._drv.write_reg(TmrReg.ALRM, lapse << 2 | arm | load,
+	async def set_alarm(self, lapse, arm, load, setup_trigger, hold_trigger):
+		await self._drv.write_reg(TmrReg.ALRM.index,
+		                          TmrReg.ALRM.pack(lapse=lapse, arm=arm,
+		                                           load=load),
 		                          setup_trigger, hold_trigger)
 
 
-	@cocotb.coroutine
-	def get_alarm(self, setup_trigger, hold_trigger):
-		alrm = yield self._drv.read_reg(TmrReg.ALRM, setup_trigger,
-		                                hold_trigger)
-		raise ReturnValue((int(alrm) >> 2,
-		                   (int(alrm) >> 1) & 0x1,
-		                   int(alrm) & 0x1))
+	async def get_alarm(self, setup_trigger, hold_trigger):
+		alrm = TmrReg.ALRM.unpack(
+			await self._drv.read_reg(TmrReg.ALRM.index, setup_trigger,
+			                         hold_trigger))
+		return (alrm["lapse"], alrm["arm"], alrm["load"])
 
 
-	@cocotb.coroutine
-	def check_alarm(self, lapse, write_setup, write_hold, read_setup,
-	               read_hold):
-		wr = cocotb.fork(self.set_alarm(lapse, 0, 1,
-		                                Timer(write_setup),
-		                                Timer(write_hold)))
-		(laps, arm, load) = yield self.get_alarm(Timer(read_setup),
-		                                         Timer(read_hold))
+	async def check_alarm(self, lapse, write_setup, write_hold, read_setup,
+	                      read_hold):
+		wr = cocotb.start_soon(self.set_alarm(lapse, 0, 1,
+		                                      Timer(write_setup, "step"),
+		                                      Timer(write_hold, "step")))
+		(laps, arm, load) = await self.get_alarm(Timer(read_setup, "step"),
+		                                         Timer(read_hold, "step"))
 
-		yield wr.join()
+		await wr
 
 		if laps != lapse:
 			self.failure("unexpected lapse (received != " +
@@ -224,25 +297,24 @@ class TmrRegsTestBench():
 			self.failure("unexpected lapse (received != " +
 			             "expected): %d != 0" % (load))
 
-		yield RisingEdge(self._entity.clk)
+		await RisingEdge(self.clock)
 
 
-	@cocotb.coroutine
-	def get_status(self, setup_trigger, hold_trigger):
-		stat = yield self._drv.read_reg(TmrReg.STAT, setup_trigger,
-		                                hold_trigger)
-		raise ReturnValue(((int(stat) >> 1) & 0x1, int(stat) & 0x1))
+	async def get_status(self, setup_trigger, hold_trigger):
+		stat = TmrReg.STAT.unpack(
+			await self._drv.read_reg(TmrReg.STAT.index, setup_trigger,
+			                         hold_trigger))
+		return (stat["arm"], stat["alrm"])
 
 
-	@cocotb.coroutine
-	def check_status(self, lapse, setup, hold):
-		yield self.set_alarm(lapse, 0, 1, None,
-		                     RisingEdge(self._entity.clk))
+	async def check_status(self, lapse, setup, hold):
+		await self.set_alarm(lapse, 0, 1, None,
+		                     RisingEdge(self.clock))
 
-		for l in range(0, lapse):
-			yield RisingEdge(self._entity.clk)
+		await self.idle(lapse)
 
-		(arm, alrm) = yield self.get_status(Timer(setup), Timer(hold))
+		(arm, alrm) = await self.get_status(Timer(setup, "step"),
+		                                    Timer(hold, "step"))
 		if arm != 0:
 			self.failure("unexpected arm (received != " +
 			             "expected): %d != 0" % (arm))
@@ -250,90 +322,160 @@ class TmrRegsTestBench():
 			self.failure("unexpected alarm state (received != " +
 			             "expected): %d != 1" % (alrm))
 
-		yield RisingEdge(self._entity.clk)
+		await RisingEdge(self.clock)
 
 
 # TODO: check reset machinery !!
 
-@cocotb.coroutine
-def tmr_test_mode(dut, write_setup, write_hold, read_setup, read_hold):
-	tb  = TmrRegsTestBench(dut, exit_on_fail)
+async def tmr_test_mode(dut, write_setup, write_hold, read_setup, read_hold):
+	tb  = TmrRegsTestBench(dut, exit_on_fail, trace_path(dut._name))
 	drv = tb.driver()
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
 
 	for m in (TmrCtrlMode.CNT, TmrCtrlMode.SNGL, TmrCtrlMode.AUTO,
 	          TmrCtrlMode.NONE) :
-		yield tb.check_mode(m, write_setup, write_hold, read_setup,
+		await tb.check_mode(m, write_setup, write_hold, read_setup,
 		                    read_hold)
 
-	yield RisingEdge(dut.clk)
+	await RisingEdge(tb.clock)
 
 
-@cocotb.coroutine
-def tmr_test_count(dut, setup, hold):
-	tb  = TmrRegsTestBench(dut, exit_on_fail)
+async def tmr_test_count(dut, setup, hold):
+	tb  = TmrRegsTestBench(dut, exit_on_fail, trace_path(dut._name))
 	drv = tb.driver()
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
 
-	yield tb.set_mode(TmrCtrlMode.CNT, None, RisingEdge(dut.clk))
+	await tb.set_mode(TmrCtrlMode.CNT, None, RisingEdge(tb.clock))
 
         # One cycle eaten by set_mode(): that's why range starts from 1
 	for c in range(1, 9):
-		yield tb.check_count(c, setup, hold)
+		await tb.check_count(c, setup, hold)
 
-	yield RisingEdge(dut.clk)
+	await RisingEdge(tb.clock)
 
 
-@cocotb.coroutine
-def tmr_test_lapse(dut, write_setup, write_hold, read_setup, read_hold):
-	tb  = TmrRegsTestBench(dut, exit_on_fail)
+async def tmr_test_lapse(dut, write_setup, write_hold, read_setup, read_hold):
+	tb  = TmrRegsTestBench(dut, exit_on_fail, trace_path(dut._name))
 	drv = tb.driver()
 
-	yield tb.start(clk_t)
+	await tb.start(clk_t)
+	rate = SimRate(clk_t)
 
 	for l in (0, 16, 32, 0x3fffffff):
-		yield tb.check_alarm(l, write_setup, write_hold, read_setup,
+		await tb.check_alarm(l, write_setup, write_hold, read_setup,
 		                     read_hold)
 
-	yield RisingEdge(dut.clk)
+	await RisingEdge(tb.clock)
+	rate.report(dut._log, "lapse")
+
+
+async def tmr_test_alarm(dut, lapse, setup, hold):
+	tb  = TmrRegsTestBench(dut, exit_on_fail, trace_path(dut._name))
+	drv = tb.driver()
+
+	dut.wreg.value = 0
+	dut.wdat.value = 0
+	dut.oreg.value = 0
+	await tb.start(clk_t)
+	rate = SimRate(clk_t)
+
+	await tb.set_mode(TmrCtrlMode.CNT, None, RisingEdge(tb.clock))
+
+	await RisingEdge(tb.clock)
+	await RisingEdge(tb.clock)
+	await tb.check_status(lapse, setup, hold)
 
+	await tb.idle(2)
+	rate.report(dut._log, "alarm")
 
-@cocotb.coroutine
-def tmr_test_alarm(dut, lapse, setup, hold):
-	tb  = TmrRegsTestBench(dut, exit_on_fail)
+
+async def tmr_test_idle(dut, lapse, idle_cycles):
+	tb  = TmrRegsTestBench(dut, exit_on_fail, trace_path(dut._name))
 	drv = tb.driver()
 
-	dut.wreg = 0
-	dut.wdat = 0
-	dut.oreg = 0
-	yield tb.start(clk_t)
+	dut.wreg.value = 0
+	dut.wdat.value = 0
+	dut.oreg.value = 0
+	await tb.start(clk_t)
+	rate = SimRate(clk_t)
+
+	await tb.set_alarm(lapse, 0, 1, None, RisingEdge(tb.clock))
 
-	yield tb.set_mode(TmrCtrlMode.CNT, None, RisingEdge(dut.clk))
+	# Timer clock is gated while disabled: alarm MUST NOT be raised
+	# whatever the number of cycles elapsed.
+	cyc = await tb.wait_alarm(idle_cycles)
+	if cyc is not None:
+		tb.failure("unexpected alarm raised while disabled after " +
+		           "%d cycles" % cyc)
 
-	yield RisingEdge(dut.clk)
-	yield RisingEdge(dut.clk)
-	yield tb.check_status(lapse, setup, hold)
+	await RisingEdge(tb.clock)
+	await tb.set_mode(TmrCtrlMode.CNT, None, RisingEdge(tb.clock))
 
-	yield RisingEdge(dut.clk)
-	yield RisingEdge(dut.clk)
+	cyc = await tb.wait_alarm(lapse + 4)
+	if cyc is None:
+		tb.failure("alarm not raised within %d cycles" % (lapse + 4))
+
+	await tb.idle(2)
+	rate.report(dut._log, "idle")
+
+
+async def tmr_test_cover(dut, max_xacts):
+	"""
+	Coverage driven register accesses: target register access holes till
+	all are hit.
+	"""
+	tb  = TmrRegsTestBench(dut, exit_on_fail, trace_path(dut._name))
+	drv = tb.driver()
+	grp = tb.cover.access
+
+	await tb.start(clk_t)
+
+	mode = TmrCtrlMode.NONE
+	for x in range(max_xacts):
+		holes = list(grp.holes())
+		if not holes:
+			break
+
+		(op, reg, m) = choice(holes)
+		if m != mode:
+			await tb.set_mode(m, None, RisingEdge(tb.clock))
+			await RisingEdge(tb.clock)
+			mode = m
+		if op == "wr":
+			if reg == TmrReg.CTRL.index:
+				# keep current mode
+				data = TmrReg.CTRL.pack(mode=mode)
+			else:
+				data = getrandbits(32)
+			await drv.write_reg(reg, data, None,
+			                    RisingEdge(tb.clock))
+		else:
+			await drv.read_reg(reg, None, RisingEdge(tb.clock))
+		await RisingEdge(tb.clock)
+
+	await RisingEdge(tb.clock)
+	for l in grp.report():
+		dut._log.info(l)
+	if not grp.closed():
+		tb.failure("register access coverage not closed after " +
+		           "%d transactions" % max_xacts)
 
 
-seed(time())
 clk_t = 2000
 exit_on_fail=False
 
 #fact = TestFactory(tmr_test_mode)
-#fact.add_option("write_setup", [0, clk_t / 2])
-#fact.add_option("write_hold",  [clk_t / 2, clk_t])
-#fact.add_option("read_setup",  [clk_t, 3 * clk_t / 2])
-#fact.add_option("read_hold",   [clk_t / 2, clk_t])
+#fact.add_option("write_setup", [0, clk_t // 2])
+#fact.add_option("write_hold",  [clk_t // 2, clk_t])
+#fact.add_option("read_setup",  [clk_t, 3 * clk_t // 2])
+#fact.add_option("read_hold",   [clk_t // 2, clk_t])
 #fact.generate_tests()
 #
 #fact = TestFactory(tmr_test_count)
-#fact.add_option("setup", [0, clk_t / 4])
-#fact.add_option("hold",  [clk_t / 4, 3 * clk_t / 4])
+#fact.add_option("setup", [0, clk_t // 4])
+#fact.add_option("hold",  [clk_t // 4, 3 * clk_t // 4])
 #fact.generate_tests(prefix="partial_")
 #
 #fact = TestFactory(tmr_test_count)
@@ -342,15 +484,24 @@ exit_on_fail=False
 #fact.generate_tests(prefix="continuous_")
 
 #fact = TestFactory(tmr_test_lapse)
-#fact.add_option("write_setup", [0, clk_t / 2])
-#fact.add_option("write_hold",  [clk_t / 2, clk_t])
-#fact.add_option("read_setup",  [clk_t, 3 * clk_t / 2])
-#fact.add_option("read_hold",   [clk_t / 2, clk_t])
+#fact.add_option("write_setup", [0, clk_t // 2])
+#fact.add_option("write_hold",  [clk_t // 2, clk_t])
+#fact.add_option("read_setup",  [clk_t, 3 * clk_t // 2])
+#fact.add_option("read_hold",   [clk_t // 2, clk_t])
 #fact.generate_tests()
 
+fact = TestFactory(tmr_test_cover)
+fact.add_option("max_xacts", [64])
+fact.generate_tests()
+
+fact = TestFactory(tmr_test_idle)
+fact.add_option("lapse",       [4, 1000])
+fact.add_option("idle_cycles", [10, 100000])
+fact.generate_tests()
+
 fact = TestFactory(tmr_test_alarm)
-#fact.add_option("setup", [0, clk_t / 2])
-#fact.add_option("hold",  [clk_t / 2, clk_t])
+#fact.add_option("setup", [0, clk_t // 2])
+#fact.add_option("hold",  [clk_t // 2, clk_t])
 fact.add_option("lapse", [4])
 fact.add_option("setup", [0])
 fact.add_option("hold",  [clk_t])
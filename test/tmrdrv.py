@@ -0,0 +1,174 @@
+"""
+Timer register level driver and sequences.
+
+TmrDriver implements timer accesses on top of any AXI4-Lite master providing
+wrxact() and rdxact() coroutines (see regmap.py Mirror), whatever the
+execution backend: RTL test benches drive an Axi4lMaster (see
+tmr_axi4ls_cosim.py) whereas the transaction level model drives its own
+master (see tlm.py). Backends provide wait_int() and idle() on their own.
+
+Sequences below are written against TmrDriver only and hence run unchanged
+against both backends. They MUST NOT await simulator triggers.
+"""
+
+from regmap import timer_regs, Mirror
+
+class TmrDriver(object):
+	"""
+	Timer register accesses through master.
+	"""
+
+	def __init__(self, master):
+		self.regs = Mirror(timer_regs, master.rdxact, master.wrxact)
+
+
+	async def wait_int(self, level, cycles):
+		"""
+		Wait for interrupt line to reach level or for cycles clock cycles
+		to elapse, whichever comes first.
+
+		Return the number of whole clock cycles elapsed or None upon
+		timeout.
+		"""
+		raise NotImplementedError
+
+
+	async def idle(self, cycles):
+		raise NotImplementedError
+
+
+	async def set_mode(self, mode):
+		await self.regs.write(timer_regs.CTRL, mode=mode)
+
+
+	async def get_mode(self):
+		ctrl = await self.regs.fields(timer_regs.CTRL)
+		return ctrl["mode"]
+
+
+	async def get_count(self):
+		cnt = await self.regs.read(timer_regs.CNT)
+		return cnt
+
+
+	async def set_count(self, count):
+		await self.regs.write(timer_regs.CNT, count=count)
+
+
+	async def get_status(self):
+		stat = await self.regs.fields(timer_regs.STAT)
+		return (stat["arm"], stat["alrm"])
+
+
+	async def set_alarm(self, lapse, arm, load):
+		await self.regs.write(timer_regs.ALRM, lapse=lapse, arm=arm,
+		                      load=load)
+
+
+	async def get_alarm(self, fresh=False):
+		alrm = await self.regs.fields(timer_regs.ALRM, fresh)
+		return alrm["lapse"]
+
+
+async def count_sequence(drv, log):
+	"""
+	Start counting, then load and read back count.
+	"""
+	await drv.set_mode(timer_regs.mode.CNT)
+	await drv.get_count()
+	await drv.get_count()
+	await drv.get_count()
+	await drv.set_count(10)
+	cnt = await drv.get_count()
+	log.info("count: %d", cnt)
+	if not 10 <= cnt < 10 + 16:
+		raise AssertionError("unexpected count %d after loading 10" %
+		                     cnt)
+
+
+async def alarm_sequence(drv, log, lapses=(4, 16, 64)):
+	"""
+	Typical driver register access sequence: program a periodic alarm and
+	poll status till alarm is raised.
+	"""
+	for lapse in lapses:
+		await drv.set_mode(timer_regs.mode.NONE)
+		await drv.set_alarm(lapse, 1, 1)
+		await drv.set_mode(timer_regs.mode.CNT)
+		for p in range(lapse):
+			(arm, alrm) = await drv.get_status()
+			if alrm:
+				break
+			await drv.get_count()
+		else:
+			raise AssertionError("alarm not raised after %d "
+			                     "polls" % lapse)
+		# read lapse from register, not from mirror
+		if await drv.get_alarm(fresh=True) != lapse:
+			raise AssertionError("lapse not kept after alarm")
+	await drv.set_mode(timer_regs.mode.NONE)
+	log.info("%d register reads served from mirror, %d from bus",
+	         drv.regs.hits, drv.regs.reads)
+
+
+async def irq_sequence(drv, log, lapses=(1, 7, 100)):
+	"""
+	Service single shot interrupts raised by alarms of various lapses.
+	"""
+	for lapse in lapses:
+		await drv.set_mode(timer_regs.mode.NONE)
+		await drv.get_status()
+		await drv.set_alarm(lapse, 1, 1)
+		await drv.set_mode(timer_regs.mode.SNGL)
+		cyc = await drv.wait_int(1, lapse + 16)
+		if cyc is None:
+			raise AssertionError("interrupt not raised within %d "
+			                     "cycles" % (lapse + 16))
+		(arm, alrm) = await drv.get_status()
+		if not alrm:
+			raise AssertionError("alarm not set while interrupt "
+			                     "raised")
+		if await drv.wait_int(0, 16) is None:
+			raise AssertionError("interrupt not lowered once status "
+			                     "read")
+		log.info("lapse %d: interrupt raised after %d cycles", lapse,
+		         cyc)
+	await drv.set_mode(timer_regs.mode.NONE)
+
+
+async def auto_sequence(drv, log, lapse=20):
+	"""
+	Service two interrupts raised by an automatic mode alarm. The status
+	read servicing an interrupt latches alarm clearing: no interrupt may be
+	raised till status is read again.
+	"""
+	await drv.set_mode(timer_regs.mode.NONE)
+	await drv.get_status()
+	await drv.set_alarm(lapse, 0, 1)
+	await drv.set_mode(timer_regs.mode.AUTO)
+	for n in range(2):
+		cyc = await drv.wait_int(1, lapse + 16)
+		if cyc is None:
+			raise AssertionError("interrupt %d not raised within %d "
+			                     "cycles" % (n, lapse + 16))
+		(arm, alrm) = await drv.get_status()
+		if not alrm:
+			raise AssertionError("alarm not set while interrupt "
+			                     "raised")
+		if await drv.wait_int(0, 16) is None:
+			raise AssertionError("interrupt not lowered once status "
+			                     "read")
+		log.info("interrupt %d raised after %d cycles", n, cyc)
+
+		if await drv.wait_int(1, 2 * lapse) is not None:
+			raise AssertionError("interrupt raised while alarm "
+			                     "clearing latched")
+		(arm, alrm) = await drv.get_status()
+		if not arm or alrm:
+			raise AssertionError("automatic mode not re-armed once "
+			                     "status read again")
+	await drv.set_mode(timer_regs.mode.NONE)
+
+
+# sequences run by both RTL test benches and transaction level model
+sequences = [count_sequence, alarm_sequence, irq_sequence, auto_sequence]
@@ -0,0 +1,195 @@
+"""
+Precomputed stimulus vectors.
+
+Deterministic tests may compute every input change and expected output ahead
+of time and have the simulator play them through the stimulus player embedded
+into test wrappers (see stim_play.vhd) instead of driving inputs from Python
+one coroutine step at a time: Python then only writes the vector file, waits
+for the player to complete and checks the mismatch count it reports.
+
+Expected outputs are computed by cycle models of the designs under test,
+following the player timing: inputs are held from one falling clock edge to
+the next, outputs being sampled at the latter.
+
+Playing is requested by setting the STIM_PLAY environment variable. Vector
+files may also be generated offline:
+
+    python vectors.py set_count <hold_cycles> <wait_cycles> > tmr_impl_tb.vec
+    python vectors.py alarm <lapse> <lapse_cycles> > tmr_impl_tb.vec
+"""
+
+import os
+import random
+import sys
+from probe import FieldMap
+
+# Default stimulus mode, as requested by the STIM_PLAY environment variable.
+stim_play = bool(os.getenv("STIM_PLAY"))
+
+class VectorFile(object):
+	"""
+	Per-cycle vectors of the stimulus player. `drive' and `check' are
+	FieldMap layouts of player drive and check vectors.
+
+	Consecutive identical vectors are merged into a single line.
+	"""
+
+	def __init__(self, drive, check):
+		self.drive = drive
+		self.check = check
+		self.cycles = 0
+		self._vecs = []
+
+
+	def cycle(self, drive, expect=None, count=1):
+		"""
+		Append count cycles driving drive field values and expecting
+		expect field values. Fields missing from expect are not checked.
+		"""
+		expect = expect or {}
+		vec = (self.drive.pack(drive),
+		       self.check.pack(expect),
+		       self.check.pack(dict((n, -1) for n in expect)))
+		if self._vecs and tuple(self._vecs[-1][1:]) == vec:
+			self._vecs[-1][0] += count
+		else:
+			self._vecs.append([count] + list(vec))
+		self.cycles += count
+
+
+	def lines(self):
+		for (count, drv, exp, mask) in self._vecs:
+			yield "%d %s %s %s\n" % (count,
+			                         format(drv, "0%db" %
+			                                self.drive.width),
+			                         format(exp, "0%db" %
+			                                self.check.width),
+			                         format(mask, "0%db" %
+			                                self.check.width))
+
+
+	def write(self, path):
+		with open(path, "w") as f:
+			f.writelines(self.lines())
+
+
+class TmrImplModel(object):
+	"""
+	Cycle model of tmr_impl.
+	"""
+
+	def __init__(self):
+		self._cntdwn = 0
+		self._laps = 0
+		self._trig = 0
+
+
+	def step(self, ld_cnt, cnt, set_laps, laps, clr_alrm):
+		"""
+		Apply inputs for one clock cycle and return outputs sampled at
+		its end.
+		"""
+		# rising clock edge
+		if ld_cnt:
+			self._cntdwn = cnt
+		else:
+			self._cntdwn = (self._cntdwn + 1) & 0xffffffff
+
+		if set_laps:
+			self._laps = laps
+		else:
+			self._laps = (self._laps - 1) & 0x3fffffff
+			if self._laps == 0:
+				self._laps = laps
+				self._trig = 1
+
+		if self._trig:
+			self._trig = int(not clr_alrm)
+
+		return { "cnt_ld"  : ld_cnt,
+		         "cntdwn"  : self._cntdwn,
+		         "laps_set": set_laps,
+		         "alrm_set": self._trig }
+
+
+class TmrImplVectors(VectorFile):
+	"""
+	tmr_impl_tb stimulus vectors, starting with reset. Only output fields
+	named by check are checked.
+	"""
+
+	# Keep in sync with tmr_impl_tb.vhd player wiring.
+	_drive = [("ld_cnt", 1), ("cnt", 32), ("set_laps", 1), ("laps", 30),
+	          ("clr_alrm", 1)]
+	_check = [("cnt_ld", 1), ("cntdwn", 32), ("laps_set", 1),
+	          ("alrm_set", 1)]
+
+	def __init__(self, check=None):
+		VectorFile.__init__(self, FieldMap(self._drive),
+		                    FieldMap(self._check))
+		self._names = check or [n for (n, w) in self._check]
+		self._model = TmrImplModel()
+		self._inputs = { "ld_cnt": 1, "cnt": 0, "set_laps": 1, "laps": 0,
+		                 "clr_alrm": 1 }
+		self.apply()
+		self._inputs.update(ld_cnt=0, set_laps=0, clr_alrm=0)
+
+
+	def apply(self, count=1, **inputs):
+		"""
+		Update inputs given as keyword arguments and hold them for count
+		cycles. Return outputs sampled at the end of the last one.
+		"""
+		self._inputs.update(inputs)
+		for c in range(count):
+			outputs = self._model.step(**self._inputs)
+			self.cycle(self._inputs,
+			           dict((n, outputs[n]) for n in self._names))
+		return outputs
+
+
+def set_count_vectors(hold_cycles, wait_cycles, rng=random):
+	"""
+	Load random counts, holding load request for hold_cycles and checking
+	count down for wait_cycles after each release.
+	"""
+	vecs = TmrImplVectors(check=["cnt_ld", "cntdwn"])
+	vecs.apply(5)
+	for c in range(0, 5):
+		vecs.apply(hold_cycles, ld_cnt=1, cnt=rng.getrandbits(32))
+		vecs.apply(wait_cycles, ld_cnt=0)
+	return vecs
+
+
+def alarm_vectors(lapse, lapse_cycles):
+	"""
+	Set lapse, holding request for lapse_cycles, then wait for and clear
+	5 alarms.
+	"""
+	vecs = TmrImplVectors(check=["laps_set", "alrm_set"])
+	vecs.apply(lapse_cycles, set_laps=1, laps=lapse)
+	for l in range(0, 5):
+		cyc = 0
+		while not vecs.apply(set_laps=0, clr_alrm=0)["alrm_set"]:
+			cyc += 1
+			if cyc > lapse:
+				raise ValueError("alarm not raised within %d "
+				                 "cycles" % lapse)
+		vecs.apply(clr_alrm=1)
+	return vecs
+
+
+_scenarios = { "set_count": set_count_vectors, "alarm": alarm_vectors }
+
+def main(argv):
+	if len(argv) != 3 or argv[0] not in _scenarios:
+		sys.stderr.write(__doc__)
+		return 2
+
+	vecs = _scenarios[argv[0]](*[int(a) for a in argv[1:]])
+	sys.stdout.writelines(vecs.lines())
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+"""
+Per-test watchdog.
+
+Tests are run under a watchdog enforcing a simulation time budget and a wall
+clock time budget: a test exceeding any of them is killed and failed after
+logging a diagnostic snapshot, i.e. current value of all toplevel signals
+and the histories of all monitors (see history.py), so that the regression
+goes on with the next test instead of hanging until killed from outside.
+
+Budgets are given by the SIM_BUDGET (nanoseconds of simulated time) and
+WALL_BUDGET (seconds) environment variables, disabled when 0 and defaulting
+to no simulated time limit and 600 seconds respectively. The simulated time
+budget is enforced by a single timer. The wall clock budget is checked after
+WATCHDOG_TICK nanoseconds of simulated time, 1 by default, then after twice
+the previous interval each time, so that the number of watchdog wakeups only
+grows with the logarithm of simulated time, at the cost of detecting wall
+clock overruns late by at most the simulated time already spent. A test
+blocked without simulated time advancing, e.g. looping over delta cycles
+within the simulator, cannot be caught.
+
+The TestFactory defined here applies the watchdog to all tests it generates,
+materializing them lazily (see lazytest.py), and is meant as a drop-in
+replacement of cocotb's one. Single tests are
+guarded using the watched decorator below cocotb.test().
+"""
+
+import functools
+import os
+import time
+import cocotb
+from cocotb.triggers import First, Timer
+from cocotb.utils import get_sim_time, get_sim_steps
+import lazytest
+
+def _budget(name, default):
+	value = os.getenv(name)
+	return float(value) if value else default
+
+
+sim_budget = _budget("SIM_BUDGET", 0)
+wall_budget = _budget("WALL_BUDGET", 600)
+tick = _budget("WATCHDOG_TICK", 1)
+
+# snapshot callbacks of current test, run upon timeout
+_snapshots = []
+
+def register(callback):
+	"""
+	Register callback to run upon timeout of current test in order to log
+	diagnostic information, e.g. a monitor history dump.
+	"""
+	_snapshots.append(callback)
+
+
+def _snapshot(dut):
+	for h in dut:
+		try:
+			dut._log.info("    %s = %s", h._name, h.value)
+		except Exception:
+			# hierarchical or unreadable handles
+			pass
+	for cb in _snapshots:
+		cb()
+
+
+class WatchdogTimeout(AssertionError):
+	"""
+	Test exceeded one of its budgets.
+	"""
+	pass
+
+
+def watched(test, sim=None, wall=None):
+	"""
+	Wrap test coroutine function so that it runs under a watchdog with
+	sim nanoseconds of simulated time and wall seconds of wall clock time
+	budgets, defaulting to module wide ones.
+	"""
+	@functools.wraps(test)
+	async def _watched(dut, *args, **kwargs):
+		sim_max = sim_budget if sim is None else sim
+		wall_max = wall_budget if wall is None else wall
+		del _snapshots[:]
+		lazytest.started(dut._log)
+
+		task = cocotb.start_soon(test(dut, *args, **kwargs))
+		if not sim_max and not wall_max:
+			return await task
+
+		sim_start = get_sim_time("ns")
+		wall_start = time.time()
+		# budget left and wall clock check interval in simulation steps
+		left = sim_max and get_sim_steps(sim_max, "ns", round_mode="ceil")
+		interval = max(get_sim_steps(tick, "ns", round_mode="ceil"), 1)
+		while True:
+			if not wall_max:
+				# simulated time budget only: single wakeup
+				step = left
+			elif left:
+				step = min(interval, left)
+			else:
+				step = interval
+			timer = Timer(step, "step")
+			if await First(task.join(), timer) is not timer:
+				return await task
+
+			if left:
+				left -= step
+			sim_spent = get_sim_time("ns") - sim_start
+			wall_spent = time.time() - wall_start
+			if sim_max and not left:
+				what = "simulated time budget of %g ns" % sim_max
+			elif wall_max and wall_spent > wall_max:
+				what = "wall clock budget of %g s" % wall_max
+			else:
+				interval *= 2
+				continue
+
+			task.kill()
+			dut._log.error("%s exceeded %s (%g ns simulated in "
+			               "%.1f s), snapshot:", test.__name__, what,
+			               sim_spent, wall_spent)
+			_snapshot(dut)
+			raise WatchdogTimeout("%s exceeded %s" %
+			                      (test.__name__, what))
+
+	return _watched
+
+
+class TestFactory(lazytest.LazyTestFactory):
+	"""
+	cocotb TestFactory running all generated tests under a watchdog.
+	"""
+
+	def __init__(self, test_function, *args, **kwargs):
+		lazytest.LazyTestFactory.__init__(self, watched(test_function),
+		                                  *args, **kwargs)
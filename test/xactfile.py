@@ -0,0 +1,136 @@
+"""
+Bus transaction files.
+
+A transaction file holds a sequence of complete register accesses, i.e. reads
+or writes along with the data transferred, the response returned by slave and
+the simulation time of completion, as fixed size binary records. Files are
+written and read in a streaming fashion so that sequences of millions of
+transactions never sit in memory as a whole.
+
+File layout (little endian):
+  * magic  : 8 bytes, "RTLXACT1"
+  * records: sequence of records made of
+      - flags: unsigned 8 bits, bit 0 set for reads
+      - resp : unsigned 8 bits, slave response code
+      - addr : unsigned 32 bits address
+      - data : unsigned 32 bits data written or read
+      - time : unsigned 64 bits simulation time of completion
+"""
+
+import os
+import struct
+import sys
+from collections import namedtuple
+from sigtrace import artifact_path
+
+_MAGIC  = b"RTLXACT1"
+_RECORD = struct.Struct("<BBIIQ")
+
+Xact = namedtuple("Xact", ["read", "addr", "data", "resp", "time"])
+
+
+# Raised by bus masters upon error responses, defined here to be usable outside
+# of the simulator (see tlm.py).
+class AxiError(Exception):
+	_errstr = [ "okay", "exclusive access okay", "slave error",
+	            "decode error" ]
+	_dir    = [ "write to", "read from" ]
+
+	def __init__(self, msg, read, addr, resp):
+		self._msg  = msg + ": " + self._dir[int(read)]
+		self._addr = addr
+		self._resp = resp
+
+	def __str__(self):
+		return "%s @0x%x failed with code %x (%s)" % \
+			(self._msg, self._addr, self._resp,
+			 self._errstr[self._resp])
+
+
+class XactWriter(object):
+	"""
+	Append transactions to a transaction file.
+	"""
+
+	def __init__(self, path, chunk=4096):
+		self._chunk = chunk
+		self._buf = []
+		self._file = open(path, "wb")
+		self._file.write(_MAGIC)
+		self.count = 0
+
+
+	def write(self, xact):
+		self._buf.append(_RECORD.pack(int(xact.read), xact.resp,
+		                              xact.addr, xact.data, xact.time))
+		self.count += 1
+		if len(self._buf) == self._chunk:
+			self._flush()
+
+
+	def _flush(self):
+		self._file.write(b"".join(self._buf))
+		del self._buf[:]
+
+
+	def close(self):
+		if self._file is None:
+			return
+
+		self._flush()
+		self._file.close()
+		self._file = None
+
+
+class XactReader(object):
+	"""
+	Lazily iterate over transactions of a transaction file, loading chunk
+	records at a time.
+	"""
+
+	def __init__(self, path, chunk=4096):
+		self.path = path
+		self._chunk = chunk
+		with open(path, "rb") as f:
+			if f.read(len(_MAGIC)) != _MAGIC:
+				raise ValueError("%s: not a transaction file" %
+				                 path)
+
+
+	def __iter__(self):
+		size = _RECORD.size
+		with open(self.path, "rb") as f:
+			f.seek(len(_MAGIC))
+			while True:
+				buf = f.read(self._chunk * size)
+				# a truncated trailing record is ignored
+				for off in range(0, len(buf) - size + 1, size):
+					(flags, resp, addr, data, time) = \
+						_RECORD.unpack_from(buf, off)
+					yield Xact(bool(flags & 1), addr, data,
+					           resp, time)
+				if len(buf) < self._chunk * size:
+					return
+
+
+	def __len__(self):
+		return ((os.path.getsize(self.path) - len(_MAGIC)) //
+		        _RECORD.size)
+
+
+def xact_path(name):
+	"""
+	Build a unique transaction file path for current test from the given
+	entity name, located into directory given by the XACT_DIR environment
+	variable. Return None when recording is disabled, i.e. XACT_DIR is
+	empty or unset.
+	"""
+	return artifact_path("XACT_DIR", "xact", name)
+
+
+if __name__ == "__main__":
+	for p in sys.argv[1:]:
+		for x in XactReader(p):
+			print("%12d %s @0x%08x 0x%08x resp=%d" %
+			      (x.time, x.read and "rd" or "wr", x.addr, x.data,
+			       x.resp))